@@ -0,0 +1,106 @@
+"""
+Semantic Answer Cache
+Caches LLM answers keyed by the query embedding (cosine similarity threshold) plus
+the exact set of retrieved point IDs, so near-identical questions over unchanged
+context skip the API call.
+"""
+
+import threading
+import time
+from collections import OrderedDict
+import numpy as np
+
+
+class SemanticAnswerCache:
+    """In-process LRU cache with TTL; lookups are a single matrix-vector product."""
+
+    def __init__(self, threshold=0.95, ttl_seconds=7200, max_entries=512):
+        """
+        Args:
+            threshold (float): Minimum cosine similarity between query embeddings
+            ttl_seconds (float): Entry lifetime (default matches the 2-hour ingest cycle)
+            max_entries (int): Size bound; least recently used entries are evicted
+        """
+        self.threshold = float(threshold)
+        self.ttl_seconds = float(ttl_seconds)
+        self.max_entries = int(max_entries)
+        self._entries = OrderedDict()  # key -> (unit vector, point ids, answer, created_at)
+        self._next_key = 0
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.expired = 0
+        self.evictions = 0
+
+    @staticmethod
+    def _unit(vector):
+        vector = np.asarray(vector, dtype=np.float32)
+        norm = np.linalg.norm(vector)
+        return vector / norm if norm else vector
+
+    def _drop_expired(self, now):
+        for key in [k for k, e in self._entries.items() if now - e[3] > self.ttl_seconds]:
+            del self._entries[key]
+            self.expired += 1
+
+    def get(self, query_embedding, point_ids):
+        """Cached answer for a similar query over the same retrieved points, or None."""
+        ids = frozenset(str(i) for i in point_ids)
+        query = self._unit(query_embedding)
+        with self._lock:
+            self._drop_expired(time.time())
+            candidates = [(k, e) for k, e in self._entries.items() if e[1] == ids]
+            if candidates:
+                matrix = np.stack([e[0] for _, e in candidates])
+                scores = matrix @ query
+                best = int(np.argmax(scores))
+                if scores[best] >= self.threshold:
+                    key, entry = candidates[best]
+                    self._entries.move_to_end(key)
+                    self.hits += 1
+                    return entry[2]
+            self.misses += 1
+            return None
+
+    def put(self, query_embedding, point_ids, answer):
+        ids = frozenset(str(i) for i in point_ids)
+        with self._lock:
+            self._entries[self._next_key] = (self._unit(query_embedding), ids, answer, time.time())
+            self._next_key += 1
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self):
+        total = self.hits + self.misses
+        return {
+            'entries': len(self._entries),
+            'hits': self.hits,
+            'misses': self.misses,
+            'hit_rate': self.hits / total if total else 0.0,
+            'expired': self.expired,
+            'evictions': self.evictions,
+        }
+
+
+_cache = None
+_cache_lock = threading.Lock()
+
+
+def get_answer_cache(config):
+    """Process-wide answer cache, or None when `answer_cache_enabled` is false."""
+    global _cache
+    if not config.get('answer_cache_enabled', True):
+        return None
+    with _cache_lock:
+        if _cache is None:
+            _cache = SemanticAnswerCache(
+                threshold=config.get('answer_cache_threshold', 0.95),
+                ttl_seconds=config.get('answer_cache_ttl_seconds', 7200),
+                max_entries=config.get('answer_cache_max_entries', 512),
+            )
+    return _cache
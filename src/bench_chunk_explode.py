@@ -0,0 +1,94 @@
+#!/usr/bin/env python3
+"""
+Chunk Explode Benchmark
+Step 4 of integrated_twitter_pipeline before and after the column-wise rewrite:
+the old `iterrows()` loop with a full `row.to_dict()` payload per chunk versus
+explode_tweet_chunks with the TWEET_PAYLOAD_FIELDS payload. Reports chunks/sec,
+peak Python memory (tracemalloc) and the JSON payload bytes per point sent to Qdrant.
+
+Chunking memakai strategi words (tanpa tokenizer model), jadi yang diukur adalah
+overhead DataFrame/payload, bukan tokenizer. Usage (dari root repo):
+    python src/bench_chunk_explode.py --rows 50000
+"""
+
+import argparse
+import json
+import time
+import tracemalloc
+import pandas as pd
+import yaml
+from bench_normalizer import load_tweets
+from chunking import get_chunker
+from integrated_twitter_pipeline import explode_tweet_chunks
+from text_normalizer import TWEET_NORMALIZER
+from utils import point_id, to_rfc3339
+
+
+def legacy_chunk_records(df_processed, chunker):
+    """Perilaku lama: iterrows + seluruh baris sebagai payload setiap chunk."""
+    df_embed = df_processed.copy()
+    df_embed['text'] = df_embed['processed_text']
+    df_embed = df_embed.drop_duplicates(subset='text')
+    df_embed['created_at'] = df_embed['created_at'].map(to_rfc3339)
+    all_ids, all_texts, all_metas = [], [], []
+    for idx, row in df_embed.iterrows():
+        source_id = f"tweet:{row['id']}"
+        for i, chunk in enumerate(chunker(row['text'])):
+            all_ids.append(point_id(source_id, i))
+            all_texts.append(chunk)
+            all_metas.append({**row.to_dict(), 'chunk': i})
+    return all_ids, all_texts, all_metas
+
+
+def synthetic_processed(rows, pattern):
+    """DataFrame seperti hasil preprocess_tweets, dengan id dan teks unik per baris."""
+    originals = load_tweets(pattern, rows)
+    processed = TWEET_NORMALIZER.normalize_series(originals)
+    return pd.DataFrame({
+        'id': [str(1950000000000000000 + i) for i in range(rows)],
+        'original_text': originals,
+        'processed_text': processed + pd.Series([f" t{i}" for i in range(rows)]),
+        'created_at': 'Mon Jul 28 06:13:03 +0000 2025',
+        'username': 'bench_user',
+        'retweet_count': 0,
+        'favorite_count': 0,
+    })
+
+
+def measure(label, func):
+    started = time.perf_counter()
+    ids, texts, metas = func()
+    elapsed = time.perf_counter() - started
+    # Run kedua khusus memori: tracemalloc memperlambat sehingga tidak ikut diukur waktunya
+    tracemalloc.start()
+    func()
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    payload_bytes = sum(len(json.dumps({'text': t, **m}, ensure_ascii=False, default=str))
+                        for t, m in zip(texts, metas))
+    print(f"{label:>10}: {elapsed:.2f}s -> {len(ids) / elapsed:,.0f} chunks/sec, "
+          f"peak {peak / 1024 / 1024:.1f} MB, payload {payload_bytes / max(len(ids), 1):.0f} B/point")
+    return ids, elapsed
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--config', default='config.yaml')
+    parser.add_argument('--pattern', default='backup/tweets_raw_*.csv')
+    parser.add_argument('--rows', type=int, default=50000)
+    args = parser.parse_args()
+
+    with open(args.config) as f:
+        config = yaml.safe_load(f)
+    chunker = get_chunker({**config, 'chunk_strategy': 'words'})
+    df = synthetic_processed(args.rows, args.pattern)
+    print(f"{len(df):,} tweets")
+
+    legacy_ids, t_legacy = measure('iterrows', lambda: legacy_chunk_records(df, chunker))
+    new_ids, t_new = measure('explode', lambda: explode_tweet_chunks(df, chunker))
+    assert legacy_ids == new_ids, "ID point berbeda antara kedua implementasi"
+    print(f"{t_legacy / t_new:.1f}x faster, identical point ids")
+
+
+if __name__ == '__main__':
+    main()
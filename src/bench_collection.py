@@ -0,0 +1,154 @@
+#!/usr/bin/env python3
+"""
+Collection Spec Benchmark
+Builds one temporary collection per setting (HNSW m / ef, int8 scalar quantization,
+on-disk vectors) from the same vectors and reports recall@k against exact numpy
+search, search latency and an estimate of the RAM each setting needs.
+
+Vectors come from the configured collection (--source collection) or are
+synthetic clustered vectors (--source synthetic), so the settings can be sized
+for millions of tweets before touching the real collection.
+
+Usage (dari folder src, Qdrant harus berjalan):
+    python bench_collection.py --source synthetic --points 200000
+    python bench_collection.py --source collection --points 50000 --top-k 7
+"""
+
+import argparse
+import time
+import numpy as np
+import yaml
+from qdrant_store import (get_qdrant_client, qdrant_connection, bulk_upsert, search_qdrant, search_params,
+                          collection_spec, invalidate_collection_cache)
+
+# (label, perubahan terhadap DEFAULT_COLLECTION_SPEC)
+SETTINGS = [
+    ('float32 (default)', {}),
+    ('hnsw m=8', {'hnsw_m': 8}),
+    ('hnsw ef=128', {'hnsw_ef': 128}),
+    ('int8 + rescore', {'quantization': 'int8'}),
+    ('int8, no rescore', {'quantization': 'int8', 'rescore': False}),
+    ('int8 + on_disk', {'quantization': 'int8', 'vectors_on_disk': True}),
+    ('int8 + on_disk + hnsw on_disk', {'quantization': 'int8', 'vectors_on_disk': True, 'hnsw_on_disk': True}),
+]
+
+
+def load_collection_vectors(config, limit):
+    client = get_qdrant_client(**qdrant_connection(config))
+    vectors, offset = [], None
+    while len(vectors) < limit:
+        records, offset = client.scroll(config['qdrant_collection'], limit=min(1000, limit - len(vectors)),
+                                        offset=offset, with_payload=False, with_vectors=[''])
+        # Koleksi hybrid mengembalikan dict {'': dense, 'bm25': sparse}; hanya vektor dense yang dipakai
+        vectors.extend(r.vector[''] if isinstance(r.vector, dict) else r.vector for r in records)
+        if offset is None:
+            break
+    if not vectors:
+        raise SystemExit(f"Koleksi {config['qdrant_collection']} kosong")
+    return np.asarray(vectors, dtype=np.float32)
+
+
+def synthetic_vectors(n, dim, seed=0):
+    """Vektor berkelompok (mirip embedding tweet yang banyak topik serupa), ter-normalisasi."""
+    rng = np.random.default_rng(seed)
+    centers = rng.standard_normal((max(1, n // 200), dim)).astype(np.float32)
+    vectors = centers[rng.integers(0, len(centers), n)] + 0.35 * rng.standard_normal((n, dim)).astype(np.float32)
+    return vectors / np.linalg.norm(vectors, axis=1, keepdims=True)
+
+
+def exact_top_k(vectors, queries, k):
+    scores = queries @ vectors.T
+    top = np.argpartition(-scores, k, axis=1)[:, :k]
+    return [set(row.tolist()) for row in top]
+
+
+def estimate_ram_mb(n, dim, spec):
+    """Perkiraan kasar RAM: vektor float32, vektor int8 dan link graph HNSW (level 0: 2*m id 4 byte)."""
+    ram = 0 if spec['vectors_on_disk'] else n * dim * 4
+    if spec['quantization'] == 'int8' and spec['quantization_always_ram']:
+        ram += n * dim
+    if not spec['hnsw_on_disk']:
+        ram += n * spec['hnsw_m'] * 2 * 4
+    return ram / 1024 / 1024
+
+
+def wait_until_indexed(client, name, timeout=600):
+    started = time.time()
+    while time.time() - started < timeout:
+        if client.get_collection(name).status.value == 'green':
+            return
+        time.sleep(1)
+
+
+def run_setting(config, name, vectors, queries, truth, top_k, spec):
+    conn = qdrant_connection(config)
+    client = get_qdrant_client(**conn)
+    if client.collection_exists(name):
+        client.delete_collection(name)
+    invalidate_collection_cache(name)
+
+    started = time.perf_counter()
+    points = ((i, vectors[i], {}) for i in range(len(vectors)))
+    bulk_upsert(name, points, batch_size=config.get('upsert_batch_size', 256),
+                parallel=config.get('upsert_parallel', 4), collection_spec=spec, **conn)
+    wait_until_indexed(client, name)
+    build_seconds = time.perf_counter() - started
+
+    params = search_params(spec)
+    latencies, recalls = [], []
+    for query, expected in zip(queries, truth):
+        t = time.perf_counter()
+        hits = search_qdrant(name, query, top_k=top_k, params=params, **conn)
+        latencies.append((time.perf_counter() - t) * 1000)
+        recalls.append(len({h.id for h in hits} & expected) / top_k)
+    return {
+        'recall': float(np.mean(recalls)),
+        'p50_ms': float(np.percentile(latencies, 50)),
+        'p95_ms': float(np.percentile(latencies, 95)),
+        'ram_mb': estimate_ram_mb(len(vectors), vectors.shape[1], spec),
+        'build_s': build_seconds,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--config', default='../config.yaml')
+    parser.add_argument('--source', choices=['collection', 'synthetic'], default='synthetic')
+    parser.add_argument('--points', type=int, default=100000)
+    parser.add_argument('--dim', type=int, default=384, help='Dimensi vektor synthetic (all-MiniLM-L6-v2: 384)')
+    parser.add_argument('--queries', type=int, default=200)
+    parser.add_argument('--top-k', type=int, default=10)
+    parser.add_argument('--keep', action='store_true', help='Jangan hapus koleksi benchmark')
+    args = parser.parse_args()
+
+    with open(args.config) as f:
+        config = yaml.safe_load(f)
+    if args.source == 'collection':
+        vectors = load_collection_vectors(config, args.points)
+        vectors /= np.linalg.norm(vectors, axis=1, keepdims=True)
+    else:
+        vectors = synthetic_vectors(args.points, args.dim)
+
+    rng = np.random.default_rng(1)
+    queries = vectors[rng.integers(0, len(vectors), args.queries)]
+    queries = queries + 0.05 * rng.standard_normal(queries.shape).astype(np.float32)
+    queries /= np.linalg.norm(queries, axis=1, keepdims=True)
+    truth = exact_top_k(vectors, queries, args.top_k)
+    print(f"{len(vectors):,} vectors x {vectors.shape[1]} dims, {len(queries)} queries, recall@{args.top_k}")
+
+    settings = SETTINGS + [('config.yaml collection_spec', config.get('collection_spec') or {})]
+    client = get_qdrant_client(**qdrant_connection(config))
+    print(f"{'setting':>30} {'recall':>7} {'p50 ms':>7} {'p95 ms':>7} {'est. RAM MB':>12} {'build s':>8}")
+    for i, (label, overrides) in enumerate(settings):
+        spec = collection_spec({'collection_spec': overrides})
+        name = f"bench_collection_{i}"
+        r = run_setting(config, name, vectors, queries, truth, args.top_k, spec)
+        print(f"{label:>30} {r['recall']:>7.3f} {r['p50_ms']:>7.2f} {r['p95_ms']:>7.2f} "
+              f"{r['ram_mb']:>12.1f} {r['build_s']:>8.1f}")
+        if not args.keep:
+            client.delete_collection(name)
+            invalidate_collection_cache(name)
+
+
+if __name__ == '__main__':
+    main()
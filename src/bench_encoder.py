@@ -0,0 +1,68 @@
+#!/usr/bin/env python3
+"""
+Encoder Backend Benchmark
+Texts/sec of the PyTorch SentenceTransformer versus the ONNX Runtime encoder
+(fp32 and int8) on the tweet corpus, and how closely the ONNX embeddings agree
+with the PyTorch ones (cosine per text).
+
+Butuh onnxruntime (dan torch untuk ekspor pertama). Usage (dari root repo):
+    python src/bench_encoder.py --rows 5000 --threads 4
+"""
+
+import argparse
+import time
+import numpy as np
+import yaml
+from bench_normalizer import load_tweets
+from text_normalizer import TWEET_NORMALIZER
+from model_registry import get_model
+
+
+def timed_encode(label, model, texts, batch_size):
+    model.encode(texts[:batch_size], batch_size=batch_size, show_progress_bar=False)  # warmup
+    started = time.perf_counter()
+    vectors = np.asarray(model.encode(texts, batch_size=batch_size, show_progress_bar=False), dtype=np.float32)
+    elapsed = time.perf_counter() - started
+    print(f"{label:>12}: {elapsed:.2f}s -> {len(texts) / elapsed:,.0f} texts/sec")
+    return vectors, elapsed
+
+
+def cosine_rows(a, b):
+    a = a / np.maximum(np.linalg.norm(a, axis=1, keepdims=True), 1e-12)
+    b = b / np.maximum(np.linalg.norm(b, axis=1, keepdims=True), 1e-12)
+    return (a * b).sum(axis=1)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--config', default='config.yaml')
+    parser.add_argument('--pattern', default='backup/tweets_raw_*.csv')
+    parser.add_argument('--rows', type=int, default=5000)
+    parser.add_argument('--batch-size', type=int, default=64)
+    parser.add_argument('--threads', type=int, default=0, help='onnxruntime intra-op threads (0 = default)')
+    args = parser.parse_args()
+
+    with open(args.config) as f:
+        config = yaml.safe_load(f)
+    texts = [t for t in TWEET_NORMALIZER.normalize_series(load_tweets(args.pattern, args.rows)) if t]
+    print(f"{len(texts):,} tweets, model {config['embedding_model']}")
+
+    torch_model = get_model(config['embedding_model'], 'cpu', 'torch')
+    reference, t_torch = timed_encode('torch', torch_model, texts, args.batch_size)
+
+    options = {
+        'cache_dir': config.get('onnx_cache_dir', 'cache/onnx'),
+        'batch_size': args.batch_size,
+        'num_threads': args.threads,
+        'max_batch_tokens': config.get('onnx_max_batch_tokens', 8192),
+    }
+    for backend in ('onnx', 'onnx-int8'):
+        model = get_model(config['embedding_model'], 'cpu', backend, **options)
+        vectors, elapsed = timed_encode(backend, model, texts, args.batch_size)
+        agreement = cosine_rows(reference, vectors)
+        print(f"{'':>12}  {t_torch / elapsed:.1f}x vs torch, cosine vs torch: mean {agreement.mean():.4f}, "
+              f"min {agreement.min():.4f}, p01 {np.percentile(agreement, 1):.4f}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,93 @@
+#!/usr/bin/env python3
+"""
+CSV Ingestion Benchmark
+Compares rows/sec of the old per-row loop (one encode + one upsert per tweet)
+against the batched process_csv_files pipeline on backup/*processed*.csv.
+
+Usage (dari root repo, Qdrant harus berjalan):
+    python src/bench_ingest.py --repeat 50
+"""
+
+import argparse
+import glob
+import os
+import time
+import yaml
+import pandas as pd
+from embedding_pipeline import load_clean_csv, embed_and_store, embed_and_store_records, iter_csv_chunk_records
+from model_registry import warmup_from_config, get_model_from_config
+from chunking import get_chunker
+from qdrant_store import get_qdrant_client, qdrant_connection, invalidate_collection_cache
+
+
+def run_per_row(df, model, config):
+    """Perilaku lama: embed_and_store dipanggil sekali per baris."""
+    total = 0
+    for metadata in df.to_dict('records'):
+        for k, v in metadata.items():
+            if pd.isna(v):
+                metadata[k] = None
+        total += embed_and_store(metadata['text_cleaned'], metadata, model, config)
+    return total
+
+
+def run_batched(df, model, config):
+    records = iter_csv_chunk_records(df.to_dict('records'), config, get_chunker(config, model))
+    return embed_and_store_records(records, model, config)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--config', default='config.yaml')
+    parser.add_argument('--pattern', default='backup/*processed*.csv')
+    parser.add_argument('--repeat', type=int, default=20,
+                        help='Duplicate the rows N times (backup files are small)')
+    parser.add_argument('--collection', default='bench_ingest')
+    args = parser.parse_args()
+
+    with open(args.config) as f:
+        config = yaml.safe_load(f)
+    config['qdrant_collection'] = args.collection
+    # Ukur encode + upsert apa adanya, tanpa cache embedding dan tanpa skip ID yang sudah ada
+    config['embedding_cache_path'] = ''
+    config['skip_existing_points'] = False
+
+    csv_files = sorted(glob.glob(args.pattern))
+    if not csv_files:
+        print(f"Tidak ada file yang cocok dengan {args.pattern}")
+        return
+    df = load_clean_csv(csv_files)
+    if df is None or df.empty:
+        print("Tidak ada baris teks yang valid.")
+        return
+    # Salin baris agar cukup besar untuk diukur; teks dan id diberi suffix supaya tidak identik
+    copies = []
+    for i in range(args.repeat):
+        copy = df.assign(text_cleaned=df['text_cleaned'] + f' {i}')
+        if 'id' in copy.columns:
+            copy['id'] = copy['id'].astype(str) + f'-{i}'
+        copies.append(copy)
+    df = pd.concat(copies, ignore_index=True)
+
+    warmup_from_config(config)
+    model = get_model_from_config(config)
+    client = get_qdrant_client(**qdrant_connection(config))
+
+    print(f"Files: {len(csv_files)}, rows: {len(df)}, embed_batch_size: {config.get('embed_batch_size', 512)}")
+    results = {}
+    for name, runner in [('per-row', run_per_row), ('batched', run_batched)]:
+        client.delete_collection(args.collection)
+        invalidate_collection_cache(args.collection)
+        started = time.perf_counter()
+        chunks = runner(df, model, config)
+        elapsed = time.perf_counter() - started
+        results[name] = len(df) / elapsed
+        print(f"{name:>8}: {len(df)} rows, {chunks} chunks in {elapsed:.2f}s -> {results[name]:.1f} rows/sec")
+
+    client.delete_collection(args.collection)
+    invalidate_collection_cache(args.collection)
+    print(f"Speedup: {results['batched'] / results['per-row']:.1f}x")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,89 @@
+#!/usr/bin/env python3
+"""
+Text Normalizer Micro-benchmark
+Throughput of the old per-tweet cleaner (better_clean_text, inlined below as the
+baseline) versus TextNormalizer.normalize and TextNormalizer.normalize_series.
+
+Usage (dari root repo):
+    python src/bench_normalizer.py --rows 100000
+"""
+
+import argparse
+import glob
+import time
+import pandas as pd
+from text_normalizer import TWEET_NORMALIZER
+
+
+def legacy_clean_text(text):
+    """Salinan better_clean_text lama dari integrated_twitter_pipeline.py (baseline)."""
+    if not isinstance(text, str):
+        return ""
+    import re, string
+    text = text.lower()
+    text = re.sub(r'&amp;', 'dan', text)
+    text = re.sub(r'&lt;|&gt;|&quot;|&#39;', '', text)
+    text = re.sub(r'http\S+', '', text)
+    text = re.sub(r'@\w+', '', text)
+    text = re.sub(r'#(\w+)', r'\1', text)
+    text = re.sub(r'\d+', '', text)
+    text = text.translate(str.maketrans('', '', string.punctuation))
+    text = re.sub(r'[^\w\s]', '', text)
+    text = re.sub(r'\s+', ' ', text)
+    text = re.sub(r'\b[a-z]\b', '', text)
+    stopwords = [
+        'yang','dan','di','ke','dari','untuk','dengan','ini','itu','atau','juga','bisa',
+        'akan','sudah','masih','belum','tidak','bukan','ada','saya','kamu','dia','mereka',
+        'kami','kita','anda','nya','lah','kah','tah','pun','per','para','oleh','kepada',
+        'terhadap','antara','dalam','atas','bawah','depan','belakang','samping','luar',
+        'sebelah','setelah','sebelum','ketika','sambil','selama','hingga','sampai','sejak',
+        'karena','jika','kalau','meskipun','walaupun','sehingga','agar','supaya','seperti',
+        'bagai','sebagai','adalah','ialah','yaitu','yakni','diantara','didalam','keluar',
+        'dikeluarkan','masuk','dimasukkan'
+    ]
+    words = text.split()
+    filtered = [w for w in words if w not in stopwords]
+    return ' '.join(filtered).strip()
+
+
+def load_tweets(pattern, rows):
+    texts = []
+    for path in sorted(glob.glob(pattern)):
+        df = pd.read_csv(path)
+        for col in ['full_text', 'original_text', 'text']:
+            if col in df.columns:
+                texts.extend(df[col].dropna().astype(str).tolist())
+                break
+    if not texts:
+        raise SystemExit(f"Tidak ada tweet di {pattern}")
+    repeats = rows // len(texts) + 1
+    return pd.Series((texts * repeats)[:rows])
+
+
+def timed(label, rows, func):
+    started = time.perf_counter()
+    result = func()
+    elapsed = time.perf_counter() - started
+    print(f"{label:>18}: {elapsed:.2f}s -> {rows / elapsed:,.0f} tweets/sec")
+    return result, elapsed
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--pattern', default='backup/tweets_raw_*.csv')
+    parser.add_argument('--rows', type=int, default=100000)
+    args = parser.parse_args()
+
+    series = load_tweets(args.pattern, args.rows)
+    print(f"{len(series):,} tweets")
+    legacy, t_legacy = timed('legacy apply', len(series), lambda: series.apply(legacy_clean_text))
+    scalar, t_scalar = timed('normalize apply', len(series), lambda: series.map(TWEET_NORMALIZER.normalize))
+    vector, t_vector = timed('normalize_series', len(series), lambda: TWEET_NORMALIZER.normalize_series(series))
+
+    mismatches = int((legacy != scalar).sum() + (legacy != vector).sum())
+    print(f"Speedup: {t_legacy / t_scalar:.1f}x (per-text), {t_legacy / t_vector:.1f}x (series); "
+          f"mismatches vs legacy: {mismatches}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,189 @@
+"""
+Token-aware Chunking
+Chunks text by counting model tokens (not words), using the tokenizer's offset
+mapping from a single tokenization pass. Chunks are slices of the original text,
+so nothing is re-joined or re-tokenized. Also tracks how many tokens were actually
+encoded versus silently truncated by the encoder.
+"""
+
+import bisect
+import logging
+import re
+import threading
+from utils import chunk_text
+
+# Batas kalimat: tanda akhir kalimat diikuti spasi, atau baris baru
+_SENTENCE_END = re.compile(r'(?<=[.!?])\s+|\n+')
+
+
+class ChunkStats:
+    """Counters shared by all chunkers: chunks produced, tokens kept and tokens the encoder would cut."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        self.texts = 0
+        self.chunks = 0
+        self.tokens = 0
+        self.truncated_tokens = 0
+
+    def record(self, token_counts, limit):
+        with self._lock:
+            self.texts += 1
+            self.chunks += len(token_counts)
+            for n in token_counts:
+                self.tokens += min(n, limit)
+                self.truncated_tokens += max(0, n - limit)
+
+    def as_dict(self):
+        total = self.tokens + self.truncated_tokens
+        return {
+            'texts': self.texts,
+            'chunks': self.chunks,
+            'encoded_tokens': self.tokens,
+            'truncated_tokens': self.truncated_tokens,
+            'truncated_ratio': self.truncated_tokens / total if total else 0.0,
+        }
+
+
+class TokenChunker:
+    """
+    Chunks measured in model tokens.
+
+    Strategies:
+        sliding:  fixed windows of `max_tokens` with `overlap_tokens` overlap
+        sentence: whole sentences packed greedily up to `max_tokens`; a sentence
+                  longer than the limit falls back to sliding windows
+    """
+
+    def __init__(self, tokenizer, max_tokens, overlap_tokens=32, strategy='sentence'):
+        if strategy not in ('sliding', 'sentence'):
+            raise ValueError(f"Unknown chunk strategy: {strategy}")
+        if overlap_tokens >= max_tokens:
+            raise ValueError("overlap_tokens must be smaller than max_tokens")
+        self.tokenizer = tokenizer
+        self.max_tokens = int(max_tokens)
+        self.overlap_tokens = int(overlap_tokens)
+        self.strategy = strategy
+        self.stats = ChunkStats()
+
+    def _offsets(self, text):
+        encoding = self.tokenizer(text, add_special_tokens=False, return_offsets_mapping=True,
+                                  return_attention_mask=False, return_token_type_ids=False,
+                                  truncation=False, verbose=False)
+        return encoding['offset_mapping']
+
+    def _windows(self, start, stop):
+        """Token index windows [a, b) covering [start, stop) with overlap."""
+        step = self.max_tokens - self.overlap_tokens
+        windows = []
+        a = start
+        while a < stop:
+            b = min(a + self.max_tokens, stop)
+            windows.append((a, b))
+            if b == stop:
+                break
+            a += step
+        return windows
+
+    def _sentence_spans(self, text, offsets):
+        """Token index ranges [a, b) of each sentence, found via the offset mapping."""
+        starts = [o[0] for o in offsets]
+        spans = []
+        a = 0
+        for match in _SENTENCE_END.finditer(text):
+            b = bisect.bisect_left(starts, match.end())
+            if b > a:
+                spans.append((a, b))
+                a = b
+        if a < len(offsets):
+            spans.append((a, len(offsets)))
+        return spans
+
+    def _pack_sentences(self, text, offsets):
+        windows = []
+        current = None
+        for a, b in self._sentence_spans(text, offsets):
+            if b - a > self.max_tokens:
+                if current:
+                    windows.append(current)
+                    current = None
+                windows.extend(self._windows(a, b))
+            elif current and b - current[0] <= self.max_tokens:
+                current = (current[0], b)
+            else:
+                if current:
+                    windows.append(current)
+                current = (a, b)
+        if current:
+            windows.append(current)
+        return windows
+
+    def __call__(self, text):
+        if not text or not text.strip():
+            return []
+        offsets = self._offsets(text)
+        if not offsets:
+            return []
+        if self.strategy == 'sliding':
+            windows = self._windows(0, len(offsets))
+        else:
+            windows = self._pack_sentences(text, offsets)
+        chunks = [text[offsets[a][0]:offsets[b - 1][1]] for a, b in windows]
+        self.stats.record([b - a for a, b in windows], self.max_tokens)
+        return chunks
+
+
+class WordChunker:
+    """
+    The original utils.chunk_text (sizes in words). When a tokenizer is given,
+    it also measures how many tokens of each chunk the encoder would truncate.
+    """
+
+    def __init__(self, chunk_size, overlap, tokenizer=None, max_tokens=None):
+        self.chunk_size = chunk_size
+        self.overlap = overlap
+        self.tokenizer = tokenizer
+        self.max_tokens = max_tokens
+        self.stats = ChunkStats()
+
+    def __call__(self, text):
+        chunks = chunk_text(text, self.chunk_size, self.overlap)
+        if chunks and self.tokenizer is not None and self.max_tokens:
+            encoded = self.tokenizer(chunks, add_special_tokens=False, return_attention_mask=False,
+                                     return_token_type_ids=False, truncation=False, verbose=False)
+            self.stats.record([len(ids) for ids in encoded['input_ids']], self.max_tokens)
+        return chunks
+
+
+_chunkers = {}
+_chunkers_lock = threading.Lock()
+
+
+def get_chunker(config, model=None):
+    """
+    Chunker for config.yaml settings, shared per process.
+
+    `chunk_strategy` sentence/sliding needs the embedding model's tokenizer; `words`
+    keeps the old word-count chunking (`chunk_size` / `chunk_overlap`).
+    """
+    strategy = config.get('chunk_strategy', 'words')
+    tokenizer = getattr(model, 'tokenizer', None)
+    # Token khusus [CLS] dan [SEP] ikut dihitung dalam max_seq_length
+    model_limit = (getattr(model, 'max_seq_length', None) or 256) - 2
+    max_tokens = min(int(config.get('chunk_max_tokens') or model_limit), model_limit)
+    key = (strategy, id(tokenizer), max_tokens, config.get('chunk_overlap_tokens', 32),
+           config.get('chunk_size'), config.get('chunk_overlap'))
+    with _chunkers_lock:
+        chunker = _chunkers.get(key)
+        if chunker is None:
+            if strategy != 'words' and tokenizer is None:
+                logging.warning(f"chunk_strategy '{strategy}' needs the model tokenizer, falling back to words")
+            if strategy == 'words' or tokenizer is None:
+                chunker = WordChunker(config['chunk_size'], config['chunk_overlap'], tokenizer, max_tokens)
+            else:
+                chunker = TokenChunker(tokenizer, max_tokens, config.get('chunk_overlap_tokens', 32), strategy)
+            _chunkers[key] = chunker
+    return chunker
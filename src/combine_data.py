@@ -1,12 +1,27 @@
+import os
 import pandas as pd
+from csv_stream import SeenHashStore, iter_unique_frames
 
-def combine_csvs(csv_list, out_csv='all_data.csv'):
-    dfs = [pd.read_csv(f) for f in csv_list]
-    all_df = pd.concat(dfs, ignore_index=True)
-    all_df = all_df.drop_duplicates(subset='text')
-    all_df.to_csv(out_csv, index=False)
-    print(f"Combined {len(all_df)} rows to {out_csv}")
-    return all_df
+def combine_csvs(csv_list, out_csv='all_data.csv', chunksize=5000, dedup_store='cache/combine_seen.sqlite'):
+    # Dibaca per potongan dan ditulis append, jadi memori tidak bergantung pada jumlah file
+    columns = []
+    for f in csv_list:
+        for col in pd.read_csv(f, nrows=0).columns:
+            if col not in columns:
+                columns.append(col)
+    seen = SeenHashStore(dedup_store)
+    seen.clear()
+    if os.path.exists(out_csv):
+        os.remove(out_csv)
+    total = 0
+    try:
+        for _, frame in iter_unique_frames(csv_list, 'text', seen, chunksize):
+            frame.reindex(columns=columns).to_csv(out_csv, mode='a', header=total == 0, index=False)
+            total += len(frame)
+    finally:
+        seen.close()
+    print(f"Combined {total} rows to {out_csv}")
+    return total
 
 if __name__ == '__main__':
     combine_csvs(['tweets.csv', 'pdf_data.csv'])
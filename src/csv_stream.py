@@ -0,0 +1,85 @@
+"""
+Streaming CSV Reader
+Reads many CSV files chunk by chunk and deduplicates with an on-disk hash set,
+so peak memory does not grow with the number of backup files.
+"""
+
+import hashlib
+import os
+import sqlite3
+import pandas as pd
+
+
+def _hash64(value):
+    # 8 byte blake2b -> signed int64 agar muat di INTEGER PRIMARY KEY SQLite
+    digest = hashlib.blake2b(value.encode('utf-8'), digest_size=8).digest()
+    return int.from_bytes(digest, 'big', signed=True)
+
+
+class SeenHashStore:
+    """Disk-backed set of 64-bit text hashes (SQLite), used for streaming deduplication."""
+
+    def __init__(self, path='cache/seen_text.sqlite'):
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self.path = path
+        self._conn = sqlite3.connect(path)
+        self._conn.execute("CREATE TABLE IF NOT EXISTS seen (h INTEGER PRIMARY KEY)")
+        self._conn.commit()
+
+    def filter_new(self, values):
+        """
+        Return a boolean list: True for values not seen before (in this call or earlier).
+        New values are recorded immediately.
+        """
+        mask = []
+        cur = self._conn.cursor()
+        for value in values:
+            cur.execute("INSERT OR IGNORE INTO seen (h) VALUES (?)", (_hash64(value),))
+            mask.append(cur.rowcount == 1)
+        self._conn.commit()
+        return mask
+
+    def clear(self):
+        self._conn.execute("DELETE FROM seen")
+        self._conn.commit()
+
+    def close(self):
+        self._conn.close()
+
+
+# Kolom id tweet dibaca sebagai teks: tanpa dtype, satu id kosong dalam potongan membuat
+# kolomnya float64 dan id 19 digit membulat (tweet:1.879e+18)
+ID_COLUMN_DTYPES = {'id': str, 'id_str': str, 'conversation_id_str': str, 'user_id_str': str}
+
+
+def iter_csv_frames(csv_files, chunksize=5000, usecols=None):
+    """
+    Yield (path, DataFrame chunk) for every file, reading at most `chunksize` rows at a time.
+    Tweet id columns are read as strings. Unreadable files are reported and skipped.
+    """
+    for path in csv_files:
+        try:
+            reader = pd.read_csv(path, chunksize=chunksize, usecols=usecols, dtype=ID_COLUMN_DTYPES)
+            for frame in reader:
+                yield path, frame
+        except Exception as e:
+            print(f"Gagal membaca {path}: {e}")
+
+
+def iter_unique_frames(csv_files, key_column, seen, chunksize=5000):
+    """
+    Like iter_csv_frames, but drops rows whose `key_column` value was already seen
+    (across all chunks and files). Rows missing the column are dropped.
+    """
+    for path, frame in iter_csv_frames(csv_files, chunksize):
+        if key_column not in frame.columns:
+            continue
+        frame = frame.dropna(subset=[key_column])
+        if frame.empty:
+            continue
+        mask = seen.filter_new(frame[key_column].astype(str).tolist())
+        frame = frame[mask]
+        if not frame.empty:
+            yield path, frame
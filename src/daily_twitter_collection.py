@@ -11,6 +11,7 @@ from twitter_fetch import fetch_with_harvest
 # from preprocess_twitter_data import preprocess_twitter_data
 import yaml
 import pandas as pd
+from text_normalizer import SIMPLE_NORMALIZER
 
 def main():
     """Main function to run daily Twitter collection"""
@@ -34,7 +35,8 @@ def main():
             
             # Simple preprocessing
             try:
-                df_raw = pd.read_csv('tweets-data/tweets_harvest.csv')
+                # Hasil gabungan semua shard (satu file per shard di tweets-data/)
+                df_raw = df.copy()
                 
                 # Find text column
                 text_column = None
@@ -50,48 +52,8 @@ def main():
                 if text_column:
                     print(f"✅ Using column: {text_column}")
                     
-                    # Simple text cleaning
-                    def simple_clean_text(text):
-                        if not isinstance(text, str):
-                            return ""
-                        
-                        # Convert to lowercase
-                        text = text.lower()
-                        
-                        # Remove URLs
-                        import re
-                        text = re.sub(r'http[s]?://(?:[a-zA-Z]|[0-9]|[$-_@.&+]|[!*\\(\\),]|(?:%[0-9a-fA-F][0-9a-fA-F]))+', '', text)
-                        
-                        # Remove mentions (@username)
-                        text = re.sub(r'@\w+', '', text)
-                        
-                        # Remove hashtags but keep the text
-                        text = re.sub(r'#(\w+)', r'\1', text)
-                        
-                        # Remove numbers
-                        text = re.sub(r'\d+', '', text)
-                        
-                        # Remove all punctuation and special characters
-                        import string
-                        # Remove punctuation
-                        text = text.translate(str.maketrans('', '', string.punctuation))
-                        
-                        # Remove additional special characters
-                        text = re.sub(r'[^\w\s]', '', text)
-                        
-                        # Remove extra whitespace
-                        text = re.sub(r'\s+', ' ', text)
-                        
-                        # Remove single characters (like 'a', 'i', 'o')
-                        text = re.sub(r'\b[a-z]\b', '', text)
-                        
-                        # Remove extra whitespace again
-                        text = re.sub(r'\s+', ' ', text)
-                        
-                        return text.strip()
-                    
-                    # Apply preprocessing
-                    df_raw['processed_text'] = df_raw[text_column].apply(simple_clean_text)
+                    # Apply preprocessing (lihat text_normalizer.SIMPLE_NORMALIZER)
+                    df_raw['processed_text'] = SIMPLE_NORMALIZER.normalize_series(df_raw[text_column])
                     df_processed = df_raw
                     
                     # Save processed data
@@ -113,7 +75,7 @@ def main():
         print(f"Total tweets collected: {len(df)}")
         print(f"Target: 10 tweets every 2 hours")
         print(f"Hashtags monitored: #indihome, #telkomIndonesia, #telkom, #gangguanTelkom")
-        print(f"Raw output: tweets-data/tweets_harvest.csv")
+        print(f"Raw output: tweets-data/")
         print(f"Processed output: tweets_processed.csv")
         
         if len(df) > 0:
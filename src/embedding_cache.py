@@ -0,0 +1,185 @@
+"""
+Embedding Cache
+On-disk, content-addressed cache of embeddings keyed by hash(model name + normalized text),
+consulted before model.encode so re-ingesting the same tweets/PDF chunks costs only I/O.
+"""
+
+import hashlib
+import logging
+import os
+import sqlite3
+import threading
+import time
+import unicodedata
+import numpy as np
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS embeddings (
+    key TEXT PRIMARY KEY,
+    dim INTEGER NOT NULL,
+    vector BLOB NOT NULL,
+    last_used REAL NOT NULL
+)
+"""
+
+
+def normalize_for_cache(text):
+    """Unicode NFC + whitespace collapse, so cosmetic differences still hit the cache."""
+    return " ".join(unicodedata.normalize('NFC', text).split())
+
+
+def cache_key(model_name, text):
+    digest = hashlib.sha256()
+    digest.update(model_name.encode('utf-8'))
+    digest.update(b'\0')
+    digest.update(normalize_for_cache(text).encode('utf-8'))
+    return digest.hexdigest()
+
+
+class EmbeddingCache:
+    """SQLite-backed float32 embedding store with size-based LRU eviction."""
+
+    def __init__(self, path='cache/embeddings.sqlite', max_bytes=512 * 1024 * 1024):
+        """
+        Args:
+            path (str): SQLite file location (directory is created if needed)
+            max_bytes (int): Upper bound for stored vector bytes before LRU eviction
+        """
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self.path = path
+        self.max_bytes = int(max_bytes)
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(_SCHEMA)
+        self._conn.execute("CREATE INDEX IF NOT EXISTS idx_embeddings_last_used ON embeddings(last_used)")
+        self._conn.commit()
+        self._bytes = self._conn.execute("SELECT COALESCE(SUM(LENGTH(vector)), 0) FROM embeddings").fetchone()[0]
+
+    def get_many(self, model_name, texts):
+        """Return a list aligned with `texts`: cached float32 vectors or None."""
+        keys = [cache_key(model_name, t) for t in texts]
+        found = {}
+        with self._lock:
+            # SQLite membatasi jumlah parameter per query, jadi lookup dipecah
+            for start in range(0, len(keys), 500):
+                part = keys[start:start + 500]
+                placeholders = ",".join("?" * len(part))
+                rows = self._conn.execute(
+                    f"SELECT key, vector FROM embeddings WHERE key IN ({placeholders})", part
+                ).fetchall()
+                for key, blob in rows:
+                    found[key] = np.frombuffer(blob, dtype=np.float32)
+            if found:
+                now = time.time()
+                self._conn.executemany("UPDATE embeddings SET last_used = ? WHERE key = ?",
+                                       [(now, k) for k in found])
+                self._conn.commit()
+        results = [found.get(k) for k in keys]
+        hits = sum(1 for r in results if r is not None)
+        self.hits += hits
+        self.misses += len(results) - hits
+        return results
+
+    def put_many(self, model_name, texts, vectors):
+        now = time.time()
+        rows = []
+        for text, vector in zip(texts, vectors):
+            vector = np.asarray(vector, dtype=np.float32)
+            rows.append((cache_key(model_name, text), vector.shape[0], vector.tobytes(), now))
+        with self._lock:
+            before = self._conn.total_changes
+            self._conn.executemany(
+                "INSERT OR IGNORE INTO embeddings (key, dim, vector, last_used) VALUES (?, ?, ?, ?)", rows
+            )
+            self._conn.commit()
+            # Satu panggilan berasal dari satu model, jadi semua vektor berukuran sama
+            inserted = self._conn.total_changes - before
+            if rows:
+                self._bytes += inserted * len(rows[0][2])
+            if self._bytes > self.max_bytes:
+                self._evict()
+
+    def _evict(self):
+        # Hapus entri yang paling lama tidak dipakai sampai ukuran turun ke 90% batas
+        target = int(self.max_bytes * 0.9)
+        while self._bytes > target:
+            rows = self._conn.execute(
+                "SELECT key, LENGTH(vector) FROM embeddings ORDER BY last_used LIMIT 1000"
+            ).fetchall()
+            if not rows:
+                break
+            victims = []
+            for key, size in rows:
+                if self._bytes <= target:
+                    break
+                victims.append((key,))
+                self._bytes -= size
+            self._conn.executemany("DELETE FROM embeddings WHERE key = ?", victims)
+            self.evictions += len(victims)
+        self._conn.commit()
+
+    def stats(self):
+        total = self.hits + self.misses
+        with self._lock:
+            entries = self._conn.execute("SELECT COUNT(*) FROM embeddings").fetchone()[0]
+        return {
+            'hits': self.hits,
+            'misses': self.misses,
+            'hit_rate': self.hits / total if total else 0.0,
+            'entries': entries,
+            'bytes': self._bytes,
+            'evictions': self.evictions,
+        }
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+
+_caches = {}
+_caches_lock = threading.Lock()
+
+
+def get_embedding_cache(config):
+    """
+    Shared cache for this process, or None when `embedding_cache_path` is empty
+    in config.yaml (cache disabled).
+    """
+    path = config.get('embedding_cache_path', 'cache/embeddings.sqlite')
+    if not path:
+        return None
+    with _caches_lock:
+        cache = _caches.get(path)
+        if cache is None:
+            max_bytes = float(config.get('embedding_cache_max_mb', 512)) * 1024 * 1024
+            cache = EmbeddingCache(path, max_bytes)
+            _caches[path] = cache
+    return cache
+
+
+def encode_with_cache(model, texts, model_name, cache=None, **encode_kwargs):
+    """
+    `model.encode(texts)` that only encodes texts missing from the cache.
+
+    Returns:
+        np.ndarray: float32 matrix aligned with `texts`
+    """
+    if cache is None:
+        return np.asarray(model.encode(texts, **encode_kwargs), dtype=np.float32)
+    cached = cache.get_many(model_name, texts)
+    missing = [i for i, v in enumerate(cached) if v is None]
+    if missing:
+        fresh = np.asarray(model.encode([texts[i] for i in missing], **encode_kwargs), dtype=np.float32)
+        cache.put_many(model_name, [texts[i] for i in missing], fresh)
+        for i, vector in zip(missing, fresh):
+            cached[i] = vector
+    if not cached:
+        return np.empty((0, 0), dtype=np.float32)
+    logging.info(f"Embedding cache: {len(texts) - len(missing)}/{len(texts)} hits")
+    return np.vstack(cached)
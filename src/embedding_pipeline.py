@@ -1,81 +1,160 @@
 import pandas as pd
-from sentence_transformers import SentenceTransformer
 import yaml
 import sys
 import glob
 import os
-import uuid
-import pypdf
-from src.qdrant_store import upsert_embeddings
-from utils import clean_text, chunk_text, setup_logger
-
-# FUNGSI EKSTRAKSI PDF (TETAP SAMA)
-def extract_text_from_pdf(pdf_path: str) -> str:
-    """Membaca file PDF dan mengembalikan seluruh konten teksnya."""
+from pdf_pages import extract_pdf_pages
+from qdrant_store import get_vector_store, payload_filter
+from retrieval_cache import bump_collection_version
+from utils import clean_text, batched, point_id, text_source_id, setup_logger, to_rfc3339
+from ingest_manifest import IngestManifest
+from csv_stream import SeenHashStore, iter_csv_frames, ID_COLUMN_DTYPES
+from model_registry import get_model_from_config, embedding_model_id
+from chunking import get_chunker
+from embedding_cache import get_embedding_cache, encode_with_cache
+from sparse_encoder import get_sparse_encoder
+from tweet_archive import archive_files, iter_archive_frames, INGEST_COLUMNS, DEFAULT_ARCHIVE_PATH
+
+# FUNGSI EKSTRAKSI PDF
+def extract_text_from_pdf(pdf_path: str, config=None) -> str:
+    """
+    Membaca file PDF dan mengembalikan seluruh konten teksnya.
+
+    Halaman diekstrak paralel (process pool) dan disimpan di cache per
+    halaman, jadi PDF yang tidak berubah tidak di-parse ulang.
+    """
+    config = config or {}
     try:
-        reader = pypdf.PdfReader(pdf_path)
-        full_text = ""
-        for page in reader.pages:
-            # Tambahkan spasi antar halaman untuk memastikan kata tidak menyambung
-            page_text = page.extract_text()
-            if page_text:
-                full_text += page_text + "\n\n"
-        return full_text
+        pages = extract_pdf_pages(
+            pdf_path,
+            cache_dir=config.get('pdf_page_cache_dir', 'cache/pdf_pages'),
+            max_workers=config.get('pdf_workers') or None
+        )
+        # Tambahkan spasi antar halaman untuk memastikan kata tidak menyambung
+        return "".join(page_text + "\n\n" for page_text in pages if page_text)
     except Exception as e:
         print(f"Error reading PDF {pdf_path}: {e}")
         return ""
 
 # FUNGSI INTI BARU UNTUK EMBEDDING DAN PENYIMPANAN
-def embed_and_store(text_content: str, metadata: dict, model, config):
+def make_chunk_records(text_content: str, metadata: dict, config, source_id=None, chunker=None):
     """
-    Mengambil teks dan metadata, lalu melakukan chunking, embedding, 
-    dan upsert ke Qdrant.
+    Memecah satu dokumen menjadi record (id, chunk, metadata) yang siap
+    di-embed. Tidak memanggil model maupun Qdrant.
+
+    ID point deterministik dari `source_id` + nomor chunk (default: hash teks),
+    sehingga ingest ulang menimpa point yang sama, bukan menduplikasi.
     """
     if not text_content or not text_content.strip():
-        return 0
+        return []
 
-    chunks = chunk_text(text_content, config['chunk_size'], config['chunk_overlap'])
+    chunker = chunker or get_chunker(config)
+    chunks = chunker(text_content)
     if not chunks:
-        return 0
+        return []
 
-    # Buat ID dan metadata untuk setiap chunk
-    chunk_ids = [str(uuid.uuid4()) for _ in chunks]
-    chunk_metadatas = []
+    if source_id is None:
+        source_id = text_source_id(text_content)
+    records = []
     for i, chunk in enumerate(chunks):
         # Setiap chunk mendapatkan salinan metadata asli + nomor chunk-nya
         chunk_meta = metadata.copy()
         chunk_meta['chunk_number'] = i
         chunk_meta['chunk_total'] = len(chunks)
         # Hapus kunci 'text' dari metadata jika ada, karena teks sudah disimpan terpisah
-        chunk_meta.pop('text', None) 
-        chunk_metadatas.append(chunk_meta)
-    
-    # Generate embeddings untuk semua chunk sekaligus
-    embeddings = model.encode(chunks, show_progress_bar=False) # Progress bar bisa diatur per file
-
-    # Upsert ke Qdrant
-    upsert_embeddings(
-        collection_name=config['qdrant_collection'],
-        embeddings=embeddings,
-        texts=chunks,
-        metadatas=chunk_metadatas,
-        ids=chunk_ids
-    )
-    return len(chunks)
+        chunk_meta.pop('text', None)
+        records.append((point_id(source_id, i), chunk, chunk_meta))
+    return records
+
+def embed_and_store_records(records, model, config):
+    """
+    Mengumpulkan record chunk (dari banyak baris/dokumen) menjadi batch
+    berukuran `embed_batch_size`, lalu satu kali `model.encode` dan satu kali
+    bulk upsert per batch.
+    """
+    total = 0
+    cache = get_embedding_cache(config)
+    sparse_encoder = get_sparse_encoder(config)
+    skip_existing = config.get('skip_existing_points', True)
+    store = get_vector_store(config)
+    for batch in batched(records, config.get('embed_batch_size', 512)):
+        if skip_existing:
+            # Point yang ID-nya sudah ada di Qdrant tidak perlu di-embed ulang
+            existing = store.existing_ids(config['qdrant_collection'], [r[0] for r in batch])
+            batch = [r for r in batch if r[0] not in existing]
+            if not batch:
+                continue
+        ids = [r[0] for r in batch]
+        texts = [r[1] for r in batch]
+        metadatas = [r[2] for r in batch]
+        # Chunk yang teksnya sudah pernah di-encode diambil dari cache, bukan dari model
+        embeddings = encode_with_cache(
+            model, texts, embedding_model_id(config), cache,
+            batch_size=config.get('encode_batch_size', 64),
+            show_progress_bar=False
+        )
+        store.upsert_embeddings(
+            collection_name=config['qdrant_collection'],
+            embeddings=embeddings,
+            texts=texts,
+            metadatas=metadatas,
+            ids=ids,
+            sparse_vectors=sparse_encoder.encode_documents(texts) if sparse_encoder else None
+        )
+        # Hasil pencarian yang di-cache untuk koleksi ini sudah basi
+        bump_collection_version(config)
+        total += len(batch)
+    return total
+
+def embed_and_store(text_content: str, metadata: dict, model, config, source_id=None):
+    """
+    Mengambil teks dan metadata, lalu melakukan chunking, embedding, 
+    dan upsert ke Qdrant.
+    """
+    records = make_chunk_records(text_content, metadata, config, source_id, get_chunker(config, model))
+    return embed_and_store_records(records, model, config)
+
+def process_archive_files(archive_parts, model, config):
+    """
+    Ingest file Parquet dari archive tweet. Hanya kolom INGEST_COLUMNS yang dibaca
+    (tanpa full_text, URL, dsb.), dengan tipe yang sudah benar dari schema archive.
+    """
+    print(f"\n--- Memproses {len(archive_parts)} File Archive Parquet ---")
+    if not archive_parts:
+        return 0
+    stats = {}
+    frames = iter_archive_frames(archive_parts, columns=INGEST_COLUMNS, batch_size=config.get('csv_chunksize', 5000))
+    rows = iter_clean_rows(frames, config, stats)
+    records = iter_csv_chunk_records(rows, config, get_chunker(config, model))
+    total_chunks_stored = embed_and_store_records(records, model, config)
+    print(f"--- Selesai Memproses Archive. {stats.get('rows', 0)} baris unik, total chunk baru: {total_chunks_stored} ---")
+    return total_chunks_stored
 
 # FUNGSI KHUSUS UNTUK MEMPROSES FILE PDF
-def process_pdf_files(pdf_files, model, config):
-    """Mengekstrak teks dari setiap PDF dan langsung memprosesnya."""
+def process_pdf_files(pdf_files, model, config, replace_files=()):
+    """
+    Mengekstrak teks dari setiap PDF dan langsung memprosesnya.
+
+    ID point PDF adalah nama file + nomor chunk, jadi untuk file di `replace_files`
+    (isi berubah, atau --full) point lamanya dihapus dulu: tanpa itu chunk baru
+    dilewati oleh skip_existing_points dan chunk di atas jumlah chunk baru tertinggal.
+    """
     print(f"\n--- Memproses {len(pdf_files)} File PDF ---")
     total_chunks_stored = 0
     for pdf_path in pdf_files:
         print(f"Membaca file: {os.path.basename(pdf_path)}...")
-        text = extract_text_from_pdf(pdf_path)
+        text = extract_text_from_pdf(pdf_path, config)
+        if pdf_path in replace_files:
+            get_vector_store(config).delete_points(config['qdrant_collection'],
+                                                   payload_filter(source_file=os.path.basename(pdf_path)))
+            bump_collection_version(config)
+            print(f"-> Point lama dari {os.path.basename(pdf_path)} dihapus")
         
         if text.strip():
             # Metadata untuk PDF sederhana: hanya nama file sumbernya
             metadata = {'source_file': os.path.basename(pdf_path)}
-            chunks_stored = embed_and_store(text, metadata, model, config)
+            chunks_stored = embed_and_store(text, metadata, model, config,
+                                            source_id=f"pdf:{os.path.basename(pdf_path)}")
             print(f"-> Berhasil menyimpan {chunks_stored} chunk dari {os.path.basename(pdf_path)}")
             total_chunks_stored += chunks_stored
         else:
@@ -84,51 +163,99 @@ def process_pdf_files(pdf_files, model, config):
     print(f"--- Selesai Memproses PDF. Total chunk baru: {total_chunks_stored} ---")
 
 # FUNGSI KHUSUS UNTUK MEMPROSES FILE CSV
-def process_csv_files(csv_files, model, config):
-    """Menggabungkan semua CSV, membersihkan, dan memproses baris per baris."""
-    print(f"\n--- Memproses {len(csv_files)} File CSV ---")
-    if not csv_files:
-        return
+CSV_TEXT_COLUMNS = ['processed_text', 'original_text', 'text', 'Tweet', 'tweet_text', 'isi', 'content']
 
-    # Gabungkan semua data CSV menjadi satu DataFrame
-    df = pd.concat([pd.read_csv(f) for f in csv_files], ignore_index=True)
-    
-    # Cari kolom teks yang valid
-    text_column = None
-    for col in ['processed_text', 'original_text', 'text', 'Tweet', 'tweet_text', 'isi', 'content']:
+def find_text_column(df):
+    """Kolom teks pertama dari CSV_TEXT_COLUMNS yang ada dan tidak kosong."""
+    for col in CSV_TEXT_COLUMNS:
         if col in df.columns and not df[col].dropna().empty:
-            print(f"Menggunakan kolom '{col}' untuk teks dari CSV.")
-            text_column = col
-            break
-            
-    if not text_column:
-        print("Warning: Tidak ditemukan kolom teks yang valid di file CSV. Proses CSV dilewati.")
-        return
+            return col
+    return None
 
-    # Bersihkan data
+def clean_csv_frame(df, text_column):
+    """Menambahkan kolom 'text_cleaned' dan membuang baris yang kosong."""
+    df = df.copy()
     df['text_cleaned'] = df[text_column].astype(str).apply(clean_text)
     df = df.dropna(subset=['text_cleaned'])
-    df = df[df['text_cleaned'].str.strip() != '']
-    df = df.drop_duplicates(subset=['text_cleaned'])
-    
-    print(f"Data CSV digabung dan dibersihkan. Memproses {len(df)} baris unik...")
+    return df[df['text_cleaned'].str.strip() != '']
 
-    total_chunks_stored = 0
-    # Proses baris per baris
-    for _, row in df.iterrows():
-        text = row['text_cleaned']
-        # Metadata adalah seluruh baris dari CSV (diubah ke dict)
-        metadata = row.to_dict()
+def iter_csv_chunk_records(rows, config, chunker=None):
+    """Generator record chunk untuk setiap baris (dict) CSV yang sudah dibersihkan."""
+    for metadata in rows:
         # Ganti nilai NaN dengan None agar kompatibel dengan JSON
         for k, v in metadata.items():
             if pd.isna(v):
                 metadata[k] = None
-        
-        chunks_stored = embed_and_store(text, metadata, model, config)
-        total_chunks_stored += chunks_stored
+        # created_at dalam RFC 3339 agar bisa difilter lewat index payload datetime
+        if 'created_at' in metadata:
+            metadata['created_at'] = to_rfc3339(metadata['created_at'])
+        # ID tweet (id_str/id) menjadi sumber ID point bila tersedia
+        source_id = metadata.get('id_str') or metadata.get('id')
+        source_id = f"tweet:{source_id}" if source_id is not None else None
+        yield from make_chunk_records(metadata['text_cleaned'], metadata, config, source_id, chunker)
+
+def load_clean_csv(csv_files):
+    """Membaca, menggabungkan dan membersihkan CSV. Mengembalikan None bila tidak ada kolom teks."""
+    # Gabungkan semua data CSV menjadi satu DataFrame
+    df = pd.concat([pd.read_csv(f, dtype=ID_COLUMN_DTYPES) for f in csv_files], ignore_index=True)
     
-    print(f"--- Selesai Memproses CSV. Total chunk baru: {total_chunks_stored} ---")
+    # Cari kolom teks yang valid
+    text_column = find_text_column(df)
+    if not text_column:
+        return None
+    print(f"Menggunakan kolom '{text_column}' untuk teks dari CSV.")
+
+    # Bersihkan data
+    df = clean_csv_frame(df, text_column)
+    return df.drop_duplicates(subset=['text_cleaned'])
+
+def iter_clean_csv_rows(csv_files, config, stats=None):
+    """
+    Versi streaming dari load_clean_csv: membaca CSV per potongan
+    `csv_chunksize` baris dan deduplikasi lewat hash set di disk, lalu
+    menghasilkan baris (dict) satu per satu. Memori puncak hanya sebesar
+    satu potongan, berapa pun jumlah file backup.
+    """
+    frames = iter_csv_frames(csv_files, config.get('csv_chunksize', 5000))
+    yield from iter_clean_rows(frames, config, stats)
+
+def iter_clean_rows(frames, config, stats=None):
+    """Membersihkan dan mendeduplikasi potongan (path, DataFrame) dari CSV maupun archive Parquet."""
+    seen = SeenHashStore(config.get('dedup_store_path', 'cache/seen_text.sqlite'))
+    # Hash set berlaku per run; duplikat lintas run ditangani oleh ID point deterministik
+    seen.clear()
+    skipped_files = set()
+    try:
+        for path, frame in frames:
+            text_column = find_text_column(frame)
+            if not text_column:
+                if path not in skipped_files:
+                    print(f"Warning: Tidak ditemukan kolom teks yang valid di {path}, dilewati.")
+                    skipped_files.add(path)
+                continue
+            frame = clean_csv_frame(frame, text_column)
+            frame = frame[seen.filter_new(frame['text_cleaned'].tolist())]
+            if stats is not None:
+                stats['rows'] = stats.get('rows', 0) + len(frame)
+            yield from frame.to_dict('records')
+    finally:
+        seen.close()
+
+def process_csv_files(csv_files, model, config):
+    """Membaca CSV secara streaming, membersihkan, lalu embedding dalam batch lintas baris."""
+    print(f"\n--- Memproses {len(csv_files)} File CSV ---")
+    if not csv_files:
+        return 0
 
+    # Chunk dari semua baris dikumpulkan lintas baris, jadi model dan Qdrant
+    # menerima batch berukuran embed_batch_size, bukan satu tweet per panggilan
+    stats = {}
+    rows = iter_clean_csv_rows(csv_files, config, stats)
+    records = iter_csv_chunk_records(rows, config, get_chunker(config, model))
+    total_chunks_stored = embed_and_store_records(records, model, config)
+    
+    print(f"--- Selesai Memproses CSV. {stats.get('rows', 0)} baris unik, total chunk baru: {total_chunks_stored} ---")
+    return total_chunks_stored
 
 if __name__ == '__main__':
     setup_logger()
@@ -137,22 +264,57 @@ if __name__ == '__main__':
 
     # 1. Load Model Satu Kali
     print("Memuat model embedding...")
-    model = SentenceTransformer(config['embedding_model'])
+    model = get_model_from_config(config)
     
     # 2. Temukan semua file
     backup_path = './backup/'
     csv_files = glob.glob(os.path.join(backup_path, '*processed*.csv'))
     pdf_files = glob.glob(os.path.join(backup_path, '*.pdf'))
+    archive_parts = archive_files(config.get('tweet_archive_path', DEFAULT_ARCHIVE_PATH))
     
-    if not csv_files and not pdf_files:
-        print("Warning: Tidak ada file CSV atau PDF yang ditemukan di direktori './backup/'. Keluar.")
+    if not csv_files and not pdf_files and not archive_parts:
+        print("Warning: Tidak ada file CSV, PDF atau archive Parquet yang ditemukan. Keluar.")
         sys.exit()
 
+    # File yang isinya sudah pernah di-ingest dilewati (pakai --full untuk memproses ulang semua)
+    manifest = IngestManifest(config.get('ingest_manifest_path', 'cache/ingest_manifest.json'))
+    # PDF yang berubah (atau semua PDF dengan --full, mis. setelah chunk_strategy diganti) di-ingest ulang dari nol
+    replace_pdfs = set(pdf_files) if '--full' in sys.argv else set(manifest.changed_files(pdf_files))
+    if '--full' not in sys.argv:
+        total_found = len(csv_files) + len(pdf_files) + len(archive_parts)
+        csv_files = manifest.pending_files(csv_files)
+        pdf_files = manifest.pending_files(pdf_files)
+        # File hasil --compact dianggap baru; chunk yang sudah ada dilewati lewat skip_existing_points
+        archive_parts = manifest.pending_files(archive_parts)
+        print(f"{len(csv_files) + len(pdf_files) + len(archive_parts)} dari {total_found} file baru/berubah sejak ingest terakhir.")
+
     # 3. Jalankan proses secara terpisah
     if pdf_files:
-        process_pdf_files(pdf_files, model, config)
+        process_pdf_files(pdf_files, model, config, replace_pdfs)
+        for path in pdf_files:
+            manifest.mark_ingested(path)
+        manifest.save()
     
     if csv_files:
         process_csv_files(csv_files, model, config)
+        for path in csv_files:
+            manifest.mark_ingested(path)
+        manifest.save()
+
+    if archive_parts:
+        process_archive_files(archive_parts, model, config)
+        for path in archive_parts:
+            manifest.mark_ingested(path)
+        manifest.save()
+
+    chunk_stats = get_chunker(config, model).stats.as_dict()
+    print(f"Chunking: {chunk_stats['chunks']} chunk, {chunk_stats['encoded_tokens']} token di-encode, "
+          f"{chunk_stats['truncated_tokens']} token terpotong ({chunk_stats['truncated_ratio']:.0%})")
+
+    cache = get_embedding_cache(config)
+    if cache is not None:
+        stats = cache.stats()
+        print(f"Embedding cache: {stats['hits']} hit / {stats['misses']} miss "
+              f"(hit rate {stats['hit_rate']:.0%}, {stats['entries']} entri)")
 
     print("\n✅ Semua proses selesai.")
\ No newline at end of file
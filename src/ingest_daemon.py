@@ -0,0 +1,239 @@
+#!/usr/bin/env python3
+"""
+Ingestion Daemon
+Long-running replacement for the `schedule` loop of integrated_twitter_pipeline.
+Config, embedding model and vector-store connection are loaded once at start and
+stay warm; each cycle runs as four threads joined by bounded queues:
+
+    fetch -> preprocess/chunk -> embed -> upsert
+
+so one batch is embedded while the previous one is upserted and the next fetch
+is already running. A full queue blocks the stage feeding it (back-pressure), so
+memory stays bounded at `daemon_queue_size` batches of `embed_batch_size` chunks
+per queue. The fetch cursor (high-water mark) of a fetch is only committed once
+every batch of that fetch is upserted; if any of them fails, the cursor stays
+and the tweets are fetched again next cycle. SIGINT/SIGTERM stops fetching, lets the batches
+already queued drain and then exits; a second signal exits immediately.
+
+Usage (dari folder src):
+    python ingest_daemon.py               # fetch setiap daemon_interval_seconds
+    python ingest_daemon.py --once        # satu siklus fetch, kosongkan antrian, keluar
+"""
+
+import argparse
+import logging
+import queue
+import signal
+import threading
+import time
+from datetime import datetime
+import yaml
+from twitter_fetch import fetch_new_tweets
+from fetch_cursor import commit_cursors
+from integrated_twitter_pipeline import (preprocess_tweets, backup_tweets, tweet_chunk_records,
+                                         embed_tweet_chunks, upsert_tweet_chunks)
+from model_registry import get_model_from_config, warmup_from_config
+from qdrant_store import get_vector_store
+from utils import batched, setup_logger
+
+# Penanda akhir antrian: stage meneruskannya ke stage berikutnya lalu berhenti
+_STOP = object()
+
+
+class _FetchProgress:
+    """Cursor marks of one fetch, shared by all of its batches."""
+
+    def __init__(self, marks, batches):
+        self.marks = marks
+        self.pending = batches
+        self.failed = False
+        self._lock = threading.Lock()
+
+    def done(self, ok=True):
+        """Record one finished batch; True when it was the last one and none failed."""
+        with self._lock:
+            self.pending -= 1
+            self.failed = self.failed or not ok
+            return self.pending == 0 and not self.failed
+
+
+class IngestDaemon:
+    """Fetch / preprocess / embed / upsert stages on separate threads."""
+
+    STAGES = ('fetch', 'preprocess', 'embed', 'upsert')
+
+    def __init__(self, config, fetch=fetch_new_tweets, once=False):
+        self.config = config
+        self.fetch = fetch
+        self.once = once
+        self.interval = config.get('daemon_interval_seconds', 7200)
+        size = config.get('daemon_queue_size', 4)
+        self.raw_queue = queue.Queue(maxsize=size)
+        self.chunk_queue = queue.Queue(maxsize=size)
+        self.upsert_queue = queue.Queue(maxsize=size)
+        self.stopping = threading.Event()
+        self.stats = {'fetches': 0, 'tweets': 0, 'batches': 0, 'chunks': 0, 'errors': 0}
+        self._stats_lock = threading.Lock()
+        self._threads = []
+
+    def _count(self, **increments):
+        with self._stats_lock:
+            for key, value in increments.items():
+                self.stats[key] += value
+
+    def warm_up(self):
+        """Load the embedding model and open the vector-store connection before the first fetch."""
+        warmup_from_config(self.config)
+        get_vector_store(self.config)
+
+    # --- stages ---
+
+    def _fetch_loop(self):
+        while not self.stopping.is_set():
+            started = time.time()
+            print(f"📥 [{datetime.now():%Y-%m-%d %H:%M:%S}] Fetching tweets...")
+            try:
+                df_raw, marks = self.fetch(self.config)
+                self._count(fetches=1, tweets=len(df_raw))
+                if df_raw.empty:
+                    print("⚠️  No new tweets collected")
+                else:
+                    print(f"✅ Collected {len(df_raw)} tweets")
+                    # Blocking put: fetch berikutnya menunggu jika preprocess masih tertinggal
+                    self.raw_queue.put((df_raw, marks))
+            except Exception as e:
+                self._count(errors=1)
+                logging.exception("Ingest daemon: fetch failed")
+                print(f"❌ Fetch failed: {e}")
+            if self.once:
+                break
+            # Interval dihitung dari awal fetch; wait() langsung kembali saat shutdown
+            self.stopping.wait(max(0.0, self.interval - (time.time() - started)))
+        self.raw_queue.put(_STOP)
+
+    def _preprocess(self, item):
+        df_raw, marks = item
+        df_processed = preprocess_tweets(df_raw)
+        backup_tweets(df_raw, df_processed, self.config)
+        if df_processed.empty or 'processed_text' not in df_processed.columns:
+            commit_cursors(self.config, marks)
+            return
+        model = get_model_from_config(self.config)
+        ids, texts, metas = tweet_chunk_records(df_processed, self.config, model,
+                                                by_tweet_id='id_str' in df_raw.columns)
+        print(f"🔧 {len(texts)} new chunks from {len(df_processed)} tweets")
+        # Dipecah per embed_batch_size agar embed dan upsert bisa tumpang tindih
+        batch_size = self.config.get('embed_batch_size', 512)
+        batches = list(batched(list(zip(ids, texts, metas)), batch_size))
+        if not batches:
+            commit_cursors(self.config, marks)
+        # Semua batch membawa progress yang sama; stage upsert memajukan cursor setelah batch terakhir
+        progress = _FetchProgress(marks, len(batches))
+        for batch in batches:
+            yield [r[0] for r in batch], [r[1] for r in batch], [r[2] for r in batch], progress
+
+    def _embed(self, batch):
+        ids, texts, metas, progress = batch
+        model = get_model_from_config(self.config)
+        embeddings, sparse_vectors = embed_tweet_chunks(texts, self.config, model)
+        yield ids, texts, metas, embeddings, sparse_vectors, progress
+
+    def _upsert(self, batch):
+        ids, texts, metas, embeddings, sparse_vectors, progress = batch
+        upsert_tweet_chunks(ids, texts, metas, embeddings, sparse_vectors, self.config)
+        if progress.done():
+            commit_cursors(self.config, progress.marks)
+        self._count(batches=1, chunks=len(ids))
+        print(f"💾 Stored {len(ids)} chunks (queued: preprocess {self.raw_queue.qsize()}, "
+              f"embed {self.chunk_queue.qsize()}, upsert {self.upsert_queue.qsize()})")
+        return ()
+
+    def _run_stage(self, name, inbox, outbox, handler):
+        while True:
+            item = inbox.get()
+            if item is _STOP:
+                if outbox is not None:
+                    outbox.put(_STOP)
+                return
+            try:
+                for result in handler(item):
+                    outbox.put(result)
+            except Exception as e:
+                # Batch yang gagal dibuang; stage tetap hidup untuk batch berikutnya
+                self._count(errors=1)
+                logging.exception(f"Ingest daemon: {name} stage failed")
+                print(f"❌ {name} stage failed: {e}")
+                self._discard(item)
+
+    def _discard(self, item):
+        # Batch gagal: cursor fetch-nya tidak dimajukan, tweet diambil ulang siklus berikutnya
+        progress = item[-1]
+        if isinstance(progress, _FetchProgress):
+            progress.done(ok=False)
+            print("⚠️  Fetch cursor held back: a batch of this fetch was not stored")
+
+    # --- lifecycle ---
+
+    def start(self):
+        targets = [
+            self._fetch_loop,
+            lambda: self._run_stage('preprocess', self.raw_queue, self.chunk_queue, self._preprocess),
+            lambda: self._run_stage('embed', self.chunk_queue, self.upsert_queue, self._embed),
+            lambda: self._run_stage('upsert', self.upsert_queue, None, self._upsert),
+        ]
+        # daemon=True: sinyal kedua boleh mematikan proses tanpa menunggu stage
+        self._threads = [threading.Thread(target=target, name=f"ingest-{name}", daemon=True)
+                         for name, target in zip(self.STAGES, targets)]
+        for thread in self._threads:
+            thread.start()
+
+    def stop(self):
+        """Stop fetching; queued batches are still embedded and upserted."""
+        self.stopping.set()
+
+    def join(self):
+        # join dengan timeout agar main thread tetap bisa menerima sinyal
+        for thread in self._threads:
+            while thread.is_alive():
+                thread.join(timeout=1.0)
+
+    def run(self):
+        self.start()
+        self.join()
+        return self.stats
+
+
+def install_signal_handlers(daemon):
+    def handle(signum, frame):
+        if daemon.stopping.is_set():
+            raise KeyboardInterrupt
+        print(f"\n🛑 {signal.Signals(signum).name}: stopping after queued batches "
+              f"(send again to exit now)")
+        daemon.stop()
+
+    signal.signal(signal.SIGINT, handle)
+    signal.signal(signal.SIGTERM, handle)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--config', default='../config.yaml')
+    parser.add_argument('--once', action='store_true', help='Satu siklus fetch lalu keluar setelah antrian kosong')
+    args = parser.parse_args()
+
+    setup_logger()
+    with open(args.config) as f:
+        config = yaml.safe_load(f)
+
+    daemon = IngestDaemon(config, once=args.once)
+    print("🔥 Warming up embedding model and vector store...")
+    daemon.warm_up()
+    install_signal_handlers(daemon)
+    print(f"Ingest daemon aktif: fetch setiap {daemon.interval}s, antrian {daemon.raw_queue.maxsize} batch per stage")
+    stats = daemon.run()
+    print(f"✅ Ingest daemon stopped: {stats['fetches']} fetches, {stats['tweets']} tweets, "
+          f"{stats['chunks']} chunks in {stats['batches']} batches, {stats['errors']} errors")
+
+
+if __name__ == '__main__':
+    main()
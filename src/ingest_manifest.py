@@ -0,0 +1,83 @@
+"""
+Ingestion Manifest
+Remembers which backup files were already embedded (path, size, mtime, content hash),
+so embedding_pipeline.py only processes new or changed files.
+"""
+
+import hashlib
+import json
+import os
+
+
+def file_sha256(path, block_size=1024 * 1024):
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for block in iter(lambda: f.read(block_size), b''):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+class IngestManifest:
+    """JSON manifest of ingested files, keyed by absolute path."""
+
+    def __init__(self, path='cache/ingest_manifest.json'):
+        self.path = path
+        self.entries = {}
+        self._hashes = {}
+        if os.path.exists(path):
+            with open(path, encoding='utf-8') as f:
+                self.entries = json.load(f)
+
+    def _content_hash(self, path, stat):
+        # Hash hanya dihitung ulang bila ukuran/mtime berubah
+        key = os.path.abspath(path)
+        entry = self.entries.get(key)
+        if entry and entry['size'] == stat.st_size and entry['mtime'] == stat.st_mtime:
+            return entry['sha256']
+        cached = self._hashes.get(key)
+        if cached and cached[0] == (stat.st_size, stat.st_mtime):
+            return cached[1]
+        digest = file_sha256(path)
+        self._hashes[key] = ((stat.st_size, stat.st_mtime), digest)
+        return digest
+
+    def pending_files(self, paths):
+        """
+        Filter `paths` down to files whose content has not been ingested yet.
+        Byte-identical copies (same hash under another name) are skipped too.
+        """
+        ingested = {e['sha256'] for e in self.entries.values()}
+        pending = []
+        for path in paths:
+            digest = self._content_hash(path, os.stat(path))
+            if digest in ingested:
+                continue
+            ingested.add(digest)
+            pending.append(path)
+        return pending
+
+    def changed_files(self, paths):
+        """Files ingested before whose content has changed since (their old points are stale)."""
+        changed = []
+        for path in paths:
+            entry = self.entries.get(os.path.abspath(path))
+            if entry and entry['sha256'] != self._content_hash(path, os.stat(path)):
+                changed.append(path)
+        return changed
+
+    def mark_ingested(self, path):
+        stat = os.stat(path)
+        self.entries[os.path.abspath(path)] = {
+            'size': stat.st_size,
+            'mtime': stat.st_mtime,
+            'sha256': self._content_hash(path, stat),
+        }
+
+    def save(self):
+        directory = os.path.dirname(self.path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        tmp_path = self.path + '.tmp'
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(self.entries, f, indent=2)
+        os.replace(tmp_path, self.path)
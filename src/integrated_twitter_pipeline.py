@@ -9,13 +9,143 @@ import sys
 import time
 import pandas as pd
 from datetime import datetime
-from twitter_fetch import fetch_with_harvest
+from twitter_fetch import fetch_new_tweets
+from fetch_cursor import commit_cursors
 import yaml
-from sentence_transformers import SentenceTransformer
-from utils import clean_text, chunk_text
-from src.qdrant_store import upsert_embeddings
-import uuid
-import schedule
+from utils import point_id, text_source_id, to_rfc3339_series
+from chunking import get_chunker
+from text_normalizer import TWEET_NORMALIZER
+from qdrant_store import get_vector_store
+from retrieval_cache import bump_collection_version
+from model_registry import get_model_from_config, warmup_from_config, embedding_model_id
+from embedding_cache import get_embedding_cache, encode_with_cache
+from sparse_encoder import get_sparse_encoder
+from tweet_archive import append_tweets, DEFAULT_ARCHIVE_PATH
+
+def preprocess_tweets(df_raw):
+    """Normalize the tweet text column into `processed_text` and keep the columns we store."""
+    text_column = None
+    for col in df_raw.columns:
+        if 'text' in col.lower() or 'content' in col.lower():
+            text_column = col
+            break
+    if text_column is None and 'full_text' in df_raw.columns:
+        text_column = 'full_text'
+
+    if not text_column:
+        print("⚠️  No text column found, skipping preprocessing")
+        return df_raw
+
+    print(f"✅ Using column: {text_column}")
+    df_raw['processed_text'] = TWEET_NORMALIZER.normalize_series(df_raw[text_column])
+    return pd.DataFrame({
+        'id': df_raw['id_str'] if 'id_str' in df_raw.columns else range(len(df_raw)),
+        'original_text': df_raw[text_column],
+        'processed_text': df_raw['processed_text'],
+        'created_at': df_raw['created_at'] if 'created_at' in df_raw.columns else '',
+        'username': df_raw['username'] if 'username' in df_raw.columns else '',
+        'retweet_count': df_raw.get('retweet_count', 0),
+        'favorite_count': df_raw.get('favorite_count', 0)
+    })
+
+
+def backup_tweets(df_raw, df_processed, config=None):
+    """
+    Archive the run: append to the Parquet tweet archive (`tweet_archive_format: parquet`,
+    raw columns + processed_text in one typed row) or write the old timestamped CSVs.
+    """
+    config = config or {}
+    if config.get('tweet_archive_format', 'parquet') == 'parquet':
+        path = config.get('tweet_archive_path', DEFAULT_ARCHIVE_PATH)
+        rows = append_tweets(df_raw, path)
+        print(f"🗄️  Archived {rows} tweets to {path}")
+        return [path]
+    timestamp = datetime.now().strftime('%Y%m%d_%H%M%S')
+    os.makedirs('backup', exist_ok=True)
+    backup_raw = f"backup/tweets_raw_{timestamp}.csv"
+    backup_processed = f"backup/tweets_processed_{timestamp}.csv"
+    df_raw.to_csv(backup_raw, index=False)
+    df_processed.to_csv(backup_processed, index=False)
+    return [backup_raw, backup_processed]
+
+
+# Payload point tweet: hanya field yang dipakai filter / tampilan. Teks chunk disimpan
+# sebagai 'text' oleh upsert_embeddings; original_text / processed_text tidak ikut disalin
+TWEET_PAYLOAD_FIELDS = ['id', 'created_at', 'username', 'retweet_count', 'favorite_count']
+
+
+def explode_tweet_chunks(df_processed, chunker, by_tweet_id=True, payload_fields=TWEET_PAYLOAD_FIELDS):
+    """
+    Column-wise chunking of processed tweets: one chunker call per unique text, then
+    Series.explode to one row per chunk. Returns (ids, texts, metadatas) where each
+    metadata holds only `payload_fields` + the chunk number.
+    """
+    df_embed = df_processed.drop_duplicates(subset='processed_text').reset_index(drop=True)
+    texts = df_embed['processed_text'].fillna('').astype(str)
+    if by_tweet_id:
+        # ID point deterministik dari id tweet, jadi run yang overlap tidak menduplikasi point
+        source_ids = 'tweet:' + df_embed['id'].astype(str)
+    else:
+        source_ids = texts.map(text_source_id)
+    chunks = texts.map(chunker).explode().dropna()
+    if chunks.empty:
+        return [], [], []
+    chunk_numbers = chunks.groupby(level=0).cumcount()
+    ids = [point_id(s, c) for s, c in zip(source_ids.loc[chunks.index], chunk_numbers)]
+
+    fields = [f for f in payload_fields if f in df_embed.columns]
+    payload = df_embed[fields].copy()
+    # created_at dalam RFC 3339 agar bisa difilter lewat index payload datetime
+    if 'created_at' in payload.columns:
+        payload['created_at'] = to_rfc3339_series(payload['created_at'])
+    # Payload dibangun per tweet lalu diulang per chunk, bukan dari seluruh baris
+    payload = payload.astype(object).where(payload.notna(), None).loc[chunks.index]
+    payload['chunk'] = chunk_numbers.to_numpy()
+    return ids, chunks.tolist(), payload.to_dict('records')
+
+
+def tweet_chunk_records(df_processed, config, model, by_tweet_id=True):
+    """
+    Chunk processed tweets into (ids, texts, metadatas), dropping chunks whose point
+    already exists in the vector store.
+    """
+    ids, texts, metas = explode_tweet_chunks(df_processed, get_chunker(config, model), by_tweet_id)
+    # Tweet yang sudah tersimpan di run sebelumnya tidak di-embed ulang
+    existing = get_vector_store(config).existing_ids(config['qdrant_collection'], ids)
+    if existing:
+        keep = [i for i, chunk_id in enumerate(ids) if chunk_id not in existing]
+        ids = [ids[i] for i in keep]
+        texts = [texts[i] for i in keep]
+        metas = [metas[i] for i in keep]
+    return ids, texts, metas
+
+
+def embed_tweet_chunks(texts, config, model, show_progress_bar=False):
+    """Dense embeddings (through the embedding cache) and, with hybrid search on, BM25 vectors."""
+    cache = get_embedding_cache(config)
+    embeddings = encode_with_cache(model, texts, embedding_model_id(config), cache,
+                                   show_progress_bar=show_progress_bar)
+    if cache is not None:
+        print(f"Embedding cache hit rate: {cache.stats()['hit_rate']:.0%}")
+    sparse_encoder = get_sparse_encoder(config)
+    sparse_vectors = sparse_encoder.encode_documents(texts) if sparse_encoder else None
+    return embeddings, sparse_vectors
+
+
+def upsert_tweet_chunks(ids, texts, metas, embeddings, sparse_vectors, config):
+    stats = get_vector_store(config).upsert_embeddings(
+        collection_name=config['qdrant_collection'],
+        embeddings=embeddings,
+        texts=texts,
+        metadatas=metas,
+        ids=ids,
+        sparse_vectors=sparse_vectors
+    )
+    print(f"Upsert throughput: {stats['points_per_sec']:.0f} points/sec")
+    # Cache retrieval di proses lain (Streamlit, rag.py) membaca versi ini
+    bump_collection_version(config)
+    return stats
+
 
 def integrated_collection_and_preprocessing():
     """Complete pipeline: collect tweets, preprocess, embed, and upsert to Qdrant"""
@@ -32,111 +162,39 @@ def integrated_collection_and_preprocessing():
 
         # Step 1: Collect tweets
         print("📥 Step 1: Collecting tweets...")
-        df_raw = fetch_with_harvest(config)
+        df_raw, cursor_marks = fetch_new_tweets(config)
 
         if df_raw.empty:
-            print("⚠️  No tweets collected, skipping preprocessing")
+            print("⚠️  No new tweets collected, skipping preprocessing")
             return
 
         print(f"✅ Collected {len(df_raw)} tweets")
 
         # Step 2: Preprocess tweets
         print("\n🔧 Step 2: Preprocessing tweets...")
-
-        text_column = None
-        for col in df_raw.columns:
-            if 'text' in col.lower() or 'content' in col.lower():
-                text_column = col
-                break
-        if text_column is None and 'full_text' in df_raw.columns:
-            text_column = 'full_text'
-
-        if text_column:
-            print(f"✅ Using column: {text_column}")
-
-            def better_clean_text(text):
-                if not isinstance(text, str):
-                    return ""
-                import re, string
-                text = text.lower()
-                text = re.sub(r'&amp;', 'dan', text)
-                text = re.sub(r'&lt;|&gt;|&quot;|&#39;', '', text)
-                text = re.sub(r'http\S+', '', text)
-                text = re.sub(r'@\w+', '', text)
-                text = re.sub(r'#(\w+)', r'\1', text)
-                text = re.sub(r'\d+', '', text)
-                text = text.translate(str.maketrans('', '', string.punctuation))
-                text = re.sub(r'[^\w\s]', '', text)
-                text = re.sub(r'\s+', ' ', text)
-                text = re.sub(r'\b[a-z]\b', '', text)
-                stopwords = [
-                    'yang','dan','di','ke','dari','untuk','dengan','ini','itu','atau','juga','bisa',
-                    'akan','sudah','masih','belum','tidak','bukan','ada','saya','kamu','dia','mereka',
-                    'kami','kita','anda','nya','lah','kah','tah','pun','per','para','oleh','kepada',
-                    'terhadap','antara','dalam','atas','bawah','depan','belakang','samping','luar',
-                    'sebelah','setelah','sebelum','ketika','sambil','selama','hingga','sampai','sejak',
-                    'karena','jika','kalau','meskipun','walaupun','sehingga','agar','supaya','seperti',
-                    'bagai','sebagai','adalah','ialah','yaitu','yakni','diantara','didalam','keluar',
-                    'dikeluarkan','masuk','dimasukkan'
-                ]
-                words = text.split()
-                filtered = [w for w in words if w not in stopwords]
-                return ' '.join(filtered).strip()
-
-            df_raw['processed_text'] = df_raw[text_column].apply(better_clean_text)
-
-            df_processed = pd.DataFrame({
-                'id': df_raw['id_str'] if 'id_str' in df_raw.columns else range(len(df_raw)),
-                'original_text': df_raw[text_column],
-                'processed_text': df_raw['processed_text'],
-                'created_at': df_raw['created_at'] if 'created_at' in df_raw.columns else '',
-                'username': df_raw['username'] if 'username' in df_raw.columns else '',
-                'retweet_count': df_raw.get('retweet_count', 0),
-                'favorite_count': df_raw.get('favorite_count', 0)
-            })
-
+        df_processed = preprocess_tweets(df_raw)
+        if df_processed is not df_raw:
             print("✅ Preprocessing completed")
 
-        else:
-            print("⚠️  No text column found, skipping preprocessing")
-            df_processed = df_raw
-
-        # Step 3: Create timestamped backup
-        timestamp = datetime.now().strftime('%Y%m%d_%H%M%S')
-        os.makedirs('backup', exist_ok=True)
-        backup_raw = f"backup/tweets_raw_{timestamp}.csv"
-        backup_processed = f"backup/tweets_processed_{timestamp}.csv"
-
-        df_raw.to_csv(backup_raw, index=False)
-        df_processed.to_csv(backup_processed, index=False)
+        # Step 3: Archive tweets (Parquet archive atau backup CSV)
+        backup_tweets(df_raw, df_processed, config)
 
         # Step 4: Embedding & upsert ke Qdrant
         if not df_processed.empty and 'processed_text' in df_processed.columns:
             print("\n🚀 Langsung embedding dan upsert ke Qdrant...")
-            df_embed = df_processed.copy()
-            df_embed['text'] = df_embed['processed_text']
-            df_embed = df_embed.drop_duplicates(subset='text')
-            model = SentenceTransformer(config['embedding_model'])
-            all_ids, all_texts, all_metas = [], [], []
-            for idx, row in df_embed.iterrows():
-                from utils import chunk_text
-                chunks = chunk_text(row['text'], config['chunk_size'], config['chunk_overlap'])
-                for i, chunk in enumerate(chunks):
-                    chunk_id = str(uuid.uuid4())
-                    all_ids.append(chunk_id)
-                    all_texts.append(chunk)
-                    all_metas.append({**row.to_dict(), 'chunk': i})
+            # Model diambil dari registry, jadi hanya dimuat sekali per proses
+            model = get_model_from_config(config)
+            all_ids, all_texts, all_metas = tweet_chunk_records(
+                df_processed, config, model, by_tweet_id='id_str' in df_raw.columns)
             if all_texts:
-                all_embeddings = model.encode(all_texts, show_progress_bar=True)
-                upsert_embeddings(
-                    collection_name=config['qdrant_collection'],
-                    embeddings=all_embeddings,
-                    texts=all_texts,
-                    metadatas=all_metas,
-                    ids=all_ids
-                )
+                all_embeddings, sparse_vectors = embed_tweet_chunks(all_texts, config, model,
+                                                                    show_progress_bar=True)
+                upsert_tweet_chunks(all_ids, all_texts, all_metas, all_embeddings, sparse_vectors, config)
             print(f"Stored {len(all_ids)} new chunks in Qdrant.")
 
+        # Cursor baru maju setelah tweet tersimpan; run yang gagal mengulang dari cursor lama
+        commit_cursors(config, cursor_marks)
+
         print("\n✅ Pipeline completed successfully!")
 
     except Exception as e:
@@ -145,9 +203,19 @@ def integrated_collection_and_preprocessing():
         traceback.print_exc()
 
 if __name__ == '__main__':
+    import schedule
+
+    # Muat model embedding sekali saat start, dipakai ulang oleh setiap run terjadwal
+    try:
+        config_path = os.path.join(os.path.dirname(__file__), 'config.yaml')
+        with open(config_path) as f:
+            startup_config = yaml.safe_load(f)
+        warmup_from_config(startup_config)
+    except Exception as e:
+        print(f"⚠️  Model warm-up skipped: {e}")
     # Jalankan sekali saat start
     integrated_collection_and_preprocessing()
-    # Jadwalkan setiap 2 jam
+    # Jadwalkan setiap 2 jam (mode daemon dengan stage paralel: python ingest_daemon.py)
     schedule.every(2).hours.do(integrated_collection_and_preprocessing)
     print("Scheduler aktif, pipeline akan jalan setiap 2 jam.")
     while True:
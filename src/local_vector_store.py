@@ -0,0 +1,332 @@
+"""
+Local Vector Store
+In-process vector index for dev, CI and edge deployments without the Qdrant
+container (config.yaml `vector_backend: local`).
+
+Each collection is a directory with:
+  vectors.npy   float32 rows (L2-normalized, so cosine = dot product), memory-mapped
+                read-only; upserts write through a short-lived writable map, and
+                readers remap when a capacity growth replaces the file
+  points.jsonl  append-only sidecar of {"row", "id", "payload"}; a later line for the
+                same row overwrites the earlier one, {"row", "deleted": true} removes it
+
+Search is exact: blocks of the memory-mapped matrix are multiplied with the query
+batch and the top-k per block is taken with np.argpartition. Sparse (BM25) vectors
+are not stored; hybrid queries run dense-only on this backend.
+"""
+
+import json
+import logging
+import os
+import threading
+import time
+from datetime import datetime
+import numpy as np
+from qdrant_client.http import models as qmodels
+from qdrant_store import VectorStore
+from utils import batched
+
+# Jumlah baris matrix yang dikalikan sekaligus; membatasi memori skor sementara
+SEARCH_BLOCK_ROWS = 65536
+INITIAL_CAPACITY = 1024
+
+
+def _json_default(value):
+    # numpy scalar (mis. int64 dari DataFrame.to_dict) -> tipe Python
+    if hasattr(value, 'item'):
+        return value.item()
+    return str(value)
+
+
+def _as_datetime(value):
+    if isinstance(value, datetime):
+        return value
+    return datetime.fromisoformat(str(value).replace('Z', '+00:00'))
+
+
+def _condition_matches(payload, condition):
+    if not isinstance(condition, qmodels.FieldCondition):
+        raise ValueError(f"Local vector store does not support filter condition {type(condition).__name__}")
+    value = payload.get(condition.key)
+    if condition.match is not None:
+        if isinstance(condition.match, qmodels.MatchValue):
+            return value == condition.match.value
+        if isinstance(condition.match, qmodels.MatchAny):
+            return value in condition.match.any
+        raise ValueError(f"Local vector store does not support {type(condition.match).__name__}")
+    if condition.range is not None:
+        if value is None:
+            return False
+        bounds = condition.range
+        try:
+            if isinstance(bounds, qmodels.DatetimeRange):
+                value = _as_datetime(value)
+                convert = _as_datetime
+            else:
+                value = float(value)
+                convert = float
+        except (TypeError, ValueError):
+            return False
+        if bounds.gt is not None and not value > convert(bounds.gt):
+            return False
+        if bounds.gte is not None and not value >= convert(bounds.gte):
+            return False
+        if bounds.lt is not None and not value < convert(bounds.lt):
+            return False
+        if bounds.lte is not None and not value <= convert(bounds.lte):
+            return False
+        return True
+    raise ValueError("Local vector store supports match and range conditions only")
+
+
+def payload_matches(payload, query_filter):
+    """Evaluate the `must` / `must_not` part of a Qdrant Filter against one payload."""
+    if query_filter is None:
+        return True
+    if query_filter.should:
+        raise ValueError("Local vector store does not support 'should' filters")
+    if any(not _condition_matches(payload, c) for c in query_filter.must or []):
+        return False
+    if any(_condition_matches(payload, c) for c in query_filter.must_not or []):
+        return False
+    return True
+
+
+class LocalCollection:
+    """One collection directory (one writer at a time). Reads pick up writes made by other processes."""
+
+    def __init__(self, directory):
+        self.directory = directory
+        self.vectors_path = os.path.join(directory, 'vectors.npy')
+        self.log_path = os.path.join(directory, 'points.jsonl')
+        self.ids = []        # row -> id point
+        self.payloads = []   # row -> payload
+        self.rows = {}       # str(id) -> row
+        self.deleted = 0     # baris yang dihapus (tetap ada di vectors.npy, disaring saat search)
+        self._log_offset = 0
+        self._vectors = None
+        self._vectors_stamp = None
+        self._lock = threading.RLock()
+        self.refresh()
+
+    @property
+    def count(self):
+        return len(self.ids)
+
+    def _apply(self, record):
+        row = record['row']
+        if record.get('deleted'):
+            key = str(self.ids[row])
+            if self.payloads[row] is not None:
+                self.deleted += 1
+            if self.rows.get(key) == row:
+                del self.rows[key]
+            self.ids[row] = None
+            self.payloads[row] = None
+            return
+        if row == len(self.ids):
+            self.ids.append(record['id'])
+            self.payloads.append(record['payload'])
+        else:
+            self.ids[row] = record['id']
+            self.payloads[row] = record['payload']
+        self.rows[str(record['id'])] = row
+
+    def refresh(self):
+        with self._lock:
+            if os.path.exists(self.log_path) and os.path.getsize(self.log_path) > self._log_offset:
+                with open(self.log_path, 'rb') as f:
+                    f.seek(self._log_offset)
+                    for line in f:
+                        # Baris terakhir yang belum lengkap (sedang ditulis) dibaca nanti
+                        if not line.endswith(b'\n'):
+                            break
+                        self._apply(json.loads(line))
+                        self._log_offset += len(line)
+            if os.path.exists(self.vectors_path):
+                st = os.stat(self.vectors_path)
+                stamp = (st.st_ino, st.st_size)
+                if stamp != self._vectors_stamp:
+                    # Read-only: proses pembaca (RAG) tidak memegang map yang bisa ditulis
+                    self._vectors = np.load(self.vectors_path, mmap_mode='r')
+                    self._vectors_stamp = stamp
+
+    def _ensure_capacity(self, dim, needed):
+        if self._vectors is not None and self._vectors.shape[1] != dim:
+            raise ValueError(
+                f"Collection '{os.path.basename(self.directory)}' stores vectors of size "
+                f"{self._vectors.shape[1]}, got {dim}"
+            )
+        capacity = 0 if self._vectors is None else self._vectors.shape[0]
+        if needed <= capacity:
+            return
+        # Kapasitas digandakan agar upsert bertahap tidak menyalin ulang matrix setiap kali
+        tmp = self.vectors_path + '.tmp.npy'
+        grown = np.lib.format.open_memmap(tmp, mode='w+', dtype=np.float32,
+                                          shape=(max(needed, capacity * 2, INITIAL_CAPACITY), dim))
+        if self._vectors is not None:
+            grown[:self.count] = self._vectors[:self.count]
+        grown.flush()
+        del grown
+        self._vectors = None
+        os.replace(tmp, self.vectors_path)
+        self._vectors_stamp = None
+        self.refresh()
+
+    def upsert(self, points):
+        with self._lock:
+            self.refresh()
+            records = []
+            new_rows = {}
+            for point in points:
+                key = str(point[0])
+                row = self.rows.get(key, new_rows.get(key))
+                if row is None:
+                    row = new_rows[key] = self.count + len(new_rows)
+                records.append((point, row))
+            if not records:
+                return 0
+            vectors = np.asarray([r[0][1] for r in records], dtype=np.float32)
+            norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+            vectors /= np.where(norms == 0, 1, norms)
+            rows = np.array([r[1] for r in records])
+            self._ensure_capacity(vectors.shape[1], int(rows.max()) + 1)
+            # Map tulis hanya hidup selama upsert; self._vectors tetap read-only dan melihat
+            # perubahannya karena keduanya memetakan file yang sama
+            writable = np.load(self.vectors_path, mmap_mode='r+')
+            writable[rows] = vectors
+            writable.flush()
+            del writable
+            # Vektor ditulis dulu; baris log menjadikan point terlihat oleh pembaca
+            lines = [json.dumps({'row': int(row), 'id': point[0], 'payload': point[2]},
+                                ensure_ascii=False, default=_json_default) + '\n'
+                     for point, row in records]
+            with open(self.log_path, 'a', encoding='utf-8') as f:
+                f.writelines(lines)
+            self.refresh()
+            return len(records)
+
+    def delete(self, query_filter):
+        """Delete the points matching `query_filter`; returns how many."""
+        with self._lock:
+            self.refresh()
+            rows = [row for row, payload in enumerate(self.payloads)
+                    if payload is not None and payload_matches(payload, query_filter)]
+            if rows:
+                with open(self.log_path, 'a', encoding='utf-8') as f:
+                    f.writelines(json.dumps({'row': row, 'deleted': True}) + '\n' for row in rows)
+                self.refresh()
+            return len(rows)
+
+    def _mask(self, query_filter):
+        if query_filter is None and not self.deleted:
+            return None
+        return np.fromiter((p is not None and payload_matches(p, query_filter) for p in self.payloads),
+                           dtype=bool, count=self.count)
+
+    def search_batch(self, queries, top_k, query_filter=None, project=None):
+        """Exact top-k per query; `project` maps a stored payload to the returned one."""
+        self.refresh()
+        count = self.count
+        queries = np.asarray(queries, dtype=np.float32)
+        if queries.ndim == 1:
+            queries = queries[None, :]
+        if count == 0 or self._vectors is None:
+            return [[] for _ in queries]
+        queries = queries / np.maximum(np.linalg.norm(queries, axis=1, keepdims=True), 1e-12)
+        mask = self._mask(query_filter)
+
+        best_scores = np.full((len(queries), 0), -np.inf, dtype=np.float32)
+        best_rows = np.zeros((len(queries), 0), dtype=np.int64)
+        for start in range(0, count, SEARCH_BLOCK_ROWS):
+            stop = min(start + SEARCH_BLOCK_ROWS, count)
+            scores = queries @ self._vectors[start:stop].T
+            if mask is not None:
+                scores[:, ~mask[start:stop]] = -np.inf
+            k = min(top_k, stop - start)
+            part = np.argpartition(-scores, k - 1, axis=1)[:, :k]
+            best_scores = np.concatenate([best_scores, np.take_along_axis(scores, part, axis=1)], axis=1)
+            best_rows = np.concatenate([best_rows, part + start], axis=1)
+            if best_scores.shape[1] > top_k:
+                keep = np.argpartition(-best_scores, top_k - 1, axis=1)[:, :top_k]
+                best_scores = np.take_along_axis(best_scores, keep, axis=1)
+                best_rows = np.take_along_axis(best_rows, keep, axis=1)
+
+        results = []
+        order = np.argsort(-best_scores, axis=1)
+        for q in range(len(queries)):
+            hits = []
+            for j in order[q]:
+                score = float(best_scores[q, j])
+                if score == -np.inf:
+                    continue
+                row = int(best_rows[q, j])
+                payload = project(self.payloads[row]) if project else self.payloads[row]
+                hits.append(qmodels.ScoredPoint(id=self.ids[row], version=0, score=score, payload=payload))
+            results.append(hits)
+        return results
+
+
+class LocalVectorStore(VectorStore):
+    """`vector_backend: local` - one LocalCollection per collection under `path`."""
+
+    def __init__(self, path):
+        self.path = path
+        self._collections = {}
+        self._lock = threading.Lock()
+        self._sparse_warned = False
+
+    def _collection(self, collection_name, create=False):
+        directory = os.path.join(self.path, collection_name)
+        with self._lock:
+            collection = self._collections.get(collection_name)
+            if collection is None:
+                if not create and not os.path.isdir(directory):
+                    return None
+                os.makedirs(directory, exist_ok=True)
+                collection = self._collections[collection_name] = LocalCollection(directory)
+        return collection
+
+    def upsert(self, collection_name, points):
+        collection = self._collection(collection_name, create=True)
+        started = time.perf_counter()
+        stats = {'points': 0, 'batches': 0}
+        for batch in batched(points, 4096):
+            if len(batch[0]) > 3 and not self._sparse_warned:
+                self._sparse_warned = True
+                logging.warning("Local vector store keeps dense vectors only; sparse vectors are ignored")
+            stats['points'] += collection.upsert(batch)
+            stats['batches'] += 1
+        stats['seconds'] = time.perf_counter() - started
+        stats['points_per_sec'] = stats['points'] / stats['seconds'] if stats['seconds'] > 0 else 0.0
+        return stats
+
+    def existing_ids(self, collection_name, ids):
+        collection = self._collection(collection_name)
+        if collection is None:
+            return set()
+        collection.refresh()
+        return {str(i) for i in ids if str(i) in collection.rows}
+
+    def retrieve_payloads(self, collection_name, ids):
+        collection = self._collection(collection_name)
+        if collection is None:
+            return {}
+        collection.refresh()
+        rows = ((str(i), collection.rows.get(str(i))) for i in ids)
+        return {pid: dict(collection.payloads[row]) for pid, row in rows if row is not None}
+
+    def delete_points(self, collection_name, query_filter):
+        collection = self._collection(collection_name)
+        if collection is not None:
+            collection.delete(query_filter)
+
+    def search(self, collection_name, query_embedding, top_k=5, query_filter=None, query_sparse=None):
+        return self.search_batch(collection_name, [query_embedding], top_k, query_filter)[0]
+
+    def search_batch(self, collection_name, query_embeddings, top_k=5, query_filter=None, query_sparse=None):
+        collection = self._collection(collection_name)
+        if collection is None:
+            return [[] for _ in query_embeddings]
+        project = self.projection.project if self.projection is not None else None
+        return collection.search_batch(query_embeddings, top_k, query_filter, project)
@@ -0,0 +1,53 @@
+#!/usr/bin/env python3
+"""
+Collection Migration
+Compares the Qdrant collection with `collection_spec` in config.yaml (HNSW params,
+int8 scalar quantization, on-disk vectors) and, with --apply, updates it in place.
+--slim-payloads moves the payload_side_fields of points stored before the payload
+projection into the side store (see payload_store).
+
+Usage (dari folder src):
+    python migrate_collection.py            # tampilkan perbedaan saja
+    python migrate_collection.py --apply
+    python migrate_collection.py --slim-payloads
+"""
+
+import argparse
+import yaml
+from qdrant_store import migrate_collection, collection_spec, qdrant_connection, slim_collection_payloads
+from payload_store import payload_projection
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--config', default='../config.yaml')
+    parser.add_argument('--collection', help='Default: qdrant_collection dari config')
+    parser.add_argument('--apply', action='store_true', help='Terapkan perubahan ke koleksi')
+    parser.add_argument('--slim-payloads', action='store_true',
+                        help='Pindahkan field payload_side_fields dari point lama ke side store')
+    args = parser.parse_args()
+
+    with open(args.config) as f:
+        config = yaml.safe_load(f)
+    collection = args.collection or config['qdrant_collection']
+    if args.slim_payloads:
+        projection = payload_projection(config)
+        if projection is None:
+            print("No payload projection configured (payload_store_fields / payload_side_fields).")
+        else:
+            changed = slim_collection_payloads(collection, projection, **qdrant_connection(config))
+            print(f"✅ Slimmed payloads of {changed} points in '{collection}'.")
+    diff = migrate_collection(collection, collection_spec(config), apply=args.apply, **qdrant_connection(config))
+    if not diff:
+        print(f"Collection '{collection}' already matches collection_spec.")
+        return
+    for name, (current, wanted) in diff.items():
+        print(f"{name:>24}: {current} -> {wanted}")
+    if args.apply:
+        print("✅ Applied; Qdrant re-indexes in the background.")
+    else:
+        print("Run with --apply to update the collection.")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,127 @@
+"""
+Embedding Model Registry
+Keeps one loaded encoder per (model name, device, backend) for the whole process,
+so callers (RAG, Streamlit, ingestion pipelines) never reload weights per request.
+Backends: 'torch' (SentenceTransformer), 'onnx' and 'onnx-int8' (onnx_encoder).
+"""
+
+import gc
+import logging
+import threading
+
+_models = {}
+_lock = threading.Lock()
+
+
+BACKENDS = ('torch', 'onnx', 'onnx-int8')
+
+
+def _registry_key(model_name, device=None, backend='torch'):
+    return (model_name, device or 'auto', backend)
+
+
+def _load_model(model_name, device=None, backend='torch', **options):
+    logging.info(f"Model registry: loading {model_name} (device={device or 'auto'}, backend={backend})")
+    if backend == 'torch':
+        from sentence_transformers import SentenceTransformer
+        return SentenceTransformer(model_name, device=device)
+    if backend in ('onnx', 'onnx-int8'):
+        from onnx_encoder import load_onnx_encoder
+        return load_onnx_encoder(model_name, quantize=backend == 'onnx-int8', **options)
+    raise ValueError(f"Unknown embedding_backend: {backend} (expected one of {BACKENDS})")
+
+
+def get_model(model_name, device=None, backend='torch', **options):
+    """
+    Return the shared model instance, loading it on first use.
+
+    Args:
+        model_name (str): SentenceTransformer model name or path
+        device (str): Torch device ('cpu', 'cuda', ...). None lets the library pick.
+        backend (str): 'torch', 'onnx' or 'onnx-int8'
+        **options: OnnxSentenceEncoder options (only used when the model is loaded)
+    """
+    key = _registry_key(model_name, device, backend)
+    model = _models.get(key)
+    if model is not None:
+        return model
+    with _lock:
+        # Cek ulang di dalam lock agar dua thread tidak memuat model yang sama
+        model = _models.get(key)
+        if model is None:
+            model = _load_model(model_name, device, backend, **options)
+            _models[key] = model
+    return model
+
+
+def onnx_options(config):
+    """OnnxSentenceEncoder options taken from config.yaml."""
+    return {
+        'cache_dir': config.get('onnx_cache_dir', 'cache/onnx'),
+        'batch_size': config.get('onnx_batch_size', 64),
+        'num_threads': config.get('onnx_threads', 0),
+        'max_batch_tokens': config.get('onnx_max_batch_tokens', 8192),
+    }
+
+
+def get_model_from_config(config):
+    """Shortcut for the `embedding_model` / `embedding_device` / `embedding_backend` keys of config.yaml."""
+    backend = config.get('embedding_backend', 'torch')
+    options = onnx_options(config) if backend != 'torch' else {}
+    return get_model(config['embedding_model'], config.get('embedding_device'), backend, **options)
+
+
+def embedding_model_id(config):
+    """
+    Model identity for embedding caches: ONNX (and int8) vectors differ slightly
+    from the PyTorch ones, so they must not share cache entries.
+    """
+    backend = config.get('embedding_backend', 'torch')
+    return config['embedding_model'] if backend == 'torch' else f"{config['embedding_model']}@{backend}"
+
+
+def warmup(model_names, device=None, backend='torch', **options):
+    """
+    Load models ahead of time and run one dummy encode so the first real
+    request does not pay for lazy initialisation.
+    """
+    if isinstance(model_names, str):
+        model_names = [model_names]
+    for name in model_names:
+        model = get_model(name, device, backend, **options)
+        model.encode(["warmup"], show_progress_bar=False)
+
+
+def warmup_from_config(config):
+    """warmup() for the embedding model configured in config.yaml."""
+    get_model_from_config(config).encode(["warmup"], show_progress_bar=False)
+
+
+def evict(model_name=None, device=None):
+    """
+    Drop models from the registry. With no arguments every model is evicted;
+    with only `model_name` all devices and backends of that model are evicted.
+
+    Returns:
+        int: Number of evicted models
+    """
+    with _lock:
+        if model_name is None:
+            keys = list(_models)
+        elif device is None:
+            keys = [k for k in _models if k[0] == model_name]
+        else:
+            keys = [k for k in _models if k[0] == model_name and k[1] == (device or 'auto')]
+        evicted = 0
+        for key in keys:
+            if _models.pop(key, None) is not None:
+                evicted += 1
+                logging.info(f"Model registry: evicted {key[0]} (device={key[1]}, backend={key[2]})")
+    if evicted:
+        gc.collect()
+    return evicted
+
+
+def loaded_models():
+    """List of (model name, device, backend) tuples currently held in memory."""
+    return list(_models)
@@ -0,0 +1,179 @@
+"""
+ONNX Sentence Encoder
+CPU encoder backend (config.yaml `embedding_backend: onnx` or `onnx-int8`) with the
+same interface the pipelines use from SentenceTransformer: `encode`, `tokenizer`,
+`max_seq_length` and `get_sentence_embedding_dimension`.
+
+The configured sentence-transformer is exported once to ONNX (optionally int8
+dynamically quantized) under `onnx_cache_dir`; later runs only need onnxruntime
+and the saved tokenizer. Inputs are sorted by token length and batched under a
+token budget, so short tweets are not padded up to the longest text in the run.
+"""
+
+import json
+import logging
+import os
+import re
+import threading
+import numpy as np
+
+EXPORT_OPSET = 14
+
+
+def _export_dir(cache_dir, model_name):
+    return os.path.join(cache_dir, re.sub(r'[^\w.-]+', '_', model_name))
+
+
+def export_model(model_name, export_dir, quantize=False):
+    """
+    Export `model_name` (needs torch + sentence-transformers) to `export_dir`:
+    model.onnx (+ model.int8.onnx), the tokenizer files and encoder.json with the
+    pooling / normalization settings of the sentence-transformer.
+    """
+    import torch
+    from sentence_transformers import SentenceTransformer
+
+    os.makedirs(export_dir, exist_ok=True)
+    st_model = SentenceTransformer(model_name, device='cpu')
+    transformer = st_model[0].auto_model
+    tokenizer = st_model.tokenizer
+    pooling = next((m for m in st_model if type(m).__name__ == 'Pooling'), None)
+    if pooling is None:
+        raise ValueError(f"{model_name} has no Pooling module; cannot export to ONNX")
+    if pooling.pooling_mode_cls_token:
+        pooling_mode = 'cls'
+    elif pooling.pooling_mode_max_tokens:
+        pooling_mode = 'max'
+    else:
+        pooling_mode = 'mean'
+
+    input_names = [n for n in ('input_ids', 'attention_mask', 'token_type_ids')
+                   if n in tokenizer.model_input_names]
+    dummy = tokenizer(["ekspor model onnx"], return_tensors='pt')
+    dynamic_axes = {n: {0: 'batch', 1: 'sequence'} for n in input_names}
+    dynamic_axes['last_hidden_state'] = {0: 'batch', 1: 'sequence'}
+    onnx_path = os.path.join(export_dir, 'model.onnx')
+    transformer.eval()
+    with torch.no_grad():
+        torch.onnx.export(
+            transformer, tuple(dummy[n] for n in input_names), onnx_path,
+            input_names=input_names, output_names=['last_hidden_state'],
+            dynamic_axes=dynamic_axes, opset_version=EXPORT_OPSET
+        )
+    if quantize:
+        from onnxruntime.quantization import quantize_dynamic, QuantType
+        quantize_dynamic(onnx_path, os.path.join(export_dir, 'model.int8.onnx'), weight_type=QuantType.QInt8)
+
+    tokenizer.save_pretrained(export_dir)
+    meta = {
+        'model_name': model_name,
+        'input_names': input_names,
+        'pooling': pooling_mode,
+        'normalize': any(type(m).__name__ == 'Normalize' for m in st_model),
+        'max_seq_length': st_model.max_seq_length,
+        'dimension': st_model.get_sentence_embedding_dimension(),
+    }
+    with open(os.path.join(export_dir, 'encoder.json'), 'w', encoding='utf-8') as f:
+        json.dump(meta, f, indent=2)
+    logging.info(f"Exported {model_name} to ONNX in {export_dir} (quantized={quantize})")
+    return meta
+
+
+class OnnxSentenceEncoder:
+    """SentenceTransformer-compatible encoder running on onnxruntime."""
+
+    def __init__(self, model_name, cache_dir='cache/onnx', quantize=False, batch_size=64,
+                 num_threads=0, max_batch_tokens=8192):
+        """
+        Args:
+            model_name (str): SentenceTransformer model name or path (exported on first use)
+            cache_dir (str): Where exported models are kept
+            quantize (bool): Use the int8 dynamically quantized model
+            batch_size (int): Default maximum texts per batch
+            num_threads (int): onnxruntime intra-op threads, 0 = onnxruntime default
+            max_batch_tokens (int): Maximum padded tokens (texts x longest text) per batch
+        """
+        import onnxruntime as ort
+        from transformers import AutoTokenizer
+
+        export_dir = _export_dir(cache_dir, model_name)
+        model_file = 'model.int8.onnx' if quantize else 'model.onnx'
+        if not os.path.exists(os.path.join(export_dir, model_file)):
+            export_model(model_name, export_dir, quantize=quantize)
+        with open(os.path.join(export_dir, 'encoder.json'), encoding='utf-8') as f:
+            self.meta = json.load(f)
+
+        self.tokenizer = AutoTokenizer.from_pretrained(export_dir)
+        self.max_seq_length = self.meta['max_seq_length']
+        self.batch_size = int(batch_size)
+        self.max_batch_tokens = int(max_batch_tokens)
+        options = ort.SessionOptions()
+        options.graph_optimization_level = ort.GraphOptimizationLevel.ORT_ENABLE_ALL
+        if num_threads:
+            options.intra_op_num_threads = int(num_threads)
+        self.session = ort.InferenceSession(os.path.join(export_dir, model_file), options,
+                                            providers=['CPUExecutionProvider'])
+        self._pad_id = self.tokenizer.pad_token_id or 0
+
+    def get_sentence_embedding_dimension(self):
+        return self.meta['dimension']
+
+    def _batches(self, lengths, order, batch_size):
+        """Length-sorted batches capped by batch_size and by the padded token budget."""
+        batch = []
+        for i in order:
+            # Urutan naik, jadi teks terakhir yang masuk adalah yang terpanjang di batch
+            if batch and (len(batch) >= batch_size or (len(batch) + 1) * lengths[i] > self.max_batch_tokens):
+                yield batch
+                batch = []
+            batch.append(i)
+        if batch:
+            yield batch
+
+    def _pool(self, hidden, mask):
+        if self.meta['pooling'] == 'cls':
+            return hidden[:, 0]
+        mask = mask[:, :, None].astype(np.float32)
+        if self.meta['pooling'] == 'max':
+            return np.where(mask > 0, hidden, -1e9).max(axis=1)
+        return (hidden * mask).sum(axis=1) / np.maximum(mask.sum(axis=1), 1e-9)
+
+    def encode(self, sentences, batch_size=None, show_progress_bar=False, convert_to_numpy=True,
+               normalize_embeddings=False, **kwargs):
+        """Same call shape as SentenceTransformer.encode; always returns a float32 ndarray."""
+        single = isinstance(sentences, str)
+        texts = [sentences] if single else list(sentences)
+        dim = self.get_sentence_embedding_dimension()
+        if not texts:
+            return np.zeros((0, dim), dtype=np.float32)
+
+        encoded = self.tokenizer(texts, truncation=True, max_length=self.max_seq_length, padding=False,
+                                 return_attention_mask=False, return_token_type_ids=False)['input_ids']
+        lengths = [len(ids) for ids in encoded]
+        order = np.argsort(lengths, kind='stable')
+        out = np.empty((len(texts), dim), dtype=np.float32)
+        for batch in self._batches(lengths, order, batch_size or self.batch_size):
+            width = max(lengths[i] for i in batch)
+            input_ids = np.full((len(batch), width), self._pad_id, dtype=np.int64)
+            attention_mask = np.zeros((len(batch), width), dtype=np.int64)
+            for row, i in enumerate(batch):
+                input_ids[row, :lengths[i]] = encoded[i]
+                attention_mask[row, :lengths[i]] = 1
+            feeds = {'input_ids': input_ids, 'attention_mask': attention_mask,
+                     'token_type_ids': np.zeros_like(input_ids)}
+            feeds = {n: feeds[n] for n in self.meta['input_names']}
+            hidden = self.session.run(None, feeds)[0]
+            out[batch] = self._pool(hidden, attention_mask)
+
+        if self.meta['normalize'] or normalize_embeddings:
+            out /= np.maximum(np.linalg.norm(out, axis=1, keepdims=True), 1e-12)
+        return out[0] if single else out
+
+
+_export_lock = threading.Lock()
+
+
+def load_onnx_encoder(model_name, quantize=False, **options):
+    # Ekspor hanya boleh berjalan sekali walau beberapa thread memuat model bersamaan
+    with _export_lock:
+        return OnnxSentenceEncoder(model_name, quantize=quantize, **options)
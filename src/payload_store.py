@@ -0,0 +1,148 @@
+"""
+Payload Store
+Payload projection for the vector store, from config.yaml:
+
+  payload_store_fields     fields kept in the point payload (empty = every field not in
+                           payload_side_fields); 'text' (the chunk) is always kept
+  payload_side_fields      bulky fields moved out of the point payload
+  payload_side_store_path  SQLite side store for those fields, keyed by point id
+                           (empty = side fields are dropped)
+  payload_search_fields    `with_payload` include list for searches (empty = whole payload)
+
+Search responses then carry only what the RAG prompt needs, and Qdrant RAM holds
+vectors instead of duplicated strings. The full payload of a hit is loaded on
+demand with VectorStore.payload_details.
+"""
+
+import json
+import os
+import sqlite3
+import threading
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS payloads (
+    point_id TEXT PRIMARY KEY,
+    payload TEXT NOT NULL
+)
+"""
+
+
+def _json_default(value):
+    # numpy scalar (mis. int64 dari DataFrame) -> tipe Python
+    if hasattr(value, 'item'):
+        return value.item()
+    return str(value)
+
+
+class PayloadSideStore:
+    """SQLite store of the payload fields kept outside the vector store."""
+
+    def __init__(self, path='cache/payload_side.sqlite'):
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self.path = path
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(_SCHEMA)
+        self._conn.commit()
+
+    def put_many(self, items):
+        """Store (point_id, payload dict) pairs, replacing earlier payloads of the same points."""
+        rows = [(str(pid), json.dumps(payload, ensure_ascii=False, default=_json_default))
+                for pid, payload in items]
+        if not rows:
+            return
+        with self._lock:
+            self._conn.executemany("INSERT OR REPLACE INTO payloads (point_id, payload) VALUES (?, ?)", rows)
+            self._conn.commit()
+
+    def get_many(self, ids):
+        """{point_id: payload} for the ids that have side fields."""
+        keys = [str(i) for i in ids]
+        found = {}
+        with self._lock:
+            # SQLite membatasi jumlah parameter per query, jadi lookup dipecah
+            for start in range(0, len(keys), 500):
+                part = keys[start:start + 500]
+                placeholders = ",".join("?" * len(part))
+                rows = self._conn.execute(
+                    f"SELECT point_id, payload FROM payloads WHERE point_id IN ({placeholders})", part
+                ).fetchall()
+                for pid, payload in rows:
+                    found[pid] = json.loads(payload)
+        return found
+
+    def count(self):
+        with self._lock:
+            return self._conn.execute("SELECT COUNT(*) FROM payloads").fetchone()[0]
+
+    def close(self):
+        self._conn.close()
+
+
+class PayloadProjection:
+    """Splits payloads at upsert time and projects them at search time."""
+
+    def __init__(self, store_fields=None, side_fields=(), search_fields=None, side_store=None):
+        self.store_fields = set(store_fields) | {'text'} if store_fields else None
+        self.side_fields = set(side_fields or ())
+        self.search_fields = list(search_fields) if search_fields else None
+        self.side_store = side_store
+
+    def split(self, payload):
+        """(payload for the vector store, fields for the side store)."""
+        hot, side = {}, {}
+        for key, value in payload.items():
+            if key in self.side_fields or (self.store_fields is not None and key not in self.store_fields):
+                side[key] = value
+            else:
+                hot[key] = value
+        return hot, side
+
+    def with_payload(self):
+        """Value for Qdrant's `with_payload`: the include list, or True for the whole payload."""
+        return self.search_fields or True
+
+    def project(self, payload):
+        if self.search_fields is None or payload is None:
+            return payload
+        return {k: payload[k] for k in self.search_fields if k in payload}
+
+    def save_side(self, items):
+        if self.side_store is not None:
+            self.side_store.put_many([(pid, side) for pid, side in items if side])
+
+    def side_payloads(self, ids):
+        return self.side_store.get_many(ids) if self.side_store is not None else {}
+
+
+_side_stores = {}
+_lock = threading.Lock()
+
+
+def get_side_store(path):
+    with _lock:
+        store = _side_stores.get(path)
+        if store is None:
+            store = _side_stores[path] = PayloadSideStore(path)
+    return store
+
+
+def payload_options(config):
+    return {
+        'store_fields': tuple(config.get('payload_store_fields') or ()),
+        'side_fields': tuple(config.get('payload_side_fields') or ()),
+        'search_fields': tuple(config.get('payload_search_fields') or ()),
+        'side_store_path': config.get('payload_side_store_path') or None,
+    }
+
+
+def payload_projection(config):
+    """PayloadProjection for config.yaml, or None when no projection is configured."""
+    options = payload_options(config)
+    if not (options['store_fields'] or options['side_fields'] or options['search_fields']):
+        return None
+    side_store = get_side_store(options['side_store_path']) if options['side_store_path'] else None
+    return PayloadProjection(options['store_fields'], options['side_fields'], options['search_fields'], side_store)
@@ -0,0 +1,113 @@
+"""
+Parallel PDF Page Extraction
+Extracts PDF text page by page across a process pool and caches every page's text
+on disk keyed by file hash + page number, so unchanged PDFs are never re-parsed.
+
+Modul ini sengaja hanya bergantung pada pypdf agar worker process (spawn di Windows)
+tetap ringan saat di-import ulang.
+"""
+
+import json
+import math
+import os
+from concurrent.futures import ProcessPoolExecutor
+import pypdf
+from ingest_manifest import file_sha256
+
+
+def _extract_page_range(args):
+    """Worker: extract pages [start, stop) of one PDF. Returns [(page_number, text), ...]."""
+    pdf_path, start, stop = args
+    reader = pypdf.PdfReader(pdf_path)
+    return [(i, reader.pages[i].extract_text() or "") for i in range(start, stop)]
+
+
+def _contiguous_ranges(pages, parts):
+    """Split a sorted list of page numbers into at most `parts` contiguous [start, stop) ranges."""
+    size = max(1, math.ceil(len(pages) / parts))
+    ranges = []
+    for i in range(0, len(pages), size):
+        group = pages[i:i + size]
+        # Pecah lagi bila ada lubang (halaman yang sudah ada di cache)
+        start = prev = group[0]
+        for page in group[1:]:
+            if page != prev + 1:
+                ranges.append((start, prev + 1))
+                start = page
+            prev = page
+        ranges.append((start, prev + 1))
+    return ranges
+
+
+class PageCache:
+    """Directory of `<sha256>/<page>.txt` files plus a `<sha256>/meta.json` with the page count."""
+
+    def __init__(self, cache_dir='cache/pdf_pages'):
+        self.cache_dir = cache_dir
+
+    def _dir(self, digest):
+        return os.path.join(self.cache_dir, digest)
+
+    def page_count(self, digest):
+        meta_path = os.path.join(self._dir(digest), 'meta.json')
+        if not os.path.exists(meta_path):
+            return None
+        with open(meta_path, encoding='utf-8') as f:
+            return json.load(f)['pages']
+
+    def set_page_count(self, digest, pages):
+        os.makedirs(self._dir(digest), exist_ok=True)
+        with open(os.path.join(self._dir(digest), 'meta.json'), 'w', encoding='utf-8') as f:
+            json.dump({'pages': pages}, f)
+
+    def get(self, digest, page):
+        path = os.path.join(self._dir(digest), f'{page}.txt')
+        if not os.path.exists(path):
+            return None
+        with open(path, encoding='utf-8') as f:
+            return f.read()
+
+    def put(self, digest, page, text):
+        os.makedirs(self._dir(digest), exist_ok=True)
+        with open(os.path.join(self._dir(digest), f'{page}.txt'), 'w', encoding='utf-8') as f:
+            f.write(text)
+
+
+def extract_pdf_pages(pdf_path, cache_dir='cache/pdf_pages', max_workers=None, min_pages_per_worker=8):
+    """
+    Return the text of every page of `pdf_path` (empty string for pages without text).
+
+    Args:
+        pdf_path (str): PDF file
+        cache_dir (str): Page cache directory; None disables caching
+        max_workers (int): Process pool size (default: os.cpu_count())
+        min_pages_per_worker (int): Below this many pages per worker the PDF is parsed in-process
+    """
+    cache = PageCache(cache_dir) if cache_dir else None
+    digest = file_sha256(pdf_path) if cache else None
+
+    page_count = cache.page_count(digest) if cache else None
+    if page_count is None:
+        page_count = len(pypdf.PdfReader(pdf_path).pages)
+        if cache:
+            cache.set_page_count(digest, page_count)
+
+    pages = [cache.get(digest, i) if cache else None for i in range(page_count)]
+    missing = [i for i, text in enumerate(pages) if text is None]
+    if not missing:
+        return pages
+
+    workers = max_workers or os.cpu_count() or 1
+    workers = max(1, min(workers, len(missing) // min_pages_per_worker))
+    ranges = [(pdf_path, start, stop) for start, stop in _contiguous_ranges(missing, workers)]
+    if workers == 1:
+        results = [_extract_page_range(r) for r in ranges]
+    else:
+        with ProcessPoolExecutor(max_workers=workers) as executor:
+            results = list(executor.map(_extract_page_range, ranges))
+    for extracted in results:
+        for page, text in extracted:
+            pages[page] = text
+            if cache:
+                cache.put(digest, page, text)
+    return pages
@@ -1,48 +1,719 @@
-from qdrant_client import QdrantClient
+from qdrant_client import QdrantClient, AsyncQdrantClient
 from qdrant_client.http import models as qmodels
 import numpy as np
 import os
 import logging
 import glob
+import asyncio
+import threading
+from abc import ABC, abstractmethod
+import time
+from concurrent.futures import ThreadPoolExecutor, FIRST_COMPLETED, wait as wait_futures
 import pandas as pd
+from utils import batched
+from payload_store import payload_options, payload_projection
 
-def get_qdrant_client(host="localhost", port=6333):
-    return QdrantClient(host=host, port=port)
+# Satu client per endpoint untuk seluruh proses: koneksi HTTP keep-alive (atau
+# channel gRPC) dipakai ulang, jadi tidak ada handshake `GET /` di setiap panggilan.
+_clients = {}
+_clients_lock = threading.Lock()
 
-def upsert_embeddings(collection_name, embeddings, texts, metadatas=None, ids=None, host="localhost", port=6333):
-    client = get_qdrant_client(host, port)
-    dim = len(embeddings[0])
-    # Create collection if not exists
-    if collection_name not in [c.name for c in client.get_collections().collections]:
-        client.recreate_collection(
-            collection_name=collection_name,
-            vectors_config=qmodels.VectorParams(size=dim, distance=qmodels.Distance.COSINE)
+# Cache skema koleksi: (endpoint, nama koleksi) -> ukuran vektor / punya sparse vector atau tidak
+_collection_dims = {}
+_collection_sparse = {}
+_collections_lock = threading.Lock()
+_sparse_warned = set()
+
+# Nama sparse vector BM25 di samping vektor dense (tanpa nama) dalam koleksi yang sama
+SPARSE_VECTOR_NAME = 'bm25'
+
+# Spesifikasi koleksi (config.yaml `collection_spec`); default = default Qdrant
+DEFAULT_COLLECTION_SPEC = {
+    'hnsw_m': 16,                   # edge per node graph HNSW; lebih kecil = RAM lebih hemat, recall turun
+    'hnsw_ef_construct': 100,
+    'hnsw_on_disk': False,
+    'hnsw_ef': 0,                   # ef saat search; 0 = default Qdrant
+    'vectors_on_disk': False,       # vektor float32 asli di disk (mmap)
+    'quantization': 'none',         # none | int8 (scalar quantization)
+    'quantization_quantile': 0.99,
+    'quantization_always_ram': True,
+    'rescore': True,                # hitung ulang top hasil dengan vektor asli
+    'oversampling': 2.0,
+}
+
+# Index payload untuk filter (mis. tweet 24 jam terakhir) yang tetap cepat saat koleksi membesar
+PAYLOAD_INDEXES = {
+    'source_file': qmodels.PayloadSchemaType.KEYWORD,
+    'username': qmodels.PayloadSchemaType.KEYWORD,
+    'created_at': qmodels.PayloadSchemaType.DATETIME,
+}
+
+
+def _endpoint_key(host, port, prefer_grpc, grpc_port):
+    return (host, int(port), bool(prefer_grpc), int(grpc_port))
+
+
+def get_qdrant_client(host="localhost", port=6333, prefer_grpc=False, grpc_port=6334):
+    """
+    Return the long-lived client for this endpoint, creating it on first use.
+
+    The client is shared across threads; with `prefer_grpc=True` it talks to the
+    gRPC port (6334 in docker-compose.yml) instead of REST.
+    """
+    key = _endpoint_key(host, port, prefer_grpc, grpc_port)
+    client = _clients.get(key)
+    if client is not None:
+        return client
+    with _clients_lock:
+        client = _clients.get(key)
+        if client is None:
+            client = QdrantClient(host=host, port=port, grpc_port=grpc_port, prefer_grpc=prefer_grpc)
+            _clients[key] = client
+    return client
+
+
+# Client async terikat ke event loop tempat ia dibuat, jadi kuncinya ikut id loop
+_async_clients = {}
+
+
+def get_async_qdrant_client(host="localhost", port=6333, prefer_grpc=False, grpc_port=6334):
+    """Long-lived AsyncQdrantClient for this endpoint and the running event loop."""
+    key = _endpoint_key(host, port, prefer_grpc, grpc_port) + (id(asyncio.get_running_loop()),)
+    client = _async_clients.get(key)
+    if client is None:
+        client = AsyncQdrantClient(host=host, port=port, grpc_port=grpc_port, prefer_grpc=prefer_grpc)
+        _async_clients[key] = client
+    return client
+
+
+def qdrant_connection(config):
+    """Connection kwargs for the qdrant_store functions taken from config.yaml."""
+    return {
+        'host': config.get('qdrant_host', 'localhost'),
+        'port': config.get('qdrant_port', 6333),
+        'prefer_grpc': config.get('qdrant_prefer_grpc', False),
+        'grpc_port': config.get('qdrant_grpc_port', 6334),
+    }
+
+
+def close_qdrant_clients():
+    """Close every pooled client and forget the cached collection schema."""
+    with _clients_lock:
+        for client in _clients.values():
+            try:
+                client.close()
+            except Exception as e:
+                logging.warning(f"Failed to close Qdrant client: {e}")
+        _clients.clear()
+    invalidate_collection_cache()
+
+
+def invalidate_collection_cache(collection_name=None):
+    """Forget cached collection schema (all collections if no name is given)."""
+    with _collections_lock:
+        if collection_name is None:
+            _collection_dims.clear()
+            _collection_sparse.clear()
+        else:
+            for key in [k for k in _collection_dims if k[1] == collection_name]:
+                del _collection_dims[key]
+            for key in [k for k in _collection_sparse if k[1] == collection_name]:
+                del _collection_sparse[key]
+
+
+def _remember_schema(key, info):
+    _collection_dims[key] = info.config.params.vectors.size
+    _collection_sparse[key] = SPARSE_VECTOR_NAME in (info.config.params.sparse_vectors or {})
+
+
+def collection_spec(config):
+    """DEFAULT_COLLECTION_SPEC overlaid with config.yaml `collection_spec`."""
+    spec = dict(DEFAULT_COLLECTION_SPEC)
+    spec.update(config.get('collection_spec') or {})
+    return spec
+
+
+def _hnsw_config(spec):
+    return qmodels.HnswConfigDiff(m=int(spec['hnsw_m']), ef_construct=int(spec['hnsw_ef_construct']),
+                                  on_disk=bool(spec['hnsw_on_disk']))
+
+
+def _quantization_config(spec):
+    if spec['quantization'] in (None, 'none'):
+        return None
+    if spec['quantization'] != 'int8':
+        raise ValueError(f"Unsupported quantization: {spec['quantization']}")
+    return qmodels.ScalarQuantization(scalar=qmodels.ScalarQuantizationConfig(
+        type=qmodels.ScalarType.INT8,
+        quantile=float(spec['quantization_quantile']),
+        always_ram=bool(spec['quantization_always_ram'])
+    ))
+
+
+def search_params(spec):
+    """Search-time params (hnsw_ef, quantization rescoring) for a collection spec, or None."""
+    if not spec:
+        return None
+    quantized = spec['quantization'] not in (None, 'none')
+    if not spec['hnsw_ef'] and not quantized:
+        return None
+    return qmodels.SearchParams(
+        hnsw_ef=int(spec['hnsw_ef']) or None,
+        quantization=qmodels.QuantizationSearchParams(
+            rescore=bool(spec['rescore']), oversampling=float(spec['oversampling'])
+        ) if quantized else None
+    )
+
+
+def collection_spec_diff(client, collection_name, spec):
+    """{setting: (current, wanted)} for every spec setting the existing collection differs in."""
+    info = client.get_collection(collection_name)
+    hnsw = info.config.hnsw_config
+    quantization = info.config.quantization_config
+    scalar = getattr(quantization, 'scalar', None)
+    current = {
+        'hnsw_m': hnsw.m,
+        'hnsw_ef_construct': hnsw.ef_construct,
+        'hnsw_on_disk': bool(hnsw.on_disk),
+        'vectors_on_disk': bool(info.config.params.vectors.on_disk),
+        'quantization': 'int8' if scalar is not None else 'none',
+    }
+    if scalar is not None:
+        current['quantization_quantile'] = scalar.quantile
+        current['quantization_always_ram'] = scalar.always_ram
+    diff = {}
+    for name, value in current.items():
+        wanted = spec[name]
+        if isinstance(value, float) or isinstance(wanted, float):
+            changed = value is None or abs(float(value) - float(wanted)) > 1e-9
+        else:
+            changed = value != wanted
+        if changed:
+            diff[name] = (value, wanted)
+    return diff
+
+
+def migrate_collection(collection_name, spec, host="localhost", port=6333, prefer_grpc=False, grpc_port=6334,
+                       apply=True):
+    """
+    Bring an existing collection to `spec` in place via update_collection. Qdrant
+    rebuilds the HNSW graph / quantized vectors in the background; search keeps working.
+
+    Returns:
+        dict: the differences found (applied when `apply` is true)
+    """
+    client = get_qdrant_client(host, port, prefer_grpc, grpc_port)
+    diff = collection_spec_diff(client, collection_name, spec)
+    if diff and apply:
+        kwargs = {}
+        if {'hnsw_m', 'hnsw_ef_construct', 'hnsw_on_disk'} & diff.keys():
+            kwargs['hnsw_config'] = _hnsw_config(spec)
+        if {'quantization', 'quantization_quantile', 'quantization_always_ram'} & diff.keys():
+            kwargs['quantization_config'] = _quantization_config(spec) or qmodels.Disabled.DISABLED
+        if 'vectors_on_disk' in diff:
+            kwargs['vectors_config'] = {'': qmodels.VectorParamsDiff(on_disk=bool(spec['vectors_on_disk']))}
+        client.update_collection(collection_name=collection_name, **kwargs)
+        invalidate_collection_cache(collection_name)
+        logging.info(f"Migrated collection {collection_name}: {diff}")
+    return diff
+
+
+def ensure_collection(client, collection_name, dim, endpoint=None, sparse=False, spec=None):
+    """
+    Make sure `collection_name` exists with vectors of size `dim` and the payload
+    indexes in PAYLOAD_INDEXES. With `sparse=True` a new collection also gets the
+    BM25 sparse vector (IDF applied by Qdrant). A new collection is created with
+    `spec` (see DEFAULT_COLLECTION_SPEC); existing ones are changed only by
+    migrate_collection.
+
+    Only the first call per collection talks to Qdrant; afterwards the cached
+    schema is checked locally.
+
+    Returns:
+        bool: whether the collection stores sparse vectors
+    """
+    key = (endpoint, collection_name)
+    if key not in _collection_dims:
+        with _collections_lock:
+            if key not in _collection_dims:
+                if client.collection_exists(collection_name):
+                    info = client.get_collection(collection_name)
+                    indexed = set((info.payload_schema or {}).keys())
+                else:
+                    spec = spec or DEFAULT_COLLECTION_SPEC
+                    client.create_collection(
+                        collection_name=collection_name,
+                        vectors_config=qmodels.VectorParams(size=dim, distance=qmodels.Distance.COSINE,
+                                                            on_disk=bool(spec['vectors_on_disk'])),
+                        hnsw_config=_hnsw_config(spec),
+                        quantization_config=_quantization_config(spec),
+                        sparse_vectors_config={
+                            SPARSE_VECTOR_NAME: qmodels.SparseVectorParams(modifier=qmodels.Modifier.IDF)
+                        } if sparse else None
+                    )
+                    info = client.get_collection(collection_name)
+                    indexed = set()
+                for field, schema in PAYLOAD_INDEXES.items():
+                    if field not in indexed:
+                        client.create_payload_index(collection_name, field_name=field, field_schema=schema)
+                _remember_schema(key, info)
+    cached_dim = _collection_dims[key]
+    if cached_dim != dim:
+        raise ValueError(
+            f"Collection '{collection_name}' stores vectors of size {cached_dim}, got {dim}"
         )
-    payloads = []
-    for i, text in enumerate(texts):
-        meta = metadatas[i] if metadatas else {}
-        payloads.append({"text": text, **meta})
-    client.upsert(
-        collection_name=collection_name,
-        points=[
-            qmodels.PointStruct(
-                id=ids[i] if ids else i,
-                vector=np.array(embeddings[i]).tolist(),
-                payload=payloads[i]
-            ) for i in range(len(embeddings))
-        ]
+    has_sparse = _collection_sparse[key]
+    if sparse and not has_sparse and key not in _sparse_warned:
+        # Qdrant tidak bisa menambah vektor bernama ke koleksi yang sudah ada
+        _sparse_warned.add(key)
+        logging.warning(f"Collection '{collection_name}' has no '{SPARSE_VECTOR_NAME}' sparse vector; "
+                        f"storing dense vectors only. Recreate the collection to enable hybrid search.")
+    return has_sparse
+
+
+def _has_sparse(client, collection_name, endpoint):
+    key = (endpoint, collection_name)
+    if key not in _collection_sparse:
+        info = client.get_collection(collection_name)
+        _collection_sparse[key] = SPARSE_VECTOR_NAME in (info.config.params.sparse_vectors or {})
+    return _collection_sparse[key]
+
+
+async def _ahas_sparse(client, collection_name, endpoint):
+    key = (endpoint, collection_name)
+    if key not in _collection_sparse:
+        info = await client.get_collection(collection_name)
+        _collection_sparse[key] = SPARSE_VECTOR_NAME in (info.config.params.sparse_vectors or {})
+    return _collection_sparse[key]
+
+
+def _to_qdrant_batch(batch, with_sparse=False):
+    ids = [p[0] for p in batch]
+    # Satu konversi per batch (matrix float32), bukan np.array(...).tolist() per baris
+    vectors = np.asarray([p[1] for p in batch], dtype=np.float32).tolist()
+    payloads = [p[2] for p in batch]
+    if with_sparse:
+        sparse = [qmodels.SparseVector(indices=p[3][0], values=p[3][1]) for p in batch]
+        vectors = {'': vectors, SPARSE_VECTOR_NAME: sparse}
+    return qmodels.Batch(ids=ids, vectors=vectors, payloads=payloads)
+
+
+def upsert_options(config):
+    """Bulk upsert tuning taken from config.yaml (plus the spec used if the collection is created)."""
+    return {
+        'batch_size': config.get('upsert_batch_size', 256),
+        'parallel': config.get('upsert_parallel', 4),
+        'collection_spec': collection_spec(config),
+    }
+
+
+def bulk_upsert(collection_name, points, batch_size=256, parallel=4, host="localhost", port=6333,
+                prefer_grpc=False, grpc_port=6334, collection_spec=None):
+    """
+    Stream points into Qdrant in fixed-size batches over several worker threads.
+
+    Args:
+        collection_name (str): Target collection (created on first use)
+        points (iterable): (id, vector, payload) or (id, vector, payload, (indices, values))
+            tuples; vectors may be float32 numpy rows. The optional sparse part is stored
+            when the collection has a sparse vector. Consumed lazily, so a generator keeps
+            memory bounded to the in-flight batches.
+        batch_size (int): Points per request
+        parallel (int): Number of concurrent requests
+        collection_spec (dict): Settings for a newly created collection (see DEFAULT_COLLECTION_SPEC)
+
+    Returns:
+        dict: points, batches, seconds and points_per_sec
+    """
+    client = get_qdrant_client(host, port, prefer_grpc, grpc_port)
+    endpoint = _endpoint_key(host, port, prefer_grpc, grpc_port)
+    parallel = max(1, int(parallel))
+    started = time.perf_counter()
+    stats = {'points': 0, 'batches': 0}
+
+    batches = batched(points, batch_size)
+    current = next(batches, None)
+    with_sparse = False
+    if current is not None:
+        sparse = len(current[0]) > 3
+        with_sparse = ensure_collection(client, collection_name, len(current[0][1]), endpoint, sparse,
+                                        collection_spec) and sparse
+
+    def send(batch, wait):
+        client.upsert(collection_name=collection_name, points=_to_qdrant_batch(batch, with_sparse), wait=wait)
+        return len(batch)
+
+    # Batch terakhir ditahan lalu dikirim dengan wait=True sebagai barrier: Qdrant
+    # menerapkan update per koleksi secara berurutan, jadi setelah batch ini selesai
+    # semua batch wait=False sebelumnya juga sudah diterapkan.
+    pending = set()
+    with ThreadPoolExecutor(max_workers=parallel) as executor:
+        for following in batches:
+            if len(pending) >= parallel * 2:
+                done, pending = wait_futures(pending, return_when=FIRST_COMPLETED)
+                for future in done:
+                    stats['points'] += future.result()
+                    stats['batches'] += 1
+            pending.add(executor.submit(send, current, False))
+            current = following
+        for future in pending:
+            stats['points'] += future.result()
+            stats['batches'] += 1
+    if current is not None:
+        stats['points'] += send(current, True)
+        stats['batches'] += 1
+
+    stats['seconds'] = time.perf_counter() - started
+    stats['points_per_sec'] = stats['points'] / stats['seconds'] if stats['seconds'] > 0 else 0.0
+    logging.info(
+        f"Bulk upsert to {collection_name}: {stats['points']} points in {stats['batches']} batches, "
+        f"{stats['seconds']:.2f}s ({stats['points_per_sec']:.0f} points/sec)"
     )
+    return stats
 
-def search_qdrant(collection_name, query_embedding, top_k=5, host="localhost", port=6333):
-    client = get_qdrant_client(host, port)
+
+def upsert_embeddings(collection_name, embeddings, texts, metadatas=None, ids=None, host="localhost", port=6333,
+                      prefer_grpc=False, grpc_port=6334, batch_size=256, parallel=4, sparse_vectors=None,
+                      collection_spec=None):
+    embeddings = np.asarray(embeddings, dtype=np.float32)
+
+    def points():
+        for i, text in enumerate(texts):
+            meta = metadatas[i] if metadatas else {}
+            point = (ids[i] if ids else i, embeddings[i], {"text": text, **meta})
+            yield point + (sparse_vectors[i],) if sparse_vectors else point
+
+    return bulk_upsert(collection_name, points(), batch_size=batch_size, parallel=parallel,
+                       host=host, port=port, prefer_grpc=prefer_grpc, grpc_port=grpc_port,
+                       collection_spec=collection_spec)
+
+def existing_point_ids(collection_name, ids, host="localhost", port=6333, prefer_grpc=False, grpc_port=6334):
+    """
+    Return the subset of `ids` already stored in the collection (no vectors or
+    payloads are transferred). An absent collection means nothing exists yet.
+    """
+    if not ids:
+        return set()
+    client = get_qdrant_client(host, port, prefer_grpc, grpc_port)
+    endpoint = _endpoint_key(host, port, prefer_grpc, grpc_port)
+    if (endpoint, collection_name) not in _collection_dims and not client.collection_exists(collection_name):
+        return set()
+    records = client.retrieve(collection_name=collection_name, ids=list(ids),
+                              with_payload=False, with_vectors=False)
+    return {str(r.id) for r in records}
+
+def delete_points(collection_name, query_filter, host="localhost", port=6333, prefer_grpc=False, grpc_port=6334):
+    """Delete the points matching `query_filter`. An absent collection has nothing to delete."""
+    client = get_qdrant_client(host, port, prefer_grpc, grpc_port)
+    endpoint = _endpoint_key(host, port, prefer_grpc, grpc_port)
+    if (endpoint, collection_name) not in _collection_dims and not client.collection_exists(collection_name):
+        return
+    client.delete(collection_name=collection_name,
+                  points_selector=qmodels.FilterSelector(filter=query_filter), wait=True)
+
+def retrieve_payloads(collection_name, ids, host="localhost", port=6333, prefer_grpc=False, grpc_port=6334):
+    """{point id (str): payload} for the given ids, without vectors."""
+    if not ids:
+        return {}
+    client = get_qdrant_client(host, port, prefer_grpc, grpc_port)
+    records = client.retrieve(collection_name=collection_name, ids=list(ids),
+                              with_payload=True, with_vectors=False)
+    return {str(r.id): r.payload or {} for r in records}
+
+def slim_collection_payloads(collection_name, projection, host="localhost", port=6333, prefer_grpc=False,
+                             grpc_port=6334, batch_size=1000):
+    """
+    Apply `projection` (payload_store.PayloadProjection) to points already stored:
+    side fields are copied to the side store, then deleted from the point payloads.
+    Returns the number of points changed.
+    """
+    client = get_qdrant_client(host, port, prefer_grpc, grpc_port)
+    changed, offset = 0, None
+    while True:
+        records, offset = client.scroll(collection_name, limit=batch_size, offset=offset,
+                                        with_payload=True, with_vectors=False)
+        side_items, point_ids, keys = [], [], set()
+        for record in records:
+            _, side = projection.split(record.payload or {})
+            if side:
+                side_items.append((str(record.id), side))
+                point_ids.append(record.id)
+                keys.update(side)
+        if side_items:
+            # Side store ditulis dulu, baru field dihapus dari Qdrant
+            projection.save_side(side_items)
+            client.delete_payload(collection_name=collection_name, keys=sorted(keys),
+                                  points=point_ids)
+            changed += len(side_items)
+        if offset is None:
+            return changed
+
+def payload_filter(source_file=None, username=None, since=None):
+    """
+    Filter on the indexed payload fields, e.g. tweets from the last 24h:
+    payload_filter(since=datetime.now(timezone.utc) - timedelta(hours=24)).
+    Returns None when no condition is given.
+    """
+    must = []
+    if source_file:
+        must.append(qmodels.FieldCondition(key='source_file', match=qmodels.MatchValue(value=source_file)))
+    if username:
+        must.append(qmodels.FieldCondition(key='username', match=qmodels.MatchValue(value=username)))
+    if since is not None:
+        must.append(qmodels.FieldCondition(key='created_at', range=qmodels.DatetimeRange(gte=since)))
+    return qmodels.Filter(must=must) if must else None
+
+def _fusion_query(query_embedding, query_sparse, top_k, query_filter, params=None, with_payload=True):
+    """Dense + sparse prefetch fused with Reciprocal Rank Fusion."""
+    prefetch_limit = max(top_k * 4, 20)
+    return {
+        'prefetch': [
+            qmodels.Prefetch(query=np.asarray(query_embedding, dtype=np.float32).tolist(),
+                             filter=query_filter, params=params, limit=prefetch_limit),
+            qmodels.Prefetch(query=qmodels.SparseVector(indices=query_sparse[0], values=query_sparse[1]),
+                             using=SPARSE_VECTOR_NAME, filter=query_filter, limit=prefetch_limit),
+        ],
+        'query': qmodels.FusionQuery(fusion=qmodels.Fusion.RRF),
+        'limit': top_k,
+        'with_payload': with_payload,
+    }
+
+def uses_fusion(collection_name, query_sparse, host="localhost", port=6333, prefer_grpc=False, grpc_port=6334):
+    """
+    Whether search_qdrant fuses `query_sparse` with the dense query (RRF scores).
+    False for an empty sparse query or a collection without the sparse vector:
+    the hits then carry cosine scores.
+    """
+    if not (query_sparse and query_sparse[0]):
+        return False
+    client = get_qdrant_client(host, port, prefer_grpc, grpc_port)
+    return _has_sparse(client, collection_name, _endpoint_key(host, port, prefer_grpc, grpc_port))
+
+def search_qdrant(collection_name, query_embedding, top_k=5, host="localhost", port=6333,
+                  prefer_grpc=False, grpc_port=6334, query_filter=None, query_sparse=None, params=None,
+                  with_payload=True):
+    """
+    Dense search, or hybrid dense + BM25 search fused with RRF when `query_sparse`
+    ((indices, values), see sparse_encoder) is given and the collection stores
+    sparse vectors. Hybrid hit scores are RRF scores, not cosine similarities.
+    `params` are the search params of the collection spec (see search_params);
+    `with_payload` may be a list of payload fields to return.
+    """
+    client = get_qdrant_client(host, port, prefer_grpc, grpc_port)
+    if uses_fusion(collection_name, query_sparse, host, port, prefer_grpc, grpc_port):
+        return client.query_points(
+            collection_name=collection_name,
+            query_filter=query_filter,
+            **_fusion_query(query_embedding, query_sparse, top_k, query_filter, params, with_payload)
+        ).points
     hits = client.search(
         collection_name=collection_name,
         query_vector=np.array(query_embedding).tolist(),
+        query_filter=query_filter,
+        search_params=params,
+        limit=top_k,
+        with_payload=with_payload
+    )
+    return hits
+
+def search_qdrant_batch(collection_name, query_embeddings, top_k=5, host="localhost", port=6333,
+                        prefer_grpc=False, grpc_port=6334, query_filter=None, query_sparse=None, params=None,
+                        with_payload=True):
+    """Run many searches in one request; returns one hit list per query embedding."""
+    client = get_qdrant_client(host, port, prefer_grpc, grpc_port)
+    endpoint = _endpoint_key(host, port, prefer_grpc, grpc_port)
+    vectors = np.asarray(query_embeddings, dtype=np.float32).tolist()
+    if query_sparse and _has_sparse(client, collection_name, endpoint):
+        requests = []
+        for vector, sparse in zip(vectors, query_sparse):
+            if sparse[0]:
+                fusion = _fusion_query(vector, sparse, top_k, query_filter, params, with_payload)
+                requests.append(qmodels.QueryRequest(filter=query_filter, **fusion))
+            else:
+                requests.append(qmodels.QueryRequest(query=vector, filter=query_filter, params=params,
+                                                     limit=top_k, with_payload=with_payload))
+        return [response.points for response in
+                client.query_batch_points(collection_name=collection_name, requests=requests)]
+    requests = [
+        qmodels.SearchRequest(vector=vector, filter=query_filter, params=params, limit=top_k,
+                              with_payload=with_payload)
+        for vector in vectors
+    ]
+    return client.search_batch(collection_name=collection_name, requests=requests)
+
+async def asearch_qdrant(collection_name, query_embedding, top_k=5, host="localhost", port=6333,
+                         prefer_grpc=False, grpc_port=6334, query_filter=None, query_sparse=None,
+                         params=None, with_payload=True):
+    """Async counterpart of search_qdrant using the pooled AsyncQdrantClient."""
+    client = get_async_qdrant_client(host, port, prefer_grpc, grpc_port)
+    endpoint = _endpoint_key(host, port, prefer_grpc, grpc_port)
+    if query_sparse and query_sparse[0] and await _ahas_sparse(client, collection_name, endpoint):
+        response = await client.query_points(
+            collection_name=collection_name,
+            query_filter=query_filter,
+            **_fusion_query(query_embedding, query_sparse, top_k, query_filter, params, with_payload)
+        )
+        return response.points
+    hits = await client.search(
+        collection_name=collection_name,
+        query_vector=np.array(query_embedding).tolist(),
+        query_filter=query_filter,
+        search_params=params,
         limit=top_k,
-        with_payload=True
+        with_payload=with_payload
     )
     return hits
 
+class VectorStore(ABC):
+    """
+    Vector-store backend interface used by ingestion and retrieval.
+
+    Points are (id, vector, payload) or (id, vector, payload, (indices, values))
+    tuples; hits are ScoredPoint-like objects with `id`, `score` and `payload`.
+    """
+
+    # payload_store.PayloadProjection, diisi get_vector_store dari config
+    projection = None
+
+    @abstractmethod
+    def upsert(self, collection_name, points):
+        """Store points; returns stats like bulk_upsert (points, batches, seconds, points_per_sec)."""
+
+    @abstractmethod
+    def existing_ids(self, collection_name, ids):
+        """Subset of `ids` (as strings) already stored."""
+
+    @abstractmethod
+    def retrieve_payloads(self, collection_name, ids):
+        """{id (str): payload as stored in the vector store}."""
+
+    @abstractmethod
+    def delete_points(self, collection_name, query_filter):
+        """Delete the points whose payload matches `query_filter` (a Qdrant Filter)."""
+
+    def payload_details(self, collection_name, ids):
+        """Full payload per point id: the stored payload plus its side-store fields."""
+        payloads = self.retrieve_payloads(collection_name, ids)
+        if self.projection is not None:
+            for pid, side in self.projection.side_payloads(ids).items():
+                payloads.setdefault(pid, {}).update(side)
+        return payloads
+
+    @abstractmethod
+    def search(self, collection_name, query_embedding, top_k=5, query_filter=None, query_sparse=None):
+        """Top `top_k` hits for one query; `query_sparse` adds the BM25 query where supported."""
+
+    def uses_fusion(self, collection_name, query_sparse):
+        """Whether search() returns RRF-fused scores for this query instead of cosine scores."""
+        return False
+
+    def search_batch(self, collection_name, query_embeddings, top_k=5, query_filter=None, query_sparse=None):
+        sparse = query_sparse or [None] * len(query_embeddings)
+        return [self.search(collection_name, q, top_k, query_filter, s) for q, s in zip(query_embeddings, sparse)]
+
+    async def asearch(self, collection_name, query_embedding, top_k=5, query_filter=None, query_sparse=None):
+        return await asyncio.to_thread(self.search, collection_name, query_embedding, top_k,
+                                       query_filter, query_sparse)
+
+    def upsert_embeddings(self, collection_name, embeddings, texts, metadatas=None, ids=None, sparse_vectors=None):
+        """Same arguments as the module-level upsert_embeddings; payloads go through `projection`."""
+        embeddings = np.asarray(embeddings, dtype=np.float32)
+        projection = self.projection
+        point_ids = list(ids) if ids else list(range(len(texts)))
+        payloads = [{"text": text, **(metadatas[i] if metadatas else {})} for i, text in enumerate(texts)]
+        if projection is not None:
+            split = [projection.split(p) for p in payloads]
+            payloads = [hot for hot, _ in split]
+            # Field side disimpan sebelum point terlihat di pencarian
+            projection.save_side([(pid, side) for pid, (_, side) in zip(point_ids, split)])
+
+        def points():
+            for i, payload in enumerate(payloads):
+                point = (point_ids[i], embeddings[i], payload)
+                yield point + (sparse_vectors[i],) if sparse_vectors else point
+
+        return self.upsert(collection_name, points())
+
+
+class QdrantVectorStore(VectorStore):
+    """The Qdrant server backend: the module-level functions bound to one endpoint and collection spec."""
+
+    def __init__(self, host="localhost", port=6333, prefer_grpc=False, grpc_port=6334, batch_size=256,
+                 parallel=4, collection_spec=None):
+        self.connection = {'host': host, 'port': port, 'prefer_grpc': prefer_grpc, 'grpc_port': grpc_port}
+        self.batch_size = batch_size
+        self.parallel = parallel
+        self.collection_spec = collection_spec
+        self.params = search_params(collection_spec)
+
+    def upsert(self, collection_name, points):
+        return bulk_upsert(collection_name, points, batch_size=self.batch_size, parallel=self.parallel,
+                           collection_spec=self.collection_spec, **self.connection)
+
+    def existing_ids(self, collection_name, ids):
+        return existing_point_ids(collection_name, ids, **self.connection)
+
+    def retrieve_payloads(self, collection_name, ids):
+        return retrieve_payloads(collection_name, ids, **self.connection)
+
+    def delete_points(self, collection_name, query_filter):
+        return delete_points(collection_name, query_filter, **self.connection)
+
+    def _with_payload(self):
+        return self.projection.with_payload() if self.projection is not None else True
+
+    def uses_fusion(self, collection_name, query_sparse):
+        return uses_fusion(collection_name, query_sparse, **self.connection)
+
+    def search(self, collection_name, query_embedding, top_k=5, query_filter=None, query_sparse=None):
+        return search_qdrant(collection_name, query_embedding, top_k, query_filter=query_filter,
+                             query_sparse=query_sparse, params=self.params, with_payload=self._with_payload(),
+                             **self.connection)
+
+    def search_batch(self, collection_name, query_embeddings, top_k=5, query_filter=None, query_sparse=None):
+        return search_qdrant_batch(collection_name, query_embeddings, top_k, query_filter=query_filter,
+                                   query_sparse=query_sparse, params=self.params,
+                                   with_payload=self._with_payload(), **self.connection)
+
+    async def asearch(self, collection_name, query_embedding, top_k=5, query_filter=None, query_sparse=None):
+        return await asearch_qdrant(collection_name, query_embedding, top_k, query_filter=query_filter,
+                                    query_sparse=query_sparse, params=self.params,
+                                    with_payload=self._with_payload(), **self.connection)
+
+
+_stores = {}
+_stores_lock = threading.Lock()
+
+
+def get_vector_store(config):
+    """
+    Backend chosen by config.yaml `vector_backend`: 'qdrant' (default, the server
+    from docker-compose.yml) or 'local' (in-process memory-mapped NumPy index under
+    `local_vector_path`, see local_vector_store). Shared per process. Payloads are
+    projected as configured by the payload_* keys (see payload_store).
+    """
+    backend = config.get('vector_backend', 'qdrant')
+    if backend == 'local':
+        key = ('local', config.get('local_vector_path', 'cache/vectors'))
+    elif backend == 'qdrant':
+        options = upsert_options(config)
+        key = ('qdrant',) + tuple(sorted(qdrant_connection(config).items())) + (
+            options['batch_size'], options['parallel'], repr(options['collection_spec']))
+    else:
+        raise ValueError(f"Unknown vector_backend: {backend}")
+    key += (repr(payload_options(config)),)
+    with _stores_lock:
+        store = _stores.get(key)
+        if store is None:
+            if backend == 'local':
+                from local_vector_store import LocalVectorStore
+                store = LocalVectorStore(key[1])
+            else:
+                store = QdrantVectorStore(**qdrant_connection(config), **upsert_options(config))
+            store.projection = payload_projection(config)
+            _stores[key] = store
+    return store
+
 def setup_logger(logfile='logs/pipeline.log'):
     os.makedirs(os.path.dirname(logfile), exist_ok=True)
     logging.basicConfig(filename=logfile, level=logging.INFO,
@@ -61,13 +732,24 @@ def process_csv_files(backup_dir):
 if __name__ == '__main__':
     # Contoh utilitas mandiri bila file dijalankan langsung.
     # Tidak dijalankan saat di-import dari modul lain.
+    import yaml
+    from tweet_archive import archive_files, read_archive, INGEST_COLUMNS, DEFAULT_ARCHIVE_PATH
+
+    root = os.path.join(os.path.dirname(__file__), '..')
+    config = {}
+    if os.path.exists(os.path.join(root, 'config.yaml')):
+        with open(os.path.join(root, 'config.yaml')) as f:
+            config = yaml.safe_load(f) or {}
+    # Sejak tweet_archive_format: parquet tweet baru hanya masuk archive; CSV backup = data lama
+    archive_path = os.path.join(root, config.get('tweet_archive_path', DEFAULT_ARCHIVE_PATH))
     backup_dir = os.path.join(os.path.dirname(__file__), 'backup')
     csv_list = glob.glob(os.path.join(backup_dir, '*processed*.csv'))
     csv_list = [f for f in csv_list if os.path.isfile(f)]
-    print("File yang akan diproses:", csv_list)
+    archive_parts = archive_files(archive_path)
+    print("File yang akan diproses:", csv_list, f"+ {len(archive_parts)} file archive di {archive_path}")
 
-    if not csv_list:
-        print("Tidak ada file CSV yang ditemukan di folder backup/.")
+    if not csv_list and not archive_parts:
+        print("Tidak ada file CSV di folder backup/ maupun archive Parquet.")
         exit(0)
 
     dfs = []
@@ -76,9 +758,15 @@ if __name__ == '__main__':
             dfs.append(pd.read_csv(f))
         except Exception as e:
             print(f"Gagal membaca {f}: {e}")
+    if archive_parts:
+        try:
+            # Hanya kolom yang dipakai ingestion yang dibaca dari Parquet
+            dfs.append(read_archive(archive_path, columns=INGEST_COLUMNS, files=archive_parts))
+        except Exception as e:
+            print(f"Gagal membaca archive {archive_path}: {e}")
 
     if not dfs:
-        print("Tidak ada file CSV yang berhasil dibaca.")
+        print("Tidak ada file CSV atau archive yang berhasil dibaca.")
         exit(0)
 
     all_df = pd.concat(dfs, ignore_index=True)
@@ -1,57 +1,60 @@
 import requests
 import yaml
 import os
+import asyncio
+import json
+import logging
+import random
+import threading
+import time
 from dotenv import load_dotenv
 from utils import setup_logger
-from sentence_transformers import SentenceTransformer
-from qdrant_store import search_qdrant
+from model_registry import get_model_from_config, warmup_from_config
+from answer_cache import get_answer_cache
+from retrieval_cache import encode_query, cached_search, acached_search, get_retrieval_cache, search_uses_fusion
+from qdrant_store import get_vector_store
+from sparse_encoder import get_sparse_encoder
 
 # Load environment variables from local 'env' file if present
 load_dotenv('../.env')
 
-def rag_query(user_query, config):
-    setup_logger()
-    # Ambil context dari Qdrant
-    try:
-        
-        model = SentenceTransformer(config['embedding_model'])
-        query_vec = model.encode([user_query])[0]
-        hits = search_qdrant(
-            collection_name=config['qdrant_collection'],
-            query_embedding=query_vec,
-            top_k=config['top_k']
-        )
-        # Filter relevansi berbasis skor
-        scores = [getattr(h, 'score', None) for h in hits]
-        best_score = max([s for s in scores if s is not None], default=None)
+NO_CONTEXT_ANSWER = "Tidak ditemukan konteks yang relevan di dokumen. Mohon perjelas pertanyaan atau gunakan kata kunci lain."
+SYSTEM_PROMPT = "Kamu hanya boleh menjawab dari konteks yang diberikan. Jika tidak ada, jawab 'Tidak ditemukan'."
+MISSING_KEY_ANSWER = "[ERROR] OpenAI API key missing. Tambahkan 'openai_api_key' di config.yaml atau set environment variable OPENAI_API_KEY."
+
+def filter_hits(hits, config, fused=False):
+    """
+    Filter relevansi berbasis skor; fallback ke top-1 bila filter terlalu ketat.
+    `fused`: hits berasal dari pencarian hybrid (skor RRF), lihat search_uses_fusion.
+    """
+    scores = [getattr(h, 'score', None) for h in hits]
+    best_score = max([s for s in scores if s is not None], default=None)
+    if fused:
+        # Skor RRF bergantung pada peringkat, bukan cosine, jadi min_score tidak berlaku
+        score_ratio = float(config.get('hybrid_score_ratio', 0.5))
+        min_score = 0.0
+    else:
         # Defaults lebih longgar agar stabil untuk query pendek
         score_ratio = float(config.get('score_ratio', 0.6))
         min_score = float(config.get('min_score', 0.0))
-        filtered_hits = []
-        if best_score is not None:
-            for h in hits:
-                s = getattr(h, 'score', None)
-                if s is None:
-                    continue
-                if s >= best_score * score_ratio and s >= min_score:
-                    filtered_hits.append(h)
-        else:
-            filtered_hits = hits
+    filtered_hits = []
+    if best_score is not None:
+        for h in hits:
+            s = getattr(h, 'score', None)
+            if s is None:
+                continue
+            if s >= best_score * score_ratio and s >= min_score:
+                filtered_hits.append(h)
+    else:
+        filtered_hits = hits
 
-        # Jika filter terlalu ketat tapi ada hit, ambil top-1 sebagai fallback
-        if not filtered_hits and hits:
-            filtered_hits = [hits[0]]
-        if not filtered_hits:
-            return "Tidak ditemukan konteks yang relevan di dokumen. Mohon perjelas pertanyaan atau gunakan kata kunci lain."
+    # Jika filter terlalu ketat tapi ada hit, ambil top-1 sebagai fallback
+    if not filtered_hits and hits:
+        filtered_hits = [hits[0]]
+    return filtered_hits
 
-        context = '\n'.join([h.payload.get('text', '') for h in filtered_hits if h.payload.get('text')])
-        meta_info = '\n'.join([str(h.payload) for h in filtered_hits])
-        model_context = f"Konteks berikut adalah satu-satunya sumber jawaban Anda. Jika konteks tidak cukup atau tidak relevan, jawab tepat 'Tidak ditemukan'.\n\n{context}\n\nMetadata:\n{meta_info}\n"
-    except Exception as e:
-        # Jika gagal mengambil konteks, jangan nebak
-        return "Tidak ditemukan konteks yang relevan di dokumen. Mohon perjelas pertanyaan atau gunakan kata kunci lain."
-    
-    prompt = ("Anda adalah asisten AI yang ahli dalam menganalisis informasi. "
+def build_prompt(context, user_query):
+    return ("Anda adalah asisten AI yang ahli dalam menganalisis informasi. "
         "Tugas Anda adalah menjawab pertanyaan pengguna secara akurat HANYA berdasarkan 'KONTEN KONTEKS' yang diberikan di bawah. "
         "Sintesis informasi dari beberapa sumber konteks jika perlu untuk memberikan jawaban yang lengkap.\n\n"
         "Jika informasi untuk menjawab pertanyaan tidak ada dalam konteks, jawab dengan tegas: 'Informasi tidak ditemukan dalam dokumen yang diberikan.'\n\n"
@@ -61,50 +64,315 @@ def rag_query(user_query, config):
         f"Pertanyaan Pengguna: {user_query}\n"
         "Jawaban (dalam Bahasa Indonesia, berdasarkan HANYA dari konteks di atas):")
 
+def llm_settings(config):
+    """Pengaturan OpenAI-compatible API (OpenAI atau OpenRouter) dari config.yaml / env."""
+    return {
+        'api_key': config.get('openai_api_key') or os.getenv('OPENAI_API_KEY'),
+        'api_base': config.get('openai_api_base') or os.getenv('OPENAI_API_BASE') or os.getenv('OPENAI_BASE_URL'),
+        'model': config.get('openai_model') or os.getenv('OPENAI_MODEL') or 'gpt-3.5-turbo',
+        'temperature': float(config.get('openai_temperature', os.getenv('OPENAI_TEMPERATURE') or 0.2)),
+        'max_tokens': int(config.get('openai_max_tokens', 300)),
+    }
+
+def chat_messages(prompt):
+    return [
+        {"role": "system", "content": SYSTEM_PROMPT},
+        {"role": "user", "content": prompt}
+    ]
+
+def rag_query(user_query, config):
+    setup_logger()
+    # Ambil context dari Qdrant
+    try:
+        model = get_model_from_config(config)
+        query_vec = encode_query(model, user_query, config)
+        hits = cached_search(query_vec, config, query_text=user_query)
+        filtered_hits = filter_hits(hits, config, fused=bool(hits) and search_uses_fusion(config, user_query))
+        if not filtered_hits:
+            return NO_CONTEXT_ANSWER
+
+        context = '\n'.join([h.payload.get('text', '') for h in filtered_hits if h.payload.get('text')])
+    except Exception as e:
+        # Jika gagal mengambil konteks, jangan nebak
+        return NO_CONTEXT_ANSWER
+
+    # Query yang mirip dengan konteks (point ID) yang sama -> jawaban dari cache, tanpa API call
+    answer_cache = get_answer_cache(config)
+    point_ids = [h.id for h in filtered_hits]
+    if answer_cache is not None:
+        cached = answer_cache.get(query_vec, point_ids)
+        if cached is not None:
+            return cached
+
+    prompt = build_prompt(context, user_query)
+
     # Pakai OpenAI-compatible API (OpenAI atau OpenRouter)
     try:
         from openai import OpenAI
-        api_key = config.get('openai_api_key') or os.getenv('OPENAI_API_KEY')
-        if not api_key:
-            return "[ERROR] OpenAI API key missing. Tambahkan 'openai_api_key' di config.yaml atau set environment variable OPENAI_API_KEY."
+        settings = llm_settings(config)
+        if not settings['api_key']:
+            return MISSING_KEY_ANSWER
 
-        api_base = config.get('openai_api_base') or os.getenv('OPENAI_API_BASE') or os.getenv('OPENAI_BASE_URL')
-        if api_base:
-            client = OpenAI(api_key=api_key, base_url=api_base)
+        if settings['api_base']:
+            client = OpenAI(api_key=settings['api_key'], base_url=settings['api_base'])
         else:
-            client = OpenAI(api_key=api_key)
+            client = OpenAI(api_key=settings['api_key'])
 
-        model_name = (
-            config.get('openai_model') or os.getenv('OPENAI_MODEL') or 'gpt-3.5-turbo'
+        response = client.chat.completions.create(
+            model=settings['model'],
+            messages=chat_messages(prompt),
+            max_tokens=settings['max_tokens'],
+            temperature=settings['temperature']
         )
+        answer = extract_answer(response)
+        if answer_cache is not None and answer:
+            answer_cache.put(query_vec, point_ids, answer)
+        return answer
+    except Exception as e:
+        return f"[ERROR] OpenAI API error: {e}"
 
-        temperature = float(config.get('openai_temperature', os.getenv('OPENAI_TEMPERATURE') or 0.2))
-        response = client.chat.completions.create(
-            model=model_name,
-            messages=[
-                {"role": "system", "content": "Kamu hanya boleh menjawab dari konteks yang diberikan. Jika tidak ada, jawab 'Tidak ditemukan'."},
-                {"role": "user", "content": prompt}
-            ],
-            max_tokens=300,
-            temperature=temperature
+def extract_answer(response):
+    """Robust extraction across SDK and providers"""
+    try:
+        return response.choices[0].message.content.strip()
+    except Exception:
+        if isinstance(response, dict):
+            content = (
+                response.get('choices', [{}])[0]
+                        .get('message', {})
+                        .get('content', '')
+            )
+            if content:
+                return content.strip()
+        if isinstance(response, str):
+            return response
+        return str(response)
+
+# Client AsyncOpenAI per (api_key, base_url, event loop); client async terikat ke loop-nya
+_async_llm_clients = {}
+
+def _async_llm_client(settings):
+    from openai import AsyncOpenAI
+    key = (settings['api_key'], settings['api_base'], id(asyncio.get_running_loop()))
+    client = _async_llm_clients.get(key)
+    if client is None:
+        kwargs = {'api_key': settings['api_key']}
+        if settings['api_base']:
+            kwargs['base_url'] = settings['api_base']
+        client = AsyncOpenAI(**kwargs)
+        _async_llm_clients[key] = client
+    return client
+
+async def arag_query(user_query, config):
+    """
+    Versi async dari rag_query yang mengalirkan jawaban token demi token.
+
+    Encode query berjalan di thread pool agar event loop tetap bebas melayani
+    query lain, pencarian memakai AsyncQdrantClient, dan jawaban di-stream
+    (`stream=True`) sehingga token pertama bisa langsung ditampilkan.
+
+    Yields:
+        str: potongan teks jawaban (atau satu pesan error/tidak ditemukan)
+    """
+    setup_logger()
+    settings = llm_settings(config)
+    try:
+        query_vec = await asyncio.to_thread(lambda: encode_query(get_model_from_config(config), user_query, config))
+        hits = await acached_search(query_vec, config, query_text=user_query)
+        fused = bool(hits) and await asyncio.to_thread(search_uses_fusion, config, user_query)
+        filtered_hits = filter_hits(hits, config, fused=fused)
+        if not filtered_hits:
+            yield NO_CONTEXT_ANSWER
+            return
+        context = '\n'.join([h.payload.get('text', '') for h in filtered_hits if h.payload.get('text')])
+    except Exception:
+        # Jika gagal mengambil konteks, jangan nebak
+        yield NO_CONTEXT_ANSWER
+        return
+
+    answer_cache = get_answer_cache(config)
+    point_ids = [h.id for h in filtered_hits]
+    if answer_cache is not None:
+        cached = answer_cache.get(query_vec, point_ids)
+        if cached is not None:
+            yield cached
+            return
+
+    if not settings['api_key']:
+        yield MISSING_KEY_ANSWER
+        return
+    pieces = []
+    try:
+        client = _async_llm_client(settings)
+        stream = await client.chat.completions.create(
+            model=settings['model'],
+            messages=chat_messages(build_prompt(context, user_query)),
+            max_tokens=settings['max_tokens'],
+            temperature=settings['temperature'],
+            stream=True
         )
-        # Robust extraction across SDK and providers
+        async for chunk in stream:
+            if not chunk.choices:
+                continue
+            delta = chunk.choices[0].delta.content
+            if delta:
+                pieces.append(delta)
+                yield delta
+    except Exception as e:
+        yield f"[ERROR] OpenAI API error: {e}"
+        return
+    # Hanya jawaban yang selesai utuh yang disimpan ke cache
+    answer = ''.join(pieces).strip()
+    if answer_cache is not None and answer:
+        answer_cache.put(query_vec, point_ids, answer)
+
+# Satu event loop latar belakang yang hidup selama proses, supaya client async
+# (Qdrant dan OpenAI) bisa dipakai ulang oleh pemanggil sinkron seperti Streamlit.
+_loop = None
+_loop_lock = threading.Lock()
+
+def _background_loop():
+    global _loop
+    with _loop_lock:
+        if _loop is None:
+            _loop = asyncio.new_event_loop()
+            threading.Thread(target=_loop.run_forever, name='rag-async-loop', daemon=True).start()
+    return _loop
+
+def rag_query_stream(user_query, config):
+    """Generator sinkron di atas arag_query, mis. untuk `st.write_stream`."""
+    loop = _background_loop()
+    agen = arag_query(user_query, config)
+    while True:
         try:
-            return response.choices[0].message.content.strip()
-        except Exception:
-            if isinstance(response, dict):
-                content = (
-                    response.get('choices', [{}])[0]
-                            .get('message', {})
-                            .get('content', '')
+            yield asyncio.run_coroutine_threadsafe(agen.__anext__(), loop).result()
+        except StopAsyncIteration:
+            break
+
+async def _acomplete_with_backoff(client, settings, prompt, semaphore, max_retries):
+    """Satu chat completion di bawah semaphore; retry eksponensial saat rate limit / error sementara."""
+    import openai
+    retryable = (openai.RateLimitError, openai.APITimeoutError, openai.APIConnectionError,
+                 openai.InternalServerError)
+    async with semaphore:
+        for attempt in range(max_retries + 1):
+            try:
+                response = await client.chat.completions.create(
+                    model=settings['model'],
+                    messages=chat_messages(prompt),
+                    max_tokens=settings['max_tokens'],
+                    temperature=settings['temperature']
                 )
-                if content:
-                    return content.strip()
-            if isinstance(response, str):
-                return response
-            return str(response)
+                return extract_answer(response)
+            except retryable as e:
+                if attempt == max_retries:
+                    raise
+                # Hormati header Retry-After bila provider mengirimkannya
+                retry_after = None
+                response = getattr(e, 'response', None)
+                if response is not None:
+                    try:
+                        retry_after = float(response.headers.get('retry-after'))
+                    except (TypeError, ValueError):
+                        retry_after = None
+                await asyncio.sleep(retry_after or min(30.0, 2 ** attempt) + random.random())
+
+async def _aanswer_all(prompts, settings, concurrency, max_retries):
+    client = _async_llm_client(settings)
+    semaphore = asyncio.Semaphore(max(1, int(concurrency)))
+    tasks = [_acomplete_with_backoff(client, settings, p, semaphore, max_retries) for p in prompts]
+    results = await asyncio.gather(*tasks, return_exceptions=True)
+    return [f"[ERROR] OpenAI API error: {r}" if isinstance(r, Exception) else r for r in results]
+
+def rag_query_batch(questions, config, output_path=None):
+    """
+    Jawab banyak pertanyaan sekaligus (evaluasi offline / FAQ).
+
+    Semua query di-encode dalam satu panggilan model.encode, dicari dengan satu
+    request search_batch ke Qdrant, lalu panggilan LLM disebar ke paling banyak
+    `llm_concurrency` request paralel dengan backoff saat kena rate limit.
+
+    Args:
+        questions (list): Daftar pertanyaan
+        config (dict): Konfigurasi dari config.yaml
+        output_path (str): Jika diisi, hasil ditulis sebagai JSONL
+
+    Returns:
+        tuple: (results, timings) - results berisi dict question/answer/point_ids/scores
+               per pertanyaan, timings berisi detik per tahap
+    """
+    setup_logger()
+    questions = list(questions)
+    timings = {}
+    started = time.perf_counter()
+
+    model = get_model_from_config(config)
+    query_vecs = model.encode(questions, batch_size=config.get('encode_batch_size', 64),
+                              show_progress_bar=False)
+    timings['encode'] = time.perf_counter() - started
+
+    t = time.perf_counter()
+    sparse_encoder = get_sparse_encoder(config)
+    query_sparse = [sparse_encoder.encode_query(q) for q in questions] if sparse_encoder else None
+    store = get_vector_store(config)
+    try:
+        all_hits = store.search_batch(config['qdrant_collection'], query_vecs,
+                                      top_k=config['top_k'], query_sparse=query_sparse)
     except Exception as e:
-        return f"[ERROR] OpenAI API error: {e}"
+        logging.error(f"search_batch failed: {e}")
+        all_hits = [[] for _ in questions]
+    timings['search'] = time.perf_counter() - t
+
+    results = []
+    pending = []  # (index hasil, prompt) yang masih butuh LLM
+    answer_cache = get_answer_cache(config)
+    sparse_queries = query_sparse or [None] * len(questions)
+    for question, query_vec, hits, sparse in zip(questions, query_vecs, all_hits, sparse_queries):
+        # Skor RRF hanya bila query ini benar-benar difusikan dengan BM25
+        fused = bool(hits) and store.uses_fusion(config['qdrant_collection'], sparse)
+        filtered_hits = filter_hits(hits, config, fused=fused)
+        result = {
+            'question': question,
+            'answer': None,
+            'point_ids': [str(h.id) for h in filtered_hits],
+            'scores': [h.score for h in filtered_hits],
+        }
+        results.append(result)
+        if not filtered_hits:
+            result['answer'] = NO_CONTEXT_ANSWER
+            continue
+        if answer_cache is not None:
+            result['answer'] = answer_cache.get(query_vec, result['point_ids'])
+            if result['answer'] is not None:
+                continue
+        context = '\n'.join([h.payload.get('text', '') for h in filtered_hits if h.payload.get('text')])
+        pending.append((len(results) - 1, build_prompt(context, question)))
+
+    t = time.perf_counter()
+    settings = llm_settings(config)
+    if pending and not settings['api_key']:
+        for i, _ in pending:
+            results[i]['answer'] = MISSING_KEY_ANSWER
+    elif pending:
+        coro = _aanswer_all([p for _, p in pending], settings,
+                            config.get('llm_concurrency', 4), config.get('llm_max_retries', 5))
+        answers = asyncio.run_coroutine_threadsafe(coro, _background_loop()).result()
+        for (i, _), answer in zip(pending, answers):
+            results[i]['answer'] = answer
+            if answer_cache is not None and answer and not answer.startswith('[ERROR]'):
+                answer_cache.put(query_vecs[i], results[i]['point_ids'], answer)
+    timings['llm'] = time.perf_counter() - t
+
+    if output_path:
+        t = time.perf_counter()
+        if os.path.dirname(output_path):
+            os.makedirs(os.path.dirname(output_path), exist_ok=True)
+        with open(output_path, 'w', encoding='utf-8') as f:
+            for result in results:
+                f.write(json.dumps(result, ensure_ascii=False) + '\n')
+        timings['write'] = time.perf_counter() - t
+    timings['total'] = time.perf_counter() - started
+    return results, timings
 
 def print_header():
     print("="*60)
@@ -115,12 +383,20 @@ def print_header():
 if __name__ == '__main__':
     with open('config.yaml') as f:
         config = yaml.safe_load(f)
+    warmup_from_config(config)
     print_header()
     while True:
         user_query = input("\nAnda  : ")
         if user_query.strip().lower() in ['exit', 'quit', 'keluar']:
             print("Bot   : Sampai jumpa! 👋")
+            answer_cache = get_answer_cache(config)
+            if answer_cache is not None:
+                print(f"Answer cache: {answer_cache.stats()}")
+            retrieval_cache = get_retrieval_cache(config)
+            if retrieval_cache is not None:
+                print(f"Retrieval cache: {retrieval_cache.stats()}")
             break
-        print("Bot    : (memproses...)\n")
-        answer = rag_query(user_query, config)
-        print(f"Bot   : {answer}")
\ No newline at end of file
+        print("Bot   : ", end="", flush=True)
+        for piece in rag_query_stream(user_query, config):
+            print(piece, end="", flush=True)
+        print()
@@ -0,0 +1,56 @@
+#!/usr/bin/env python3
+"""
+Batch RAG
+Answers a list of questions (one per line, or JSONL with a "question" field) with
+rag_query_batch and writes the results as JSONL, reporting time per stage.
+
+Usage (dari folder src):
+    python rag_batch.py faq.txt --out ../data/faq_answers.jsonl --concurrency 8
+"""
+
+import argparse
+import json
+import yaml
+from model_registry import warmup_from_config
+from rag import rag_query_batch
+
+
+def load_questions(path):
+    questions = []
+    with open(path, encoding='utf-8') as f:
+        for line in f:
+            line = line.strip()
+            if not line:
+                continue
+            if path.endswith('.jsonl'):
+                line = json.loads(line)['question']
+            questions.append(line)
+    return questions
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('questions', help='File .txt (satu pertanyaan per baris) atau .jsonl')
+    parser.add_argument('--out', default='../data/rag_batch_results.jsonl')
+    parser.add_argument('--config', default='../config.yaml')
+    parser.add_argument('--concurrency', type=int, help='Override llm_concurrency')
+    args = parser.parse_args()
+
+    with open(args.config) as f:
+        config = yaml.safe_load(f)
+    if args.concurrency:
+        config['llm_concurrency'] = args.concurrency
+
+    questions = load_questions(args.questions)
+    print(f"{len(questions)} questions")
+    warmup_from_config(config)
+    results, timings = rag_query_batch(questions, config, output_path=args.out)
+
+    errors = sum(1 for r in results if r['answer'].startswith('[ERROR]'))
+    for stage, seconds in timings.items():
+        print(f"{stage:>8}: {seconds:.2f}s")
+    print(f"{len(results) / timings['total']:.1f} questions/sec, {errors} errors -> {args.out}")
+
+
+if __name__ == '__main__':
+    main()
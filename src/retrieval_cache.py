@@ -0,0 +1,270 @@
+"""
+Retrieval Cache
+Two memory-bounded LRU levels in front of the query path:
+  1. normalized query text -> query embedding
+  2. (collection, collection version, quantized embedding, sparse query, top_k, filter) -> hits
+
+The collection version is a small JSON counter file shared by every process. The
+ingestion side bumps it after each upsert, so cached hits never outlive new data.
+"""
+
+import json
+import os
+import sys
+import threading
+from collections import OrderedDict
+import numpy as np
+from qdrant_store import get_vector_store
+from sparse_encoder import get_sparse_encoder
+from model_registry import embedding_model_id
+
+# Embedding dibulatkan ke 4 desimal agar hasil encode yang beda di digit terakhir
+# (mis. CPU vs batch berbeda) tetap jatuh ke key yang sama
+_QUANTIZE_SCALE = 1e4
+
+
+class ByteLRU:
+    """Thread-safe LRU mapping bounded by an estimate of the bytes it holds."""
+
+    def __init__(self, max_bytes):
+        self.max_bytes = int(max_bytes)
+        self._items = OrderedDict()  # key -> (value, size)
+        self._bytes = 0
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def get(self, key):
+        with self._lock:
+            item = self._items.get(key)
+            if item is None:
+                self.misses += 1
+                return None
+            self._items.move_to_end(key)
+            self.hits += 1
+            return item[0]
+
+    def put(self, key, value, size):
+        if size > self.max_bytes:
+            return
+        with self._lock:
+            old = self._items.pop(key, None)
+            if old is not None:
+                self._bytes -= old[1]
+            self._items[key] = (value, size)
+            self._bytes += size
+            while self._bytes > self.max_bytes:
+                _, (_, evicted) = self._items.popitem(last=False)
+                self._bytes -= evicted
+                self.evictions += 1
+
+    def clear(self):
+        with self._lock:
+            self._items.clear()
+            self._bytes = 0
+
+    def stats(self):
+        total = self.hits + self.misses
+        return {
+            'entries': len(self._items),
+            'bytes': self._bytes,
+            'hits': self.hits,
+            'misses': self.misses,
+            'hit_rate': self.hits / total if total else 0.0,
+            'evictions': self.evictions,
+        }
+
+
+class CollectionVersions:
+    """
+    Per-collection version counters in a JSON file. Readers only re-read the file
+    when its mtime changes, so checking the version costs one os.stat.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self._versions = {}
+        self._stamp = None
+        self._lock = threading.Lock()
+
+    def _refresh(self):
+        try:
+            st = os.stat(self.path)
+        except FileNotFoundError:
+            return
+        stamp = (st.st_mtime_ns, st.st_size)
+        if stamp == self._stamp:
+            return
+        try:
+            with open(self.path, encoding='utf-8') as f:
+                self._versions = json.load(f)
+            self._stamp = stamp
+        except (OSError, ValueError):
+            # File sedang ditulis proses lain; coba lagi di lookup berikutnya
+            pass
+
+    def get(self, collection_name):
+        with self._lock:
+            self._refresh()
+            return self._versions.get(collection_name, 0)
+
+    def bump(self, collection_name):
+        with self._lock:
+            self._refresh()
+            self._versions[collection_name] = self._versions.get(collection_name, 0) + 1
+            if os.path.dirname(self.path):
+                os.makedirs(os.path.dirname(self.path), exist_ok=True)
+            tmp = f"{self.path}.{os.getpid()}.tmp"
+            with open(tmp, 'w', encoding='utf-8') as f:
+                json.dump(self._versions, f)
+            os.replace(tmp, self.path)
+            self._stamp = None
+            return self._versions[collection_name]
+
+
+def _hits_size(hits):
+    size = 0
+    for h in hits:
+        payload = getattr(h, 'payload', None) or {}
+        size += 200 + sum(sys.getsizeof(v) for v in payload.values())
+    return size
+
+
+class RetrievalCache:
+    """Query-embedding and search-result caches sharing one memory budget."""
+
+    def __init__(self, max_bytes, versions):
+        self.embeddings = ByteLRU(max_bytes // 4)
+        self.results = ByteLRU(max_bytes - max_bytes // 4)
+        self.versions = versions
+
+    @staticmethod
+    def normalize_query(text):
+        return ' '.join(str(text).lower().split())
+
+    def encode(self, model, model_name, text):
+        key = (model_name, self.normalize_query(text))
+        vector = self.embeddings.get(key)
+        if vector is None:
+            vector = np.asarray(model.encode([text])[0], dtype=np.float32)
+            self.embeddings.put(key, vector, vector.nbytes + len(key[1]) + 100)
+        return vector
+
+    def result_key(self, collection_name, query_embedding, top_k, query_filter=None, query_sparse=None):
+        quantized = np.round(np.asarray(query_embedding, dtype=np.float32) * _QUANTIZE_SCALE).astype(np.int32)
+        sparse_key = tuple(query_sparse[0]) if query_sparse else None
+        return (collection_name, self.versions.get(collection_name), quantized.tobytes(), sparse_key,
+                int(top_k), repr(query_filter))
+
+    def get_hits(self, key):
+        hits = self.results.get(key)
+        return list(hits) if hits is not None else None
+
+    def put_hits(self, key, hits):
+        self.results.put(key, list(hits), _hits_size(hits))
+
+    def clear(self):
+        self.embeddings.clear()
+        self.results.clear()
+
+    def stats(self):
+        return {'embeddings': self.embeddings.stats(), 'results': self.results.stats()}
+
+
+_versions = {}
+_caches = {}
+_lock = threading.Lock()
+
+
+def get_collection_versions(config):
+    path = config.get('collection_versions_path', 'cache/collection_versions.json')
+    with _lock:
+        versions = _versions.get(path)
+        if versions is None:
+            versions = _versions[path] = CollectionVersions(path)
+    return versions
+
+
+def bump_collection_version(config, collection_name=None):
+    """Called by ingestion after an upsert so cached search results are dropped."""
+    return get_collection_versions(config).bump(collection_name or config['qdrant_collection'])
+
+
+def get_retrieval_cache(config):
+    """Process-wide retrieval cache, or None when `retrieval_cache_max_mb` is 0."""
+    max_mb = config.get('retrieval_cache_max_mb', 64)
+    if not max_mb:
+        return None
+    versions = get_collection_versions(config)
+    with _lock:
+        cache = _caches.get(versions.path)
+        if cache is None:
+            cache = _caches[versions.path] = RetrievalCache(int(max_mb * 1024 * 1024), versions)
+    return cache
+
+
+def encode_query(model, user_query, config):
+    """Query embedding through level 1 of the cache."""
+    cache = get_retrieval_cache(config)
+    if cache is None:
+        return model.encode([user_query])[0]
+    return cache.encode(model, embedding_model_id(config), user_query)
+
+
+def _search_args(query_embedding, config, top_k, query_filter, query_text):
+    top_k = top_k or config['top_k']
+    sparse_encoder = get_sparse_encoder(config)
+    query_sparse = sparse_encoder.encode_query(query_text) if sparse_encoder and query_text else None
+    cache = get_retrieval_cache(config)
+    key = None
+    if cache is not None:
+        key = cache.result_key(config['qdrant_collection'], query_embedding, top_k, query_filter, query_sparse)
+    kwargs = dict(
+        collection_name=config['qdrant_collection'],
+        query_embedding=query_embedding,
+        top_k=top_k,
+        query_filter=query_filter,
+        query_sparse=query_sparse
+    )
+    return get_vector_store(config), cache, key, kwargs
+
+
+def cached_search(query_embedding, config, top_k=None, query_filter=None, query_text=None):
+    """
+    Vector-store search through level 2 of the cache. With `hybrid_search` on, `query_text`
+    adds the BM25 sparse query (fused with the dense one by RRF).
+    """
+    store, cache, key, kwargs = _search_args(query_embedding, config, top_k, query_filter, query_text)
+    if key is not None:
+        hits = cache.get_hits(key)
+        if hits is not None:
+            return hits
+    hits = store.search(**kwargs)
+    if key is not None:
+        cache.put_hits(key, hits)
+    return hits
+
+
+def search_uses_fusion(config, query_text=None):
+    """
+    Whether cached_search with this `query_text` returns RRF-fused scores. Dense-only
+    searches (hybrid_search off, local backend, empty BM25 query, collection without
+    the sparse vector) return cosine scores.
+    """
+    sparse_encoder = get_sparse_encoder(config)
+    query_sparse = sparse_encoder.encode_query(query_text) if sparse_encoder and query_text else None
+    return get_vector_store(config).uses_fusion(config['qdrant_collection'], query_sparse)
+
+
+async def acached_search(query_embedding, config, top_k=None, query_filter=None, query_text=None):
+    """Async counterpart of cached_search."""
+    store, cache, key, kwargs = _search_args(query_embedding, config, top_k, query_filter, query_text)
+    if key is not None:
+        hits = cache.get_hits(key)
+        if hits is not None:
+            return hits
+    hits = await store.asearch(**kwargs)
+    if key is not None:
+        cache.put_hits(key, hits)
+    return hits
@@ -8,6 +8,15 @@ import spacy
 import re
 import pandas as pd
 from typing import List, Optional
+from text_normalizer import BASIC_NORMALIZER
+
+_NON_WORD = re.compile(r'[^\w\s]')
+
+# Komponen pipeline yang dibutuhkan per atribut token. is_stop/is_punct adalah
+# atribut leksikal, jadi tidak butuh komponen apa pun; parser tidak pernah dipakai.
+_LEMMA_COMPONENTS = {'tok2vec', 'tagger', 'morphologizer', 'attribute_ruler', 'lemmatizer'}
+_NER_COMPONENTS = {'tok2vec', 'ner'}
+_POS_COMPONENTS = {'tok2vec', 'tagger', 'morphologizer', 'attribute_ruler'}
 
 class SpacyPreprocessor:
     """Advanced text preprocessing using Spacy"""
@@ -27,6 +36,8 @@ class SpacyPreprocessor:
             import subprocess
             subprocess.run(['python', '-m', 'spacy', 'download', model_name])
             self.nlp = spacy.load(model_name)
+        # Hasil parse terakhir (text, doc), dipakai bersama oleh extract_entities dan get_pos_tags
+        self._last_parse = None
     
     def clean_text_basic(self, text: str) -> str:
         """
@@ -38,28 +49,7 @@ class SpacyPreprocessor:
         Returns:
             str: Cleaned text
         """
-        if not isinstance(text, str):
-            return ""
-        
-        # Convert to lowercase
-        text = text.lower()
-        
-        # Remove URLs
-        text = re.sub(r'http[s]?://(?:[a-zA-Z]|[0-9]|[$-_@.&+]|[!*\\(\\),]|(?:%[0-9a-fA-F][0-9a-fA-F]))+', '', text)
-        
-        # Remove mentions (@username)
-        text = re.sub(r'@\w+', '', text)
-        
-        # Remove hashtags but keep the text
-        text = re.sub(r'#(\w+)', r'\1', text)
-        
-        # Remove numbers
-        text = re.sub(r'\d+', '', text)
-        
-        # Remove extra whitespace
-        text = re.sub(r'\s+', ' ', text)
-        
-        return text.strip()
+        return BASIC_NORMALIZER.normalize(text)
     
     def preprocess_with_spacy(self, text: str, 
                              remove_stopwords: bool = True,
@@ -87,10 +77,26 @@ class SpacyPreprocessor:
         # Basic cleaning first
         text = self.clean_text_basic(text)
         
-        # Process with spacy
-        doc = self.nlp(text)
-        
-        # Extract tokens based on criteria
+        # Process with spacy (hanya komponen yang dibutuhkan opsi di atas)
+        disable = self._disabled_components(lemmatize=lemmatize, entities=remove_entities)
+        with self.nlp.select_pipes(disable=disable):
+            doc = self.nlp(text)
+        return self._doc_to_text(doc, remove_stopwords, lemmatize, remove_punct, remove_entities, min_length)
+
+    def _disabled_components(self, lemmatize=False, entities=False, pos=False) -> List[str]:
+        """Nama komponen pipeline yang tidak dibutuhkan untuk atribut yang diminta."""
+        needed = set()
+        if lemmatize:
+            needed |= _LEMMA_COMPONENTS
+        if entities:
+            needed |= _NER_COMPONENTS
+        if pos:
+            needed |= _POS_COMPONENTS
+        return [name for name in self.nlp.pipe_names if name not in needed]
+
+    @staticmethod
+    def _doc_to_text(doc, remove_stopwords, lemmatize, remove_punct, remove_entities, min_length) -> str:
+        """Filter token dari satu Doc menjadi teks hasil preprocessing."""
         tokens = []
         for token in doc:
             # Skip if too short
@@ -116,13 +122,22 @@ class SpacyPreprocessor:
                 token_text = token.text
             
             # Clean the token
-            token_text = re.sub(r'[^\w\s]', '', token_text)
+            token_text = _NON_WORD.sub('', token_text)
             token_text = token_text.strip()
             
             if token_text and len(token_text) >= min_length:
                 tokens.append(token_text)
         
         return ' '.join(tokens)
+
+    def _parse(self, text: str):
+        """Parse penuh (NER + POS) dengan memo satu entri untuk teks yang sama."""
+        if self._last_parse is not None and self._last_parse[0] == text:
+            return self._last_parse[1]
+        with self.nlp.select_pipes(disable=self._disabled_components(entities=True, pos=True)):
+            doc = self.nlp(text)
+        self._last_parse = (text, doc)
+        return doc
     
     def extract_entities(self, text: str) -> List[str]:
         """
@@ -134,7 +149,7 @@ class SpacyPreprocessor:
         Returns:
             List[str]: List of entities
         """
-        doc = self.nlp(text)
+        doc = self._parse(text)
         entities = []
         for ent in doc.ents:
             entities.append(f"{ent.text} ({ent.label_})")
@@ -150,7 +165,7 @@ class SpacyPreprocessor:
         Returns:
             List[str]: List of POS tags
         """
-        doc = self.nlp(text)
+        doc = self._parse(text)
         pos_tags = []
         for token in doc:
             pos_tags.append(f"{token.text} ({token.pos_})")
@@ -163,10 +178,15 @@ class SpacyPreprocessor:
                            lemmatize: bool = True,
                            remove_punct: bool = True,
                            remove_entities: bool = True,
-                           min_length: int = 2) -> pd.DataFrame:
+                           min_length: int = 2,
+                           batch_size: int = 256,
+                           n_process: int = 1) -> pd.DataFrame:
         """
         Preprocess text in a DataFrame
         
+        Teks diproses dalam batch lewat nlp.pipe; komponen yang tidak dibutuhkan
+        opsi di bawah (mis. parser, NER bila remove_entities=False) dimatikan.
+        
         Args:
             df (pd.DataFrame): Input DataFrame
             text_column (str): Column name containing text
@@ -176,29 +196,50 @@ class SpacyPreprocessor:
             remove_punct (bool): Remove punctuation
             remove_entities (bool): Remove named entities
             min_length (int): Minimum token length
+            batch_size (int): Texts per nlp.pipe batch
+            n_process (int): Worker processes for nlp.pipe (-1 = all cores)
             
         Returns:
             pd.DataFrame: DataFrame with processed text
         """
         df_copy = df.copy()
         
-        # Apply preprocessing to text column
-        df_copy[new_column] = df_copy[text_column].apply(
-            lambda x: self.preprocess_with_spacy(
-                str(x), 
-                remove_stopwords, 
-                lemmatize, 
-                remove_punct, 
-                remove_entities, 
-                min_length
-            )
-        )
+        texts = BASIC_NORMALIZER.normalize_series(df_copy[text_column])
+        disable = self._disabled_components(lemmatize=lemmatize, entities=remove_entities)
+        docs = self.nlp.pipe(texts, batch_size=batch_size, n_process=n_process, disable=disable)
+        df_copy[new_column] = [
+            self._doc_to_text(doc, remove_stopwords, lemmatize, remove_punct, remove_entities, min_length)
+            for doc in docs
+        ]
         
         return df_copy
 
+    def analyze_texts(self, texts: List[str], batch_size: int = 256, n_process: int = 1) -> List[dict]:
+        """
+        Entities and POS tags for many texts from a single batched parse each
+        
+        Args:
+            texts (List[str]): Input texts
+            batch_size (int): Texts per nlp.pipe batch
+            n_process (int): Worker processes for nlp.pipe
+            
+        Returns:
+            List[dict]: {'entities': [...], 'pos_tags': [...]} per text
+        """
+        disable = self._disabled_components(entities=True, pos=True)
+        results = []
+        for doc in self.nlp.pipe(texts, batch_size=batch_size, n_process=n_process, disable=disable):
+            results.append({
+                'entities': [f"{ent.text} ({ent.label_})" for ent in doc.ents],
+                'pos_tags': [f"{token.text} ({token.pos_})" for token in doc],
+            })
+        return results
+
 def preprocess_tweets_with_spacy(csv_path: str, 
                                 output_path: Optional[str] = None,
-                                model_name: str = 'en_core_web_sm') -> pd.DataFrame:
+                                model_name: str = 'en_core_web_sm',
+                                batch_size: int = 256,
+                                n_process: int = 1) -> pd.DataFrame:
     """
     Preprocess tweets using spacy
     
@@ -206,6 +247,8 @@ def preprocess_tweets_with_spacy(csv_path: str,
         csv_path (str): Path to CSV file
         output_path (str): Path to save processed CSV
         model_name (str): Spacy model to use
+        batch_size (int): Texts per nlp.pipe batch
+        n_process (int): Worker processes for nlp.pipe
         
     Returns:
         pd.DataFrame: Processed DataFrame
@@ -241,7 +284,9 @@ def preprocess_tweets_with_spacy(csv_path: str,
         lemmatize=True,
         remove_punct=True,
         remove_entities=False,  # Keep entities for analysis
-        min_length=2
+        min_length=2,
+        batch_size=batch_size,
+        n_process=n_process
     )
     
     # Save processed data
@@ -0,0 +1,67 @@
+"""
+BM25 Sparse Encoder
+Sparse vectors for hybrid retrieval. Tokens are the `processed_text` tokens of the
+tweet pipeline (TWEET_NORMALIZER), hashed to stable indices so no vocabulary has
+to be stored. Documents carry the BM25 term-frequency part; Qdrant applies the
+IDF part itself (sparse vector modifier 'idf'), so nothing here depends on corpus
+statistics except the expected average document length.
+"""
+
+import threading
+import zlib
+from collections import Counter
+from text_normalizer import TWEET_NORMALIZER
+
+
+def token_index(token):
+    """Stable 31-bit index of a token (Python's hash() differs per process)."""
+    return zlib.crc32(token.encode('utf-8')) & 0x7FFFFFFF
+
+
+class BM25SparseEncoder:
+    """Encodes texts to (indices, values) sparse vectors."""
+
+    def __init__(self, k1=1.2, b=0.75, avg_doc_len=16, normalizer=TWEET_NORMALIZER):
+        self.k1 = float(k1)
+        self.b = float(b)
+        self.avg_doc_len = float(avg_doc_len)
+        self.normalizer = normalizer
+
+    def tokens(self, text):
+        return self.normalizer.normalize(text).split()
+
+    def encode_document(self, text):
+        tokens = self.tokens(text)
+        if not tokens:
+            return [], []
+        norm = self.k1 * (1 - self.b + self.b * len(tokens) / self.avg_doc_len)
+        weights = {}
+        for token, tf in Counter(tokens).items():
+            # Tabrakan hash dijumlahkan, bukan ditimpa
+            index = token_index(token)
+            weights[index] = weights.get(index, 0.0) + tf * (self.k1 + 1) / (tf + norm)
+        indices = sorted(weights)
+        return indices, [weights[i] for i in indices]
+
+    def encode_documents(self, texts):
+        return [self.encode_document(text) for text in texts]
+
+    def encode_query(self, text):
+        indices = sorted({token_index(token) for token in self.tokens(text)})
+        return indices, [1.0] * len(indices)
+
+
+_encoders = {}
+_encoders_lock = threading.Lock()
+
+
+def get_sparse_encoder(config):
+    """Shared encoder for config.yaml, or None when `hybrid_search` is off."""
+    if not config.get('hybrid_search', False):
+        return None
+    key = (config.get('bm25_k1', 1.2), config.get('bm25_b', 0.75), config.get('bm25_avg_doc_len', 16))
+    with _encoders_lock:
+        encoder = _encoders.get(key)
+        if encoder is None:
+            encoder = _encoders[key] = BM25SparseEncoder(*key)
+    return encoder
@@ -2,7 +2,8 @@ import os
 import yaml
 import streamlit as st
 from dotenv import load_dotenv
-from rag import rag_query
+from rag import rag_query, rag_query_stream
+from model_registry import warmup, onnx_options
 
 
 def load_config(config_path: str = '../config.yaml') -> dict:
@@ -10,11 +11,21 @@ def load_config(config_path: str = '../config.yaml') -> dict:
         return yaml.safe_load(f)
 
 
+@st.cache_resource(show_spinner="Memuat model embedding…")
+def warmup_embedding_model(model_name: str, device=None, backend: str = 'torch', options=None) -> bool:
+    # Model disimpan di registry proses, jadi rerun Streamlit tidak memuat ulang
+    warmup(model_name, device, backend, **(options or {}))
+    return True
+
+
 def main() -> None:
     load_dotenv('.env')
     config = load_config()
 
     st.set_page_config(page_title="Chatbot RAG", page_icon="🤖", layout="wide")
+    backend = config.get('embedding_backend', 'torch')
+    warmup_embedding_model(config['embedding_model'], config.get('embedding_device'), backend,
+                           onnx_options(config) if backend != 'torch' else None)
 
     with st.sidebar:
         st.subheader("🕘 Riwayat Chat")
@@ -61,16 +72,20 @@ def main() -> None:
         with st.chat_message("user"):
             st.markdown(user_message)
 
-        # Dapatkan jawaban
-        try:
-            with st.spinner("Sedang memproses jawaban…"):
-                answer = rag_query(user_message, config)
-        except Exception as e:
-            answer = f"[ERROR] {e}"
+        # Dapatkan jawaban; token di-stream begitu datang dari LLM
+        with st.chat_message("assistant"):
+            try:
+                if config.get('stream_answers', True):
+                    answer = st.write_stream(rag_query_stream(user_message, config))
+                else:
+                    with st.spinner("Sedang memproses jawaban…"):
+                        answer = rag_query(user_message, config)
+                    st.markdown(answer)
+            except Exception as e:
+                answer = f"[ERROR] {e}"
+                st.markdown(answer)
 
         st.session_state.chat_history.append({"role": "assistant", "content": answer})
-        with st.chat_message("assistant"):
-            st.markdown(answer)
 
 
 if __name__ == "__main__":
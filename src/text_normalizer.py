@@ -0,0 +1,126 @@
+"""
+Text Normalizer
+One precompiled, configurable cleaner shared by every preprocessing path
+(utils.clean_text, daily collection, integrated pipeline, SpacyPreprocessor).
+"""
+
+import re
+import pandas as pd
+
+INDONESIAN_STOPWORDS = frozenset([
+    'yang', 'dan', 'di', 'ke', 'dari', 'untuk', 'dengan', 'ini', 'itu', 'atau', 'juga', 'bisa',
+    'akan', 'sudah', 'masih', 'belum', 'tidak', 'bukan', 'ada', 'saya', 'kamu', 'dia', 'mereka',
+    'kami', 'kita', 'anda', 'nya', 'lah', 'kah', 'tah', 'pun', 'per', 'para', 'oleh', 'kepada',
+    'terhadap', 'antara', 'dalam', 'atas', 'bawah', 'depan', 'belakang', 'samping', 'luar',
+    'sebelah', 'setelah', 'sebelum', 'ketika', 'sambil', 'selama', 'hingga', 'sampai', 'sejak',
+    'karena', 'jika', 'kalau', 'meskipun', 'walaupun', 'sehingga', 'agar', 'supaya', 'seperti',
+    'bagai', 'sebagai', 'adalah', 'ialah', 'yaitu', 'yakni', 'diantara', 'didalam', 'keluar',
+    'dikeluarkan', 'masuk', 'dimasukkan',
+])
+
+_AMP = re.compile(r'&amp;')
+_HTML_ENTITIES = re.compile(r'&lt;|&gt;|&quot;|&#39;')
+_URL = re.compile(r'http\S+')
+_MENTION = re.compile(r'@\w+')
+_HASHTAG = re.compile(r'#(?=\w)')
+_NUMBER = re.compile(r'\d+')
+# string.punctuation + semua karakter non-word dalam satu kelas ('_' termasuk punctuation)
+_PUNCT = re.compile(r'[^\w\s]|_')
+_WHITESPACE = re.compile(r'\s+')
+
+
+class TextNormalizer:
+    """
+    Configurable text cleaner. Every step is a precompiled regex applied in a fixed
+    order; stopwords and single letters are filtered per token against a frozenset.
+    """
+
+    def __init__(self,
+                 lowercase: bool = True,
+                 decode_html: bool = False,
+                 remove_urls: bool = True,
+                 remove_mentions: bool = True,
+                 strip_hashtags: bool = True,
+                 remove_numbers: bool = True,
+                 remove_punct: bool = True,
+                 remove_single_chars: bool = False,
+                 stopwords=None):
+        """
+        Args:
+            lowercase (bool): Lowercase the text first
+            decode_html (bool): '&amp;' -> 'dan', drop '&lt;', '&gt;', '&quot;', '&#39;'
+            remove_urls (bool): Drop 'http...' tokens
+            remove_mentions (bool): Drop '@username'
+            strip_hashtags (bool): '#indihome' -> 'indihome'
+            remove_numbers (bool): Drop digit runs
+            remove_punct (bool): Drop punctuation and other non-word characters
+            remove_single_chars (bool): Drop one-letter words (a-z)
+            stopwords (iterable): Words to drop after cleaning, or None
+        """
+        self.lowercase = lowercase
+        self.stopwords = frozenset(stopwords) if stopwords else frozenset()
+        self.remove_single_chars = remove_single_chars
+
+        # Urutan langkah sama dengan cleaner lama: entity HTML dan URL/mention dihapus
+        # sebelum tanda baca, supaya '@user' tidak tersisa menjadi 'user'.
+        steps = []
+        if decode_html:
+            steps.append((_AMP, 'dan'))
+            steps.append((_HTML_ENTITIES, ''))
+        if remove_urls:
+            steps.append((_URL, ''))
+        if remove_mentions:
+            steps.append((_MENTION, ''))
+        # Bila tanda baca dibuang, '#' ikut terbuang, jadi langkah hashtag tidak perlu
+        if strip_hashtags and not remove_punct:
+            steps.append((_HASHTAG, ''))
+        if remove_numbers:
+            steps.append((_NUMBER, ''))
+        if remove_punct:
+            steps.append((_PUNCT, ''))
+        self._steps = steps
+
+    def _keep(self, word):
+        if self.remove_single_chars and len(word) == 1 and 'a' <= word <= 'z':
+            return False
+        return word not in self.stopwords
+
+    def normalize(self, text) -> str:
+        """Clean one text. Non-string input (NaN, None) becomes ''."""
+        if not isinstance(text, str):
+            return ""
+        if self.lowercase:
+            text = text.lower()
+        for pattern, repl in self._steps:
+            text = pattern.sub(repl, text)
+        if self.stopwords or self.remove_single_chars:
+            return ' '.join(w for w in text.split() if self._keep(w))
+        return ' '.join(text.split())
+
+    __call__ = normalize
+
+    def normalize_series(self, series: pd.Series) -> pd.Series:
+        """Vectorized version of `normalize` for a whole DataFrame column."""
+        is_text = series.map(lambda v: isinstance(v, str))
+        out = series.where(is_text, '').astype(str)
+        if self.lowercase:
+            out = out.str.lower()
+        for pattern, repl in self._steps:
+            out = out.str.replace(pattern, repl, regex=True)
+        if self.stopwords or self.remove_single_chars:
+            # Lookup frozenset per token lebih cepat daripada regex alternation stopword
+            return pd.Series([' '.join(w for w in t.split() if self._keep(w)) for t in out],
+                             index=series.index)
+        return out.str.replace(_WHITESPACE, ' ', regex=True).str.strip()
+
+
+# Profil yang dipakai modul lain
+# clean: utils.clean_text (buang URL dan tanda baca, huruf besar dipertahankan)
+CLEAN_NORMALIZER = TextNormalizer(lowercase=False, remove_mentions=False, strip_hashtags=False,
+                                  remove_numbers=False)
+# basic: SpacyPreprocessor.clean_text_basic (tanda baca dibiarkan untuk spaCy)
+BASIC_NORMALIZER = TextNormalizer(remove_punct=False)
+# simple: daily_twitter_collection
+SIMPLE_NORMALIZER = TextNormalizer(remove_single_chars=True)
+# tweet: integrated_twitter_pipeline (entity HTML + stopword Bahasa Indonesia)
+TWEET_NORMALIZER = TextNormalizer(decode_html=True, remove_single_chars=True, stopwords=INDONESIAN_STOPWORDS)
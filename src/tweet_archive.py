@@ -0,0 +1,317 @@
+#!/usr/bin/env python3
+"""
+Tweet Archive
+Append-only Parquet dataset of collected tweets, replacing the per-run CSV backups
+(config.yaml `tweet_archive_format: parquet`). Layout (hive partitioning by the
+UTC date of the tweet):
+
+    archive/tweets/date=2025-07-28/part-20250728T143710-<uuid>.parquet
+
+Columns are typed (int64 ids, UTC timestamp created_at, int32 counts) and stored
+with zstd + dictionary encoding. Readers go through pyarrow.dataset, so a
+created_at / date filter skips whole partitions and row groups, and `columns`
+reads only those column chunks (ingestion needs id + processed_text, not the
+full tweet-harvest row). Each run appends small files; `--compact` merges every
+partition into one file, deduplicated by id.
+
+Butuh pyarrow. Usage (dari folder src):
+    python tweet_archive.py --import-csv "../backup/tweets_raw_*.csv"
+    python tweet_archive.py --compact
+    python tweet_archive.py --stats
+    python tweet_archive.py --self-check   # round-trip id 19 digit lewat archive sementara
+"""
+
+import argparse
+import glob
+import os
+import uuid
+from datetime import datetime, timezone
+import pandas as pd
+import yaml
+from utils import TWITTER_DATETIME_FORMAT, parse_tweet_ids
+
+DEFAULT_ARCHIVE_PATH = 'archive/tweets'
+
+# (kolom, tipe arrow, kolom sumber dari tweet-harvest / preprocessing sesuai prioritas)
+ARCHIVE_COLUMNS = [
+    ('id', 'int64', ['id_str', 'id']),
+    ('conversation_id', 'int64', ['conversation_id_str']),
+    ('user_id', 'int64', ['user_id_str']),
+    ('created_at', 'timestamp', ['created_at']),
+    ('username', 'string', ['username']),
+    ('full_text', 'string', ['full_text', 'original_text', 'text']),
+    ('processed_text', 'string', ['processed_text']),
+    ('lang', 'string', ['lang']),
+    ('in_reply_to_screen_name', 'string', ['in_reply_to_screen_name']),
+    ('location', 'string', ['location']),
+    ('tweet_url', 'string', ['tweet_url']),
+    ('image_url', 'string', ['image_url']),
+    ('favorite_count', 'int32', ['favorite_count']),
+    ('retweet_count', 'int32', ['retweet_count']),
+    ('reply_count', 'int32', ['reply_count']),
+    ('quote_count', 'int32', ['quote_count']),
+]
+
+# Kolom yang dibutuhkan embedding_pipeline (payload point tweet)
+INGEST_COLUMNS = ['id', 'created_at', 'username', 'processed_text', 'retweet_count', 'favorite_count']
+
+
+def archive_schema():
+    import pyarrow as pa
+    types = {
+        'int64': pa.int64(),
+        'int32': pa.int32(),
+        'string': pa.string(),
+        'timestamp': pa.timestamp('us', tz='UTC'),
+    }
+    return pa.schema([(name, types[kind]) for name, kind, _ in ARCHIVE_COLUMNS])
+
+
+def _partitioning():
+    import pyarrow as pa
+    import pyarrow.dataset as ds
+    return ds.partitioning(pa.schema([('date', pa.string())]), flavor='hive')
+
+
+def _to_table(frame, with_date=False):
+    import pyarrow as pa
+    schema = archive_schema()
+    if with_date:
+        schema = schema.append(pa.field('date', pa.string()))
+    return pa.Table.from_pandas(frame.reset_index(drop=True), schema=schema, preserve_index=False)
+
+
+def _to_pandas(table):
+    """Arrow table -> DataFrame with int64 as nullable Int64: a null id must not turn the column into float64."""
+    import pyarrow as pa
+    return table.to_pandas(types_mapper={pa.int64(): pd.Int64Dtype()}.get)
+
+
+def _parse_created_at(values):
+    parsed = pd.to_datetime(values, format=TWITTER_DATETIME_FORMAT, errors='coerce', utc=True)
+    # Baris yang bukan format Twitter (mis. ISO 8601) dicoba sekali lagi
+    retry = parsed.isna() & values.notna()
+    if retry.any():
+        parsed[retry] = pd.to_datetime(values[retry], errors='coerce', utc=True, format='mixed')
+    return parsed
+
+
+def tweets_to_frame(df):
+    """Map tweet-harvest / preprocessed columns onto the typed archive columns."""
+    out = pd.DataFrame(index=df.index)
+    for name, kind, sources in ARCHIVE_COLUMNS:
+        source = next((s for s in sources if s in df.columns), None)
+        values = df[source] if source else pd.Series(None, index=df.index, dtype=object)
+        if kind == 'int64':
+            # Bukan pd.to_numeric: dengan satu nilai kosong hasilnya float64 dan id 19 digit membulat
+            out[name] = parse_tweet_ids(values)
+        elif kind == 'int32':
+            out[name] = pd.to_numeric(values, errors='coerce').fillna(0).astype('int32')
+        elif kind == 'timestamp':
+            out[name] = _parse_created_at(values)
+        else:
+            out[name] = values.astype('string')
+    return out.reset_index(drop=True)
+
+
+def append_tweets(df, path=DEFAULT_ARCHIVE_PATH):
+    """Append `df` as new Parquet files (one per date partition). Returns the rows written."""
+    import pyarrow.dataset as ds
+
+    frame = tweets_to_frame(df)
+    if frame.empty:
+        return 0
+    # Tweet tanpa created_at masuk partisi 'unknown', bukan dibuang
+    frame['date'] = frame['created_at'].dt.strftime('%Y-%m-%d').fillna('unknown')
+    table = _to_table(frame, with_date=True)
+    stamp = datetime.now(timezone.utc).strftime('%Y%m%dT%H%M%S')
+    ds.write_dataset(
+        table, path, format='parquet', partitioning=_partitioning(),
+        basename_template=f"part-{stamp}-{uuid.uuid4().hex[:8]}-{{i}}.parquet",
+        existing_data_behavior='overwrite_or_ignore',
+        file_options=ds.ParquetFileFormat().make_write_options(compression='zstd')
+    )
+    return len(frame)
+
+
+def _date_filter(since=None, until=None, query_filter=None):
+    import pyarrow.dataset as ds
+    expression = query_filter
+    for bound, op in ((since, 'ge'), (until, 'lt')):
+        if bound is None:
+            continue
+        bound = pd.Timestamp(bound)
+        bound = bound.tz_localize('UTC') if bound.tzinfo is None else bound.tz_convert('UTC')
+        date = bound.strftime('%Y-%m-%d')
+        # Filter ganda: partisi 'date' memangkas file, created_at memotong di dalam hari yang sama
+        if op == 'ge':
+            part = (ds.field('date') >= date) & (ds.field('created_at') >= bound.to_pydatetime())
+        else:
+            part = (ds.field('date') <= date) & (ds.field('created_at') < bound.to_pydatetime())
+        expression = part if expression is None else expression & part
+    return expression
+
+
+def open_archive(path=DEFAULT_ARCHIVE_PATH, files=None):
+    """pyarrow Dataset over the archive (or over selected part files of it)."""
+    import pyarrow.dataset as ds
+    source = files if files is not None else path
+    return ds.dataset(source, format='parquet', partitioning=_partitioning(),
+                      partition_base_dir=path if files is not None else None)
+
+
+def archive_files(path=DEFAULT_ARCHIVE_PATH):
+    return sorted(glob.glob(os.path.join(path, 'date=*', '*.parquet')))
+
+
+def read_archive(path=DEFAULT_ARCHIVE_PATH, columns=None, since=None, until=None, query_filter=None,
+                 files=None):
+    """
+    Archive as a DataFrame. `columns` is pushed down (only those column chunks are
+    read); `since` / `until` (UTC) and `query_filter` (pyarrow expression) prune
+    partitions and row groups.
+    """
+    if not (files if files is not None else archive_files(path)):
+        return pd.DataFrame(columns=columns or [name for name, _, _ in ARCHIVE_COLUMNS])
+    table = open_archive(path, files).to_table(columns=columns, filter=_date_filter(since, until, query_filter))
+    return _to_pandas(table)
+
+
+def archive_to_tweets(frame):
+    """Archive rows back under tweet-harvest column names (id_str, Twitter-format created_at, ...)."""
+    out = frame.drop(columns=['date'], errors='ignore').rename(columns={
+        'id': 'id_str', 'conversation_id': 'conversation_id_str', 'user_id': 'user_id_str'})
+    for column in ('id_str', 'conversation_id_str', 'user_id_str'):
+        if column in out.columns:
+            # Int64 -> string tetap persis; <NA> tetap kosong
+            out[column] = out[column].astype('string')
+    if 'created_at' in out.columns:
+        out['created_at'] = out['created_at'].dt.strftime(TWITTER_DATETIME_FORMAT)
+    return out
+
+
+def iter_archive_frames(files, columns=None, batch_size=5000):
+    """Yield (path, DataFrame) per record batch of each part file, like csv_stream.iter_csv_frames."""
+    import pyarrow as pa
+    import pyarrow.dataset as ds
+    for file in files:
+        try:
+            dataset = ds.dataset(file, format='parquet')
+            for batch in dataset.to_batches(columns=columns, batch_size=batch_size):
+                if batch.num_rows:
+                    yield file, _to_pandas(pa.Table.from_batches([batch]))
+        except Exception as e:
+            print(f"Gagal membaca {file}: {e}")
+
+
+def compact_archive(path=DEFAULT_ARCHIVE_PATH, min_files=2):
+    """
+    Rewrite every partition with at least `min_files` part files as one file,
+    deduplicated by id (latest copy wins). Returns the partitions compacted.
+    """
+    import pyarrow.parquet as pq
+
+    compacted = 0
+    for partition in sorted(glob.glob(os.path.join(path, 'date=*'))):
+        files = sorted(glob.glob(os.path.join(partition, '*.parquet')))
+        if len(files) < min_files:
+            continue
+        frame = pd.concat([_to_pandas(pq.read_table(f, schema=archive_schema())) for f in files],
+                          ignore_index=True)
+        # Baris tanpa id tidak bisa dideduplikasi, jadi dibiarkan apa adanya
+        with_id = frame[frame['id'].notna()].drop_duplicates(subset='id', keep='last')
+        frame = pd.concat([with_id, frame[frame['id'].isna()]]).sort_values('created_at', kind='stable')
+        table = _to_table(frame)
+        stamp = datetime.now(timezone.utc).strftime('%Y%m%dT%H%M%S')
+        target = os.path.join(partition, f"part-{stamp}-compacted.parquet")
+        pq.write_table(table, target + '.tmp', compression='zstd')
+        os.replace(target + '.tmp', target)
+        for f in files:
+            if os.path.abspath(f) != os.path.abspath(target):
+                os.remove(f)
+        compacted += 1
+    return compacted
+
+
+def archive_stats(path=DEFAULT_ARCHIVE_PATH):
+    """Per partition: files, rows and bytes on disk."""
+    import pyarrow.parquet as pq
+    stats = {}
+    for file in archive_files(path):
+        partition = os.path.basename(os.path.dirname(file))
+        entry = stats.setdefault(partition, {'files': 0, 'rows': 0, 'bytes': 0})
+        entry['files'] += 1
+        entry['rows'] += pq.ParquetFile(file).metadata.num_rows
+        entry['bytes'] += os.path.getsize(file)
+    return stats
+
+
+def self_check():
+    """
+    Write a batch with 19-digit ids and bad / missing rows to a temporary archive,
+    compact it with a duplicate batch and check the ids read back exactly.
+    """
+    import tempfile
+    ids = ['1879000000000000001', '1879000000000000002', None, 'bukan-id', '1879000000000000003']
+    df = pd.DataFrame({
+        'id_str': ids,
+        'conversation_id_str': ids,
+        'created_at': 'Mon Jul 28 06:13:03 +0000 2025',
+        'full_text': [f"tweet {i}" for i in range(len(ids))],
+    })
+    expected = [int(i) if i and i.isdigit() else None for i in ids]
+
+    def check(stored, label):
+        stored = stored.sort_values('full_text')
+        for column in ('id', 'conversation_id'):
+            got = [None if pd.isna(v) else int(v) for v in stored[column]]
+            assert got == expected, f"{label} {column}: {got} != {expected}"
+
+    with tempfile.TemporaryDirectory() as path:
+        append_tweets(df, path)
+        check(read_archive(path, columns=['id', 'conversation_id', 'full_text']), 'append')
+        # Partisi dengan id kosong + duplikat di file kedua: compaction harus tetap persis
+        append_tweets(df.iloc[[0, 4]], path)
+        assert compact_archive(path) == 1, "partition not compacted"
+        assert len(archive_files(path)) == 1
+        check(read_archive(path, columns=['id', 'conversation_id', 'full_text']), 'compact')
+        frames = list(iter_archive_frames(archive_files(path), columns=['id', 'conversation_id', 'full_text']))
+        check(pd.concat([f for _, f in frames]), 'iter')
+    print(f"Self-check OK: {len(ids)} rows, ids round-trip exactly through append, compaction and reads")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--config', default='../config.yaml')
+    parser.add_argument('--import-csv', metavar='PATTERN', help='Impor CSV backup lama (glob) ke archive')
+    parser.add_argument('--compact', action='store_true', help='Gabungkan file kecil per partisi')
+    parser.add_argument('--stats', action='store_true')
+    parser.add_argument('--self-check', action='store_true', help='Cek id tweet tersimpan persis (tanpa pembulatan float)')
+    args = parser.parse_args()
+
+    if args.self_check:
+        self_check()
+        return
+    with open(args.config) as f:
+        config = yaml.safe_load(f)
+    path = config.get('tweet_archive_path', DEFAULT_ARCHIVE_PATH)
+
+    if args.import_csv:
+        total = 0
+        for csv_path in sorted(glob.glob(args.import_csv)):
+            rows = append_tweets(pd.read_csv(csv_path, dtype={'id_str': str}), path)
+            print(f"{csv_path}: {rows} rows")
+            total += rows
+        print(f"Imported {total} rows into {path}")
+    if args.compact:
+        print(f"Compacted {compact_archive(path)} partitions")
+    if args.stats or not (args.import_csv or args.compact):
+        stats = archive_stats(path)
+        for partition, entry in stats.items():
+            print(f"{partition}: {entry['rows']} rows in {entry['files']} files, {entry['bytes'] / 1024:.1f} KB")
+        print(f"Total: {sum(e['rows'] for e in stats.values())} rows, "
+              f"{sum(e['bytes'] for e in stats.values()) / 1024:.1f} KB")
+
+
+if __name__ == '__main__':
+    main()
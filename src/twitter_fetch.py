@@ -1,55 +1,285 @@
+import argparse
+import glob
+import logging
+import re
+import shutil
 import subprocess
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from datetime import datetime, timedelta, timezone
 import pandas as pd
 import yaml
 import os
+from fetch_cursor import get_cursor_store, newer_than, high_water_mark, commit_cursors, tweet_ids
+from tweet_archive import archive_to_tweets, read_archive, DEFAULT_ARCHIVE_PATH
 
-def fetch_with_harvest(config):
-    filename = config.get('harvest_output', 'tweets_harvest.csv')
+# Epoch snowflake id Twitter (ms), untuk id tweet sintetis di dry run
+TWITTER_EPOCH_MS = 1288834974657
+SEARCH_TIME_FORMAT = '%Y-%m-%d_%H:%M:%S_UTC'
+
+
+def harvest_command():
+    # Binary tweet-harvest yang sudah terpasang (npm i -g tweet-harvest@2.6.1) dipakai langsung;
+    # npx -y hanya fallback karena me-resolve paketnya lagi di setiap run
+    binary = shutil.which('tweet-harvest')
+    return [binary] if binary else ['npx', '-y', 'tweet-harvest@2.6.1']
+
+
+# Shard time slice: query yang sudah membawa since:/until: sendiri
+TIME_SLICE_PATTERN = re.compile(r'(?:^|\s)(?:since|until):\S')
+
+
+def search_query(query, since_id=None, window_hours=2, now=None, max_id=None):
+    """
+    Resume after `since_id` when there is a cursor, otherwise the last `window_hours` (UTC).
+    A time-slice query (own since:/until:) gets no default window; a cursor only
+    narrows it to tweets newer than the mark within the slice. `max_id` pages back
+    to tweets at or below that id.
+    """
+    if since_id:
+        search = f"{query} since_id:{since_id}"
+    elif TIME_SLICE_PATTERN.search(query):
+        search = query
+    else:
+        now = now or datetime.now(timezone.utc)
+        since = now - timedelta(hours=window_hours)
+        search = f"{query} since:{since.strftime(SEARCH_TIME_FORMAT)} until:{now.strftime(SEARCH_TIME_FORMAT)}"
+    return f"{search} max_id:{max_id}" if max_id else search
+
+
+def query_shards(config):
+    """[{'query', 'max_tweets'}] from `twitter_query_shards`, or the single `twitter_query`."""
+    shards = []
+    for shard in config.get('twitter_query_shards') or [config['twitter_query']]:
+        if isinstance(shard, str):
+            shard = {'query': shard}
+        shards.append({'query': shard['query'], 'max_tweets': int(shard.get('max_tweets', config['max_tweets']))})
+    return shards
+
+
+def shard_output(config, query):
+    """Output file of one shard, so concurrent runs never write the same CSV."""
+    stem, ext = os.path.splitext(config.get('harvest_output', 'tweets_harvest.csv'))
+    slug = re.sub(r'\W+', '_', query).strip('_').lower()[:60]
+    return f"{stem}_{slug}{ext or '.csv'}"
+
+
+def run_harvest(config, query, since_id=None, limit=None, output=None, max_id=None):
+    """One tweet-harvest search; returns the raw DataFrame (empty when nothing was written)."""
+    filename = output or config.get('harvest_output', 'tweets_harvest.csv')
     # Tweet-harvest saves to tweets-data folder
     actual_filename = f"tweets-data/{filename}"
-    search_keyword = config['twitter_query']
-    limit = config['max_tweets']
-    token = config['twitter_bearer_token']
-
-    # Add date filter for recent tweets (last 2 hours)
-    from datetime import datetime, timedelta
-    now = datetime.now()
-    two_hours_ago = now - timedelta(hours=2)
-    
-    # Format dates for Twitter search
-    current_time = now.strftime('%Y-%m-%d_%H:%M:%S')
-    two_hours_ago_str = two_hours_ago.strftime('%Y-%m-%d_%H:%M:%S')
-    
-    # Update search query to include date filter for last 2 hours
-    search_keyword_with_date = f"{search_keyword} since:{two_hours_ago_str} until:{current_time}"
-    
-    cmd = [
-        'npx', '-y', 'tweet-harvest@2.6.1',
+    limit = limit or config['max_tweets']
+    search = search_query(query, since_id, config.get('harvest_initial_window_hours', 2), max_id=max_id)
+    # tweet-harvest menambahkan ke file yang sudah ada; sisa run sebelumnya membuat duplikat
+    if os.path.exists(actual_filename):
+        os.remove(actual_filename)
+
+    cmd = harvest_command() + [
         '-o', filename,
-        '-s', search_keyword_with_date,
+        '-s', search,
         '--tab', 'LATEST',
         '-l', str(limit),
-        '--token', token
+        '--token', config['twitter_bearer_token']
     ]
-    print("Running:", " ".join(cmd))
-    print(f"Searching for tweets with hashtags: #indihome, #telkomIndonesia, #telkom, #gangguanTelkom")
-    print(f"Time range: {two_hours_ago_str} to {current_time}")
-    print(f"Target: {limit} tweets every 2 hours")
-    
-    subprocess.run(" ".join(cmd), check=True, shell=True)
+    print("Running:", " ".join(cmd[:-1]), "***")
+    print(f"Search: {search} (target: {limit} tweets)")
+    # Tanpa shell: '#' di query tidak lagi dianggap komentar oleh shell.
+    # Timeout per shard: satu pencarian yang macet tidak menahan shard lain
+    subprocess.run(cmd, check=True, timeout=config.get('harvest_timeout_seconds') or None)
 
     # Check if file exists in tweets-data folder
     if os.path.exists(actual_filename):
-        df = pd.read_csv(actual_filename)
+        df = pd.read_csv(actual_filename, dtype={'id_str': str})
         print(f"Loaded {len(df)} tweets from {actual_filename}")
     else:
         print(f"Warning: File {actual_filename} not found")
         df = pd.DataFrame()
-    
     return df
 
+
+def synthetic_tweets(query, count, now=None):
+    """`count` tweets with snowflake ids of the current time, columns as written by tweet-harvest."""
+    now_ms = int((now or time.time()) * 1000)
+    ids = [((now_ms - TWITTER_EPOCH_MS - i) << 22) for i in range(count)]
+    created_at = datetime.fromtimestamp(now_ms / 1000, timezone.utc).strftime('%a %b %d %H:%M:%S +0000 %Y')
+    topic = query.split()[0] if query else '#indihome'
+    return pd.DataFrame({
+        'id_str': [str(i) for i in ids],
+        'created_at': created_at,
+        'full_text': [f"[dry run] {topic} tweet {i} tentang gangguan internet" for i in ids],
+        'username': 'dry_run',
+        'favorite_count': 0,
+        'retweet_count': 0,
+    })
+
+
+class DryRunHarvester:
+    """
+    Offline stand-in for tweet-harvest (config `harvest_dry_run: true`).
+
+    Tweets from `source` (tweet archive folders and / or CSV globs; default: the
+    archive plus the old raw CSV backups) that contain one of the query's hashtags are "posted" `limit` per call, oldest first; each search
+    returns the newest `limit` posted tweets above `since_id`, like the LATEST tab.
+    Without source files every call synthesizes `limit` new tweets.
+    """
+
+    def __init__(self, source=None):
+        self.source = [source] if isinstance(source, str) else list(source or ())
+        self._pool = None
+        self._posted = {}  # query -> jumlah tweet yang sudah "diposting"
+        self._lock = threading.Lock()
+        self.calls = 0
+
+    def _load(self):
+        frames = []
+        for source in self.source:
+            if os.path.isdir(source):
+                frame = archive_to_tweets(read_archive(source))
+                if not frame.empty:
+                    frames.append(frame)
+            else:
+                frames.extend(pd.read_csv(path, dtype={'id_str': str}) for path in sorted(glob.glob(source)))
+        # newer_than: tweet yang ada di archive dan di CSV lama hanya diputar sekali
+        self._pool = newer_than(pd.concat(frames, ignore_index=True), None) if frames else pd.DataFrame()
+
+    def _matching(self, query):
+        hashtags = [t.lower() for t in query.split() if t.startswith('#')]
+        if not hashtags or 'full_text' not in self._pool.columns:
+            return self._pool
+        text = self._pool['full_text'].fillna('').str.lower()
+        return self._pool[text.map(lambda t: any(h in t for h in hashtags))]
+
+    def __call__(self, config, query, since_id=None, limit=None, output=None, max_id=None):
+        limit = limit or config['max_tweets']
+        with self._lock:
+            self.calls += 1
+            if self._pool is None:
+                self._load()
+            if self._pool.empty:
+                # Tweet sintetis selalu baru; tidak ada halaman lama di bawah max_id
+                return pd.DataFrame() if max_id else synthetic_tweets(query, limit)
+            matching = self._matching(query)
+            posted = self._posted.get(query, 0)
+            if not max_id:
+                # Hanya pencarian baru yang "memposting" tweet; halaman max_id membaca yang sudah ada
+                posted = self._posted[query] = min(len(matching), posted + limit)
+        page = newer_than(matching.head(posted), since_id)
+        if max_id:
+            page = page[(tweet_ids(page) <= int(max_id)).to_numpy()]
+        return page.tail(limit).reset_index(drop=True)
+
+
+_dry_run_harvesters = {}
+
+
+def get_harvester(config):
+    """run_harvest, or a (process-wide, so replay state survives daemon cycles) DryRunHarvester."""
+    if not config.get('harvest_dry_run', False):
+        return run_harvest
+    source = config.get('harvest_dry_run_source',
+                         [config.get('tweet_archive_path', DEFAULT_ARCHIVE_PATH), 'backup/tweets_raw_*.csv'])
+    source = tuple([source] if isinstance(source, str) else source or ())
+    harvester = _dry_run_harvesters.get(source)
+    if harvester is None:
+        harvester = _dry_run_harvesters[source] = DryRunHarvester(source)
+    return harvester
+
+
+def _fetch_shard(config, harvester, shard, output):
+    """
+    New tweets of one shard. LATEST returns only the newest `max_tweets`; a full page
+    may hide older tweets above the cursor, so the search pages back (max_id: below the
+    oldest tweet) until a page is not full, for at most `harvest_max_pages` pages.
+    """
+    query, limit = shard['query'], shard['max_tweets']
+    since_id = get_cursor_store(config).since_id(query)
+    page = harvester(config, query, since_id, limit, output=output)
+    if page.empty or 'id_str' not in page.columns:
+        return page, len(page)
+    pages, fetched = [page], len(page)
+    max_pages = max(1, int(config.get('harvest_max_pages', 5)))
+    while len(page) >= limit and len(pages) < max_pages:
+        oldest = tweet_ids(page).min()
+        if oldest is pd.NA:
+            break
+        page = harvester(config, query, since_id, limit, output=output, max_id=int(oldest) - 1)
+        if page.empty or 'id_str' not in page.columns:
+            break
+        pages.append(page)
+        fetched += len(page)
+    if len(page) >= limit and len(pages) == max_pages:
+        # Cursor tetap dimajukan ke tweet terbaru; tweet di antara cursor lama dan
+        # halaman terakhir tidak terambil. Naikkan max_tweets / harvest_max_pages
+        oldest = tweet_ids(page).min()
+        logging.warning(f"Harvest shard '{query}' saturated: {max_pages} full pages of {limit}; "
+                        f"tweets between id {since_id} and {oldest} may be missing")
+        print(f"⚠️  Shard '{query}': {max_pages} halaman penuh, tweet lebih lama dari id {oldest} "
+              f"(setelah cursor {since_id}) mungkin terlewat")
+    return newer_than(pd.concat(pages, ignore_index=True), since_id), fetched
+
+
+def fetch_new_tweets(config, harvester=None):
+    """
+    Fetch tweets newer than the stored cursor of every query shard, running the
+    shards concurrently (`harvest_workers`) into separate output files.
+
+    Returns (df, marks): the merged new tweets, deduplicated by id_str, and the new
+    high-water mark per shard query. A failed shard is reported and skipped, its
+    cursor stays put; only when every shard fails the error is raised. Pass `marks`
+    to fetch_cursor.commit_cursors once the tweets are stored.
+    """
+    harvester = harvester or get_harvester(config)
+    shards = query_shards(config)
+    workers = max(1, min(config.get('harvest_workers', 4), len(shards)))
+    frames, marks, errors = [], {}, []
+    with ThreadPoolExecutor(max_workers=workers, thread_name_prefix='harvest') as pool:
+        futures = {
+            pool.submit(_fetch_shard, config, harvester, shard,
+                        shard_output(config, shard['query']) if len(shards) > 1 else None): shard
+            for shard in shards
+        }
+        for future in as_completed(futures):
+            query = futures[future]['query']
+            try:
+                fresh, fetched = future.result()
+            except Exception as e:
+                errors.append(e)
+                logging.exception(f"Harvest shard '{query}' failed")
+                print(f"❌ Shard '{query}' failed: {e}")
+                continue
+            print(f"   {query}: {len(fresh)} new of {fetched} fetched")
+            if not fresh.empty:
+                frames.append(fresh)
+                if 'id_str' in fresh.columns:
+                    marks[query] = high_water_mark(fresh)
+    if errors and len(errors) == len(shards):
+        raise errors[0]
+    if not frames:
+        return pd.DataFrame(), marks
+    merged = pd.concat(frames, ignore_index=True)
+    # Tweet dengan beberapa hashtag muncul di lebih dari satu shard
+    if 'id_str' in merged.columns:
+        merged = newer_than(merged, None)
+    print(f"{len(merged)} new tweets from {len(shards) - len(errors)}/{len(shards)} shards")
+    return merged, marks
+
+
+def fetch_with_harvest(config):
+    """Fetch new tweets and advance the cursor right away (callers that do not store the tweets)."""
+    df, marks = fetch_new_tweets(config)
+    commit_cursors(config, marks)
+    return df
+
+
 if __name__ == '__main__':
-    config_path = os.path.join(os.path.dirname(__file__), 'config.yaml')
-    with open(config_path) as f:
+    parser = argparse.ArgumentParser(description="Fetch tweets newer than the stored cursor")
+    parser.add_argument('--config', default='../config.yaml')
+    parser.add_argument('--dry-run', action='store_true', help='Pakai DryRunHarvester, tanpa tweet-harvest')
+    args = parser.parse_args()
+    with open(args.config) as f:
         config = yaml.safe_load(f)
-    fetch_with_harvest(config)
\ No newline at end of file
+    if args.dry_run:
+        config['harvest_dry_run'] = True
+    fetch_with_harvest(config)
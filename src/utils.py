@@ -1,12 +1,14 @@
-import re
 import logging
+import itertools
+import hashlib
+import uuid
+from datetime import datetime, timezone
+import pandas as pd
+from text_normalizer import CLEAN_NORMALIZER
 
 def clean_text(text):
-    if not isinstance(text, str):
-        return ""
-    text = re.sub(r"http\\S+", "", text)
-    text = re.sub(r"[^\\w\\s]", "", text)
-    return text.strip()
+    # Buang URL dan tanda baca; lihat text_normalizer.CLEAN_NORMALIZER
+    return CLEAN_NORMALIZER.normalize(text)
 
 def chunk_text(text, chunk_size=256, overlap=32):
     words = text.split()
@@ -17,6 +19,70 @@ def chunk_text(text, chunk_size=256, overlap=32):
             chunks.append(chunk)
     return chunks
 
+def batched(iterable, size):
+    """Yield lists of at most `size` items from any iterable, lazily."""
+    iterator = iter(iterable)
+    while True:
+        batch = list(itertools.islice(iterator, size))
+        if not batch:
+            return
+        yield batch
+
+# Namespace tetap agar ID point sama di setiap run dan di setiap mesin
+POINT_ID_NAMESPACE = uuid.uuid5(uuid.NAMESPACE_URL, 'autoUpdateData/points')
+
+def point_id(source_id, chunk_number):
+    """Deterministic Qdrant point ID (UUIDv5) for chunk `chunk_number` of `source_id`."""
+    return str(uuid.uuid5(POINT_ID_NAMESPACE, f"{source_id}:{chunk_number}"))
+
+def text_source_id(text):
+    """Fallback source id for rows without a tweet id: hash of the text itself."""
+    return 'text:' + hashlib.sha1(text.encode('utf-8')).hexdigest()
+
+# Format created_at dari API Twitter, mis. 'Mon Jul 28 06:13:03 +0000 2025'
+TWITTER_DATETIME_FORMAT = '%a %b %d %H:%M:%S %z %Y'
+
+def to_rfc3339(value):
+    """
+    created_at as RFC 3339 (UTC) so Qdrant's datetime payload index can range-filter it.
+    Accepts the Twitter format or ISO 8601; anything unparseable becomes None.
+    """
+    if isinstance(value, datetime):
+        parsed = value
+    elif isinstance(value, str) and value:
+        try:
+            parsed = datetime.strptime(value, TWITTER_DATETIME_FORMAT)
+        except ValueError:
+            try:
+                parsed = datetime.fromisoformat(value.replace('Z', '+00:00'))
+            except ValueError:
+                return None
+    else:
+        return None
+    if parsed.tzinfo is None:
+        parsed = parsed.replace(tzinfo=timezone.utc)
+    return parsed.astimezone(timezone.utc).isoformat().replace('+00:00', 'Z')
+
+def to_rfc3339_series(values):
+    """Vectorized to_rfc3339 for a Series: one pandas parse for the Twitter format, per-value fallback for the rest."""
+    parsed = pd.to_datetime(values, format=TWITTER_DATETIME_FORMAT, errors='coerce', utc=True)
+    out = parsed.dt.strftime('%Y-%m-%dT%H:%M:%SZ').astype(object)
+    rest = parsed.isna() & values.notna()
+    if rest.any():
+        out[rest] = values[rest].map(to_rfc3339)
+    return out.where(out.notna(), None)
+
+def parse_tweet_ids(values):
+    """
+    Digit strings (or ints) as nullable Int64, anything else <NA>. Parsed with int()
+    per value: pd.to_numeric falls back to float64 when a value is missing, which
+    rounds 19-digit tweet ids.
+    """
+    text = pd.Series(values).astype('string').str.strip()
+    valid = text.str.fullmatch(r'\d+').fillna(False).astype(bool)
+    return pd.Series([int(v) if ok else pd.NA for v, ok in zip(text, valid)],
+                     index=text.index, dtype='Int64')
+
 def setup_logger(logfile='../logs/pipeline.log'):
     logging.basicConfig(filename=logfile, level=logging.INFO,
                         format='%(asctime)s %(levelname)s:%(message)s')
\ No newline at end of file